@@ -6,11 +6,16 @@ def set_default_role(apps, schema_editor):
     User = apps.get_model('accounts', 'User')
     Role = apps.get_model('accounts', 'Role')
     
+    users = User.objects.filter(role__isnull=True)
+    # В новой базе (тесты, первый запуск) пользователей без роли нет
+    if not users.exists():
+        return
+
     # Получаем роль admin
     admin_role = Role.objects.get(name='admin')
     
     # Назначаем роль всем пользователям без роли
-    User.objects.filter(role__isnull=True).update(role=admin_role)
+    users.update(role=admin_role)
 
 
 def reverse_set_default_role(apps, schema_editor):
@@ -6,8 +6,10 @@ from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_protect
 
+from apps.core.writes import coordinated_write
 from .models import User, Role, Position, Branch
 from .serializers import (
     UserRegistrationSerializer,
@@ -18,6 +20,7 @@ from .serializers import (
 )
 
 
+@method_decorator(coordinated_write, name='dispatch')
 class RegisterView(generics.CreateAPIView):
     """Регистрация нового пользователя"""
     queryset = User.objects.all()
@@ -38,6 +41,7 @@ class RegisterView(generics.CreateAPIView):
             'message': 'Пользователь успешно зарегистрирован'
         }, status=status.HTTP_201_CREATED)
 
+@method_decorator(coordinated_write, name='dispatch')
 class LoginView(generics.GenericAPIView):
     """Вход пользователя"""
     serializer_class = UserLoginSerializer
@@ -58,6 +62,7 @@ class LoginView(generics.GenericAPIView):
             'message': 'Пользователь успешно вошел в систему'
         }, status=status.HTTP_200_OK)
 
+@method_decorator(coordinated_write, name='dispatch')
 class ProfileView(generics.RetrieveUpdateAPIView):
     """Просмотр и обновление профиля"""
     serializer_class = UserProfileSerializer
@@ -71,6 +76,7 @@ class ProfileView(generics.RetrieveUpdateAPIView):
             return UserUpdateSerializer
         return UserProfileSerializer
 
+@method_decorator(coordinated_write, name='dispatch')
 class ChangePasswordView(generics.UpdateAPIView):
     """Смена пароля"""
     serializer_class = ChangePasswordSerializer
@@ -90,6 +96,7 @@ class ChangePasswordView(generics.UpdateAPIView):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@coordinated_write
 def logout_view(request):
     """Выход пользователя"""
     try:
@@ -108,6 +115,7 @@ def logout_view(request):
 
 # Обычные Django views для веб-интерфейса
 @csrf_protect
+@coordinated_write
 def login_view(request):
     """Страница входа в систему"""
     if request.user.is_authenticated:
@@ -215,6 +223,7 @@ def users_list(request):
 
 
 @login_required
+@coordinated_write
 def add_user(request):
     """Добавление нового пользователя"""
     from django.db import transaction
@@ -285,6 +294,7 @@ def add_user(request):
 
 
 @login_required
+@coordinated_write
 def edit_user(request, user_id):
     """Редактирование пользователя"""
     from django.db import transaction
@@ -465,6 +475,7 @@ def roles_list(request):
 
 
 @login_required
+@coordinated_write
 def add_role(request):
     """Добавление новой роли"""
     from django.db import transaction
@@ -497,6 +508,7 @@ def add_role(request):
 
 
 @login_required
+@coordinated_write
 def edit_role(request, role_id):
     """Редактирование роли"""
     from django.db import transaction
@@ -582,6 +594,7 @@ def positions_list(request):
 
 
 @login_required
+@coordinated_write
 def add_position(request):
     """Добавление новой должности"""
     from django.db import transaction
@@ -614,6 +627,7 @@ def add_position(request):
 
 
 @login_required
+@coordinated_write
 def edit_position(request, position_id):
     """Редактирование должности"""
     from django.db import transaction
@@ -700,6 +714,7 @@ def branches_list(request):
 
 
 @login_required
+@coordinated_write
 def add_branch(request):
     """Добавление нового филиала"""
     from django.db import transaction
@@ -738,6 +753,7 @@ def add_branch(request):
 
 
 @login_required
+@coordinated_write
 def edit_branch(request, branch_id):
     """Редактирование филиала"""
     from django.db import transaction
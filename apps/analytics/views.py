@@ -9,11 +9,15 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 
+from apps.core.cache import cache_page_tagged, replica_tags, scope_tags
+from apps.core.routers import replica_reads
 from apps.orders.models import Order, OrderItem
 
 
+# Отчёты кэшируются до изменения заказов в области видимости (теги)
+REPORT_CACHE_TTL = 60 * 60
+
 # Единая группа отмен — сводим все детальные причины в одну «cancelled»
 CANCEL_STATUSES = {
     Order.STATUS_REFUND,
@@ -78,6 +82,20 @@ def apply_optional_filters(orders_qs, request, user):
     return orders_qs
 
 
+def responsible_scope(user):
+    """ID ответственных, чьи заказы видны пользователю (None — все заказы)."""
+    if getattr(user, "is_superuser", False):
+        return None
+    if hasattr(user, "get_subordinates"):
+        return [user.id, *user.get_subordinates().values_list("id", flat=True)]
+    return [user.id]
+
+
+def report_tags(request):
+    """Теги кэша отчёта: заказы в области видимости пользователя (и реплика)."""
+    return [*scope_tags(responsible_scope(request.user)), *replica_tags()]
+
+
 def role_scoped_orders(user, start, end):
     qs = Order.objects.filter(created_at__date__gte=start, created_at__date__lte=end)
     if getattr(user, "is_superuser", False):
@@ -90,7 +108,8 @@ def role_scoped_orders(user, start, end):
     return qs.filter(responsible=user)
 
 
-@method_decorator(cache_page(60), name='get')
+@method_decorator(cache_page_tagged(REPORT_CACHE_TTL, report_tags), name='get')
+@method_decorator(replica_reads, name='get')
 class OverviewAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -114,7 +133,8 @@ class OverviewAPIView(APIView):
         return Response(data)
 
 
-@method_decorator(cache_page(60), name='get')
+@method_decorator(cache_page_tagged(REPORT_CACHE_TTL, report_tags), name='get')
+@method_decorator(replica_reads, name='get')
 class TimeSeriesAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -153,7 +173,8 @@ class TimeSeriesAPIView(APIView):
         return Response(result)
 
 
-@method_decorator(cache_page(60), name='get')
+@method_decorator(cache_page_tagged(REPORT_CACHE_TTL, report_tags), name='get')
+@method_decorator(replica_reads, name='get')
 class ByManagerAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -188,7 +209,8 @@ class ByManagerAPIView(APIView):
         return Response(result)
 
 
-@method_decorator(cache_page(60), name='get')
+@method_decorator(cache_page_tagged(REPORT_CACHE_TTL, report_tags), name='get')
+@method_decorator(replica_reads, name='get')
 class TopProductsAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -220,7 +242,8 @@ class TopProductsAPIView(APIView):
         ])
 
 
-@method_decorator(cache_page(60), name='get')
+@method_decorator(cache_page_tagged(REPORT_CACHE_TTL, report_tags), name='get')
+@method_decorator(replica_reads, name='get')
 class ExportOrdersCSVView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -3,6 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.core.paginator import Paginator
 from django.db.models import Q
+from apps.core.writes import coordinated_write
 from .models import City
 
 
@@ -97,6 +98,7 @@ def cities_list(request):
 
 
 @login_required(login_url='accounts:login')
+@coordinated_write
 def add_city(request):
     """Добавление города"""
     if request.method == 'POST':
@@ -140,6 +142,7 @@ def add_city(request):
 
 
 @login_required(login_url='accounts:login')
+@coordinated_write
 def edit_city(request, city_id):
     """Редактирование города"""
     city = get_object_or_404(City, id=city_id)
@@ -186,6 +189,7 @@ def edit_city(request, city_id):
 
 
 @login_required(login_url='accounts:login')
+@coordinated_write
 def delete_city(request, city_id):
     """Удаление города"""
     if request.method == 'POST':
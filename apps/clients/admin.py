@@ -7,7 +7,7 @@ from .models import (
 
 @admin.register(Client)
 class ClientAdmin(admin.ModelAdmin):
-    list_display = ('name', 'client_type', 'email', 'created_at', 'created_by')
+    list_display = ('name', 'client_type', 'primary_phone', 'primary_city', 'email', 'created_at', 'created_by')
     list_filter = ('client_type', 'created_at')
     search_fields = ('name', 'email', 'first_name', 'last_name')
     readonly_fields = ('created_at', 'modified_at', 'created_by', 'modified_by')
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class ClientsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.clients'
-    verbose_name = 'Клиенты'
\ No newline at end of file
+    verbose_name = 'Клиенты'
+    def ready(self):
+        """Подключение сигналов денормализации основных контактов"""
+        import apps.clients.signals  # noqa
@@ -0,0 +1,524 @@
+"""
+Пакетный импорт клиентов из Excel.
+
+Этапы:
+- read: из файла потоково читаются только колонки шаблона, порциями
+  DataFrame (apps.imports.excel.iter_frames) — в памяти одна порция;
+- normalize: векторная нормализация колонок pandas (телефоны, тип клиента,
+  пустые строки, длины полей);
+- preload: словари телефон → клиент и ФИО → клиент и текущее состояние
+  найденных клиентов дополняются для каждой порции (запросы — только по
+  ещё не встречавшимся телефонам и ФИО);
+- write: строки применяются по порядку (как при построчном импорте:
+  повторная строка с тем же телефоном обновляет созданного ранее клиента),
+  изменения пишутся порциями (bulk_create и UPDATE через executemany),
+  каждая порция — в своей короткой транзакции вместе с пересчётом
+  основных контактов и поискового индекса.
+
+Время каждого этапа возвращается в результате (timings, секунды).
+"""
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+from django.db import connection
+from django.utils import timezone
+
+from apps.core.writes import write_transaction
+from apps.imports.excel import (
+    TEXT,
+    estimated_rows,
+    iter_frames,
+    open_sheet,
+    read_frame,
+    sheet_header,
+)
+
+from .models import (
+    Client,
+    ClientAddress,
+    ClientPhone,
+    IndividualClientData,
+    LegalEntityClientData,
+)
+from .search import reindex_clients
+from .services import refresh_primary_contacts
+from .signals import clients_imported
+
+COLUMNS = {
+    'phone': 'Телефон',
+    'phone2': 'Телефон 2',
+    'email': 'Email',
+    'client_type': 'Тип клиента',
+    'full_name': 'ФИО/Компания',
+    'last_name': 'Фамилия',
+    'first_name': 'Имя',
+    'middle_name': 'Отчество',
+    'city': 'Город',
+}
+REQUIRED_COLUMNS = ['Телефон', 'Тип клиента', 'ФИО/Компания']
+# Первая строка данных (в первой — заголовки)
+DATA_ROW = 2
+
+CLIENT_TYPES = {
+    'Физическое лицо': 'individual',
+    'Физ. лицо': 'individual',
+    'Физическое': 'individual',
+    'individual': 'individual',
+    'Юридическое лицо': 'legal_entity',
+    'Юр. лицо': 'legal_entity',
+    'Юридическое': 'legal_entity',
+    'legal_entity': 'legal_entity',
+}
+
+# Ограничения длины полей моделей (SQLite их не проверяет)
+MAX_LENGTHS = {
+    'full_name': 255,
+    'first_name': 100,
+    'last_name': 100,
+    'middle_name': 100,
+    'city': 100,
+    'email': 254,
+}
+
+CHUNK_SIZE = 5000
+# Размер списка для IN (...) при предзагрузке
+LOOKUP_CHUNK = 5000
+
+CLIENT_UPDATE_FIELDS = [
+    'name', 'first_name', 'last_name', 'middle_name', 'email',
+    'modified_by', 'modified_at',
+]
+
+
+class _Timings(dict):
+    """Накопительное время этапов импорта, секунды."""
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self[name] = round(self.get(name, 0) + time.perf_counter() - started, 3)
+
+
+class _ClientState:
+    """Клиент и связанные записи, которые может изменить импорт."""
+    __slots__ = ('client', 'individual', 'legal', 'phones', 'address')
+
+    def __init__(self, client, individual=None, legal=None, phones=None, address=None):
+        self.client = client
+        self.individual = individual
+        self.legal = legal
+        self.phones = phones or set()
+        self.address = address
+
+
+def template_columns(sheet):
+    """
+    Колонки шаблона, найденные в заголовках листа, для apps.imports.excel:
+    все значения читаются строками (телефоны без '.0').
+    """
+    header = sheet_header(sheet)
+    return {
+        column: (header.index(column), TEXT)
+        for column in COLUMNS.values() if column in header
+    }
+
+
+def read_excel(path, sheet_name=0, nrows=None):
+    """Прочитать файл импорта одним DataFrame (для проверки заголовков и небольших файлов)."""
+    with open_sheet(path, sheet_name) as sheet:
+        return read_frame(sheet, template_columns(sheet), first_row=DATA_ROW, limit=nrows)
+
+
+def missing_columns(columns):
+    """Отсутствующие обязательные колонки; columns — колонки шаблона или DataFrame."""
+    return [col for col in REQUIRED_COLUMNS if col not in columns]
+
+
+def normalize_phones(series):
+    """Векторная нормализация телефонов в +7XXXXXXXXXX (иначе None)."""
+    digits = (
+        series.str.replace(r'\.0$', '', regex=True)
+        .str.replace(r'\D', '', regex=True)
+    )
+    length = digits.str.len()
+    result = pd.Series(None, index=series.index, dtype=object)
+    ten = length == 10
+    result[ten] = '+7' + digits[ten]
+    seven = (length == 11) & digits.str.startswith('7')
+    result[seven] = '+' + digits[seven]
+    eight = (length == 11) & digits.str.startswith('8')
+    result[eight] = '+7' + digits[eight].str[1:]
+    return result.where(result.notna(), None)
+
+
+def normalize_frame(df):
+    """
+    Нормализовать DataFrame импорта.
+    Возвращает (data, counters, errors): data — только пригодные строки.
+    """
+    data = pd.DataFrame(index=df.index)
+    for key, column in COLUMNS.items():
+        if column in df.columns:
+            data[key] = df[column].fillna('').astype(str).str.strip()
+        else:
+            data[key] = ''
+    data['row_number'] = df.index + 2
+
+    empty = (data['phone'] == '') & (data['full_name'] == '')
+    data['client_type'] = data['client_type'].map(CLIENT_TYPES)
+    invalid_type = ~empty & data['client_type'].isna()
+
+    errors = []
+    too_long = pd.Series(False, index=data.index)
+    for key, max_length in MAX_LENGTHS.items():
+        mask = ~empty & ~invalid_type & (data[key].str.len() > max_length)
+        for row_number in data.loc[mask, 'row_number']:
+            errors.append(
+                f'Строка {row_number}: поле «{COLUMNS[key]}» длиннее {max_length} символов'
+            )
+        too_long |= mask
+
+    data['phone'] = normalize_phones(data['phone'])
+    data['phone2'] = normalize_phones(data['phone2'])
+
+    counters = {
+        'empty_rows': int(empty.sum()),
+        'invalid_type': int(invalid_type.sum()),
+    }
+    return data[~(empty | invalid_type | too_long)], counters, errors
+
+
+def _chunked(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _preload(data, phone_owner, name_owner, states, queried):
+    """
+    Дополнить словари соответствия (телефон → клиент, ФИО → клиент)
+    и состояние существующих клиентов для строк порции data.
+    queried — уже запрошенные телефоны и ФИО ({'phone': set, 'name': set}):
+    они и значения из строк предыдущих порций повторно не запрашиваются,
+    поэтому результат импорта не зависит от размера порции.
+    """
+    phones = [
+        phone for phone in data['phone'].dropna().unique()
+        if phone not in queried['phone'] and phone not in phone_owner
+    ]
+    queried['phone'].update(phones)
+    found = set()
+    for part in _chunked(phones, LOOKUP_CHUNK):
+        rows = (
+            ClientPhone.objects.filter(phone__in=part)
+            .order_by('id').values_list('phone', 'client_id')
+        )
+        for phone, client_id in rows:
+            phone_owner.setdefault(phone, client_id)
+            found.add(client_id)
+
+    names = [
+        name for name in data.loc[data['full_name'] != '', 'full_name'].unique()
+        if name not in queried['name'] and name not in name_owner
+    ]
+    queried['name'].update(names)
+    for part in _chunked(names, LOOKUP_CHUNK):
+        for name, client_id in Client.objects.filter(name__in=part).values_list('name', 'pk'):
+            name_owner.setdefault(name, client_id)
+            found.add(client_id)
+
+    client_ids = [client_id for client_id in found if client_id not in states]
+    for part in _chunked(client_ids, LOOKUP_CHUNK):
+        clients = Client.objects.filter(pk__in=part).only(
+            'id', 'client_type', *CLIENT_UPDATE_FIELDS
+        )
+        for client in clients:
+            states[client.pk] = _ClientState(client)
+        for individual in IndividualClientData.objects.filter(client_id__in=part):
+            states[individual.client_id].individual = individual
+        for legal in LegalEntityClientData.objects.filter(client_id__in=part):
+            states[legal.client_id].legal = legal
+        for client_id, phone in ClientPhone.objects.filter(
+                client_id__in=part).values_list('client_id', 'phone'):
+            states[client_id].phones.add(phone)
+        addresses = ClientAddress.objects.filter(
+            client_id__in=part, is_primary=True
+        ).order_by('-id')
+        for address in addresses:
+            # Как get_or_create(is_primary=True): берётся первая основная
+            states[address.client_id].address = address
+
+
+class _Chunk:
+    """Изменения одной порции строк."""
+
+    def __init__(self):
+        self.created = []
+        self.updated = {}
+        self.touched = set()
+
+    def add(self, obj):
+        self.created.append(obj)
+
+    def change(self, obj):
+        # Созданные в этой же порции объекты попадут в bulk_create как есть
+        if not obj._state.adding:
+            self.updated[id(obj)] = obj
+
+    def of(self, model, collection):
+        return [obj for obj in collection if isinstance(obj, model)]
+
+
+def _apply_row(row, chunk, phone_owner, name_owner, states, user, now):
+    """Применить строку к состоянию. Возвращает 'created' или 'updated'."""
+    client_id = phone_owner.get(row.phone) if row.phone else None
+    if client_id is None and row.full_name:
+        client_id = name_owner.get(row.full_name)
+    state = states.get(client_id)
+
+    if state is not None:
+        client = state.client
+        if client.name != row.full_name and name_owner.get(client.name) == client.pk:
+            del name_owner[client.name]
+        client.name = row.full_name
+        client.first_name = row.first_name
+        client.last_name = row.last_name
+        client.middle_name = row.middle_name
+        client.email = row.email or client.email
+        client.modified_by = user
+        client.modified_at = now
+        chunk.change(client)
+        result = 'updated'
+    else:
+        client = Client(
+            client_type=row.client_type,
+            name=row.full_name,
+            first_name=row.first_name,
+            last_name=row.last_name,
+            middle_name=row.middle_name,
+            email=row.email or None,
+            created_by=user,
+            modified_by=user,
+        )
+        state = states[client.pk] = _ClientState(client)
+        chunk.add(client)
+        result = 'created'
+    chunk.touched.add(client.pk)
+    if row.full_name:
+        name_owner.setdefault(row.full_name, client.pk)
+
+    # Дополнительные данные по типу клиента из строки
+    if row.client_type == 'individual':
+        if state.individual is not None:
+            state.individual.first_name = row.first_name
+            state.individual.last_name = row.last_name
+            state.individual.middle_name = row.middle_name or None
+            chunk.change(state.individual)
+        else:
+            state.individual = IndividualClientData(
+                client_id=client.pk,
+                first_name=row.first_name,
+                last_name=row.last_name,
+                middle_name=row.middle_name or None,
+            )
+            chunk.add(state.individual)
+    else:
+        if state.legal is not None:
+            state.legal.company_name = row.full_name
+            chunk.change(state.legal)
+        else:
+            state.legal = LegalEntityClientData(client_id=client.pk, company_name=row.full_name)
+            chunk.add(state.legal)
+
+    # Телефоны: основной — только для нового клиента, дополнительный — если его ещё нет
+    if result == 'created' and row.phone:
+        chunk.add(ClientPhone(
+            client_id=client.pk, phone=row.phone, is_primary=True,
+            created_by=user, modified_by=user,
+        ))
+        state.phones.add(row.phone)
+        phone_owner.setdefault(row.phone, client.pk)
+    if row.phone2 and row.phone2 not in state.phones:
+        chunk.add(ClientPhone(
+            client_id=client.pk, phone=row.phone2, is_primary=False,
+            description='Дополнительный номер',
+            created_by=user, modified_by=user,
+        ))
+        state.phones.add(row.phone2)
+        phone_owner.setdefault(row.phone2, client.pk)
+
+    if row.city:
+        if state.address is not None:
+            state.address.city = row.city
+            chunk.change(state.address)
+        else:
+            state.address = ClientAddress(
+                client_id=client.pk, city=row.city, address=None, comment=None, is_primary=True
+            )
+            chunk.add(state.address)
+    return result
+
+
+def _update_rows(model, objs, fields):
+    """
+    UPDATE по первичному ключу через executemany: одна подготовленная
+    команда на все строки (bulk_update строит CASE WHEN на каждое значение,
+    что на десятках тысяч строк дороже самой записи).
+    """
+    fields = [model._meta.get_field(name) for name in fields]
+    pk = model._meta.pk
+    quote = connection.ops.quote_name
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        quote(model._meta.db_table),
+        ', '.join(f'{quote(field.column)} = %s' for field in fields),
+        quote(pk.column),
+    )
+    params = [
+        [field.get_db_prep_save(getattr(obj, field.attname), connection) for field in fields]
+        + [pk.get_db_prep_save(obj.pk, connection)]
+        for obj in objs
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+@write_transaction
+def _write_chunk(chunk):
+    """Записать порцию одной транзакцией и обновить производные данные."""
+    # Порядок важен: сначала клиенты, затем зависимые записи
+    for model in (Client, IndividualClientData, LegalEntityClientData,
+                  ClientPhone, ClientAddress):
+        objs = chunk.of(model, chunk.created)
+        if objs:
+            model.objects.bulk_create(objs)
+    updates = list(chunk.updated.values())
+    for model, fields in (
+        (Client, CLIENT_UPDATE_FIELDS),
+        (IndividualClientData, ['first_name', 'last_name', 'middle_name']),
+        (LegalEntityClientData, ['company_name']),
+        (ClientAddress, ['city']),
+    ):
+        objs = chunk.of(model, updates)
+        if objs:
+            _update_rows(model, objs, fields)
+    # Пакетная запись не отправляет сигналы — производные данные пересчитываются явно
+    refresh_primary_contacts(chunk.touched)
+    reindex_clients(chunk.touched)
+
+
+def _forget_chunk(chunk, phone_owner, name_owner, states):
+    """
+    Откатить в памяти порцию, запись которой не удалась: новых клиентов
+    убрать из словарей, у существующих — забыть созданные в порции записи.
+    """
+    failed = {obj.pk for obj in chunk.of(Client, chunk.created)}
+    for owner in (phone_owner, name_owner):
+        for key in [key for key, client_id in owner.items() if client_id in failed]:
+            del owner[key]
+    for client_id in failed:
+        states.pop(client_id, None)
+
+    created = {id(obj) for obj in chunk.created}
+    for client_id in chunk.touched - failed:
+        state = states[client_id]
+        for attr in ('individual', 'legal', 'address'):
+            if id(getattr(state, attr)) in created:
+                setattr(state, attr, None)
+    for phone in chunk.of(ClientPhone, chunk.created):
+        state = states.get(phone.client_id)
+        if state is not None:
+            state.phones.discard(phone.phone)
+
+
+def import_clients(frames, user, chunk_size=CHUNK_SIZE, progress=None, total=None):
+    """
+    Импортировать клиентов из порций файла (DataFrame с колонками шаблона,
+    см. template_columns и apps.imports.excel.iter_frames). Порции
+    обрабатываются по очереди, в памяти держится одна и словари соответствия.
+    progress(processed, total) вызывается после каждой порции.
+    Возвращает словарь счётчиков, ошибок и времени этапов.
+    """
+    timings = _Timings()
+    phone_owner, name_owner, states = {}, {}, {}
+    queried = {'phone': set(), 'name': set()}
+    errors = []
+    created = updated = processed = empty_rows = invalid_type = 0
+    now = timezone.now()
+
+    frames = iter(frames)
+    while True:
+        with timings.stage('read'):
+            df = next(frames, None)
+        if df is None:
+            break
+        with timings.stage('normalize'):
+            data, counters, frame_errors = normalize_frame(df)
+        errors.extend(frame_errors)
+        empty_rows += counters['empty_rows']
+        invalid_type += counters['invalid_type']
+        with timings.stage('preload'):
+            _preload(data, phone_owner, name_owner, states, queried)
+
+        rows = list(data.itertuples(index=False))
+        for start in range(0, len(rows), chunk_size):
+            part = rows[start:start + chunk_size]
+            chunk = _Chunk()
+            chunk_created = chunk_updated = 0
+            with timings.stage('apply'):
+                for row in part:
+                    if _apply_row(row, chunk, phone_owner, name_owner, states, user, now) == 'created':
+                        chunk_created += 1
+                    else:
+                        chunk_updated += 1
+            try:
+                with timings.stage('write'):
+                    _write_chunk(chunk)
+            except Exception as e:
+                errors.append(
+                    f'Строки {part[0].row_number}–{part[-1].row_number}: {e}'
+                )
+                _forget_chunk(chunk, phone_owner, name_owner, states)
+            else:
+                created += chunk_created
+                updated += chunk_updated
+
+        processed += len(df)
+        if progress:
+            progress(processed, max(total or 0, processed))
+
+    if created or updated:
+        clients_imported.send(sender=Client, created=created, updated=updated)
+
+    return {
+        'created': created,
+        'updated': updated,
+        'imported': created + updated,
+        # Пустые, с неверным типом, с ошибками проверки и из неудавшихся порций
+        'skipped': processed - created - updated,
+        'empty_rows': empty_rows,
+        'invalid_type': invalid_type,
+        'errors': errors,
+        'timings': dict(timings),
+    }
+
+
+def run_import_job(job, progress):
+    """Исполнитель фонового задания импорта клиентов (см. apps.imports)."""
+    from apps.accounts.models import User
+    from apps.imports.services import job_file_path
+
+    # Как при синхронном импорте: изменения записываются от имени администратора
+    user = User.objects.filter(is_superuser=True).first() or job.created_by
+    with open_sheet(job_file_path(job)) as sheet:
+        columns = template_columns(sheet)
+        missing = missing_columns(columns)
+        if missing:
+            raise ValueError(f'Отсутствуют обязательные колонки: {", ".join(missing)}')
+        return import_clients(
+            iter_frames(sheet, columns, first_row=DATA_ROW), user,
+            progress=progress, total=estimated_rows(sheet, DATA_ROW),
+        )
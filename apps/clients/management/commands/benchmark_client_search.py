@@ -0,0 +1,84 @@
+import random
+import sqlite3
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.clients import search
+
+LAST_NAMES = ['иванов', 'петров', 'сидоров', 'ахметов', 'нурланов', 'касымов', 'ким', 'смирнов']
+FIRST_NAMES = ['иван', 'петр', 'нурлан', 'айгерим', 'динара', 'ержан', 'ольга', 'марат']
+LETTERS = 'abcehkmoptx'
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк поиска клиентов (FTS5, триграммы) на синтетическом индексе '
+        'в памяти, без обращения к БД проекта'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1_000_000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=10)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(42)
+        db = sqlite3.connect(':memory:')
+        db.execute(
+            f"CREATE VIRTUAL TABLE {search.FTS_TABLE} USING fts5(document, tokenize='trigram')"
+        )
+
+        started = time.perf_counter()
+        samples = []
+        batch = []
+        for i in range(options['clients']):
+            doc = self._document(rnd)
+            batch.append((doc,))
+            if i % 5000 == 0:
+                samples.append(doc.split())
+            if len(batch) >= 10000:
+                db.executemany(f'INSERT INTO {search.FTS_TABLE}(document) VALUES (?)', batch)
+                batch = []
+        if batch:
+            db.executemany(f'INSERT INTO {search.FTS_TABLE}(document) VALUES (?)', batch)
+        db.execute(f"INSERT INTO {search.FTS_TABLE}({search.FTS_TABLE}) VALUES ('optimize')")
+        self.stdout.write(
+            f'Индекс: {options["clients"]} клиентов за {time.perf_counter() - started:.1f} с'
+        )
+
+        kinds = {
+            'Телефон (7 цифр)': lambda words: words[2][-7:],
+            'ИИН (6 цифр)': lambda words: words[3][:6],
+            'Госномер': lambda words: words[4],
+            'Фамилия + имя': lambda words: f'{words[0]} {words[1][:3]}',
+            'Фамилия': lambda words: words[0],
+        }
+
+        def execute(sql, params):
+            return db.execute(sql.replace('%s', '?'), params).fetchall()
+
+        for title, make_query in kinds.items():
+            timings = []
+            for _ in range(options['queries']):
+                terms = search.query_terms(make_query(rnd.choice(samples)))
+                t0 = time.perf_counter()
+                search.ranked_rowids(execute, terms, options['limit'])
+                timings.append((time.perf_counter() - t0) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'{title}: медиана {statistics.median(timings):.2f} мс, '
+                f'p95 {timings[int(len(timings) * 0.95) - 1]:.2f} мс'
+            )
+
+    @staticmethod
+    def _document(rnd):
+        phone = '770' + ''.join(rnd.choice('0123456789') for _ in range(8))
+        iin = ''.join(rnd.choice('0123456789') for _ in range(12))
+        plate = (
+            f'{rnd.randint(100, 999)}'
+            f'{"".join(rnd.choice(LETTERS) for _ in range(3))}'
+            f'{rnd.randint(1, 17):02d}'
+        )
+        return f'{rnd.choice(LAST_NAMES)} {rnd.choice(FIRST_NAMES)} {phone} {iin} {plate}'
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.clients.search import FTS_TABLE, fts_enabled, reindex_clients
+
+
+class Command(BaseCommand):
+    help = 'Полностью пересобрать поисковый индекс клиентов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = reindex_clients(chunk_size=options['chunk_size'])
+        if fts_enabled():
+            # Сжатие FTS5-индекса после массовой перезаписи
+            with connection.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано клиентов: {total}'))
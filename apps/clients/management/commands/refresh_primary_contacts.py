@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.clients.services import refresh_primary_contacts
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать денормализованные основной телефон и город клиентов'
+
+    def handle(self, *args, **options):
+        updated = refresh_primary_contacts()
+        self.stdout.write(self.style.SUCCESS(f'Обновлено клиентов: {updated}'))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:54
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_primary_contacts(apps, schema_editor):
+    """Начальное заполнение основных телефона и города одним UPDATE."""
+    Client = apps.get_model('clients', 'Client')
+    ClientPhone = apps.get_model('clients', 'ClientPhone')
+    ClientAddress = apps.get_model('clients', 'ClientAddress')
+    Client.objects.update(
+        primary_phone=Subquery(
+            ClientPhone.objects.filter(client=OuterRef('pk'))
+            .order_by('-is_primary', 'id').values('phone')[:1]
+        ),
+        primary_city=Subquery(
+            ClientAddress.objects.filter(client=OuterRef('pk'))
+            .order_by('-is_primary', 'id').values('city')[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_alter_clientphone_phone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='primary_city',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100, null=True, verbose_name='Основной город'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='primary_phone',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20, null=True, verbose_name='Основной телефон'),
+        ),
+        migrations.RunPython(fill_primary_contacts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FTS_SQL = [
+    "CREATE VIRTUAL TABLE client_search_fts USING fts5("
+    "document, content='client_search', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER client_search_ai AFTER INSERT ON client_search BEGIN "
+    "INSERT INTO client_search_fts(rowid, document) VALUES (new.id, new.document); END",
+    "CREATE TRIGGER client_search_ad AFTER DELETE ON client_search BEGIN "
+    "INSERT INTO client_search_fts(client_search_fts, rowid, document) "
+    "VALUES ('delete', old.id, old.document); END",
+    "CREATE TRIGGER client_search_au AFTER UPDATE ON client_search BEGIN "
+    "INSERT INTO client_search_fts(client_search_fts, rowid, document) "
+    "VALUES ('delete', old.id, old.document); "
+    "INSERT INTO client_search_fts(rowid, document) VALUES (new.id, new.document); END",
+]
+
+DROP_FTS_SQL = [
+    'DROP TRIGGER IF EXISTS client_search_au',
+    'DROP TRIGGER IF EXISTS client_search_ad',
+    'DROP TRIGGER IF EXISTS client_search_ai',
+    'DROP TABLE IF EXISTS client_search_fts',
+]
+
+
+def create_fts(apps, schema_editor):
+    """FTS5-индекс (триграммы) над client_search — только для SQLite."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FTS_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_FTS_SQL:
+        schema_editor.execute(sql)
+
+
+def fill_search_documents(apps, schema_editor):
+    """Начальное построение поисковых документов по существующим клиентам."""
+    from apps.clients.search import reindex_clients
+    reindex_clients(registry=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0003_client_primary_contacts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document', models.TextField(verbose_name='Документ')),
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='clients.client', verbose_name='Клиент')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ клиента',
+                'verbose_name_plural': 'Поисковые документы клиентов',
+                'db_table': 'client_search',
+            },
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:10
+
+from django.db import migrations
+
+from apps.core.postgres import create_trigram_indexes, drop_trigram_indexes
+
+# GIN-индексы pg_trgm для поиска icontains/contains (только PostgreSQL):
+# (модель, поле, имя индекса, без учёта регистра)
+TRIGRAM_INDEXES = [
+    ('Client', 'name', 'clients_name_trgm', True),
+    ('ClientPhone', 'phone', 'client_phones_phone_trgm', False),
+    ('ClientSearchDocument', 'document', 'client_search_document_trgm', False),
+]
+
+
+def create_indexes(apps, schema_editor):
+    create_trigram_indexes(apps, schema_editor, 'clients', TRIGRAM_INDEXES)
+
+
+def drop_indexes(apps, schema_editor):
+    drop_trigram_indexes(apps, schema_editor, 'clients', TRIGRAM_INDEXES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0004_client_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
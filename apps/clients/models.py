@@ -29,6 +29,16 @@ class Client(models.Model):
         max_length=100, null=True, blank=True, verbose_name='Отчество'
     )
     email = models.EmailField(blank=True, null=True, verbose_name='Email')
+    # Денормализованные основной телефон и город (поддерживаются сигналами
+    # ClientPhone/ClientAddress) — для сортировки и поиска в списке клиентов
+    primary_phone = models.CharField(
+        max_length=20, null=True, blank=True, editable=False, db_index=True,
+        verbose_name='Основной телефон'
+    )
+    primary_city = models.CharField(
+        max_length=100, null=True, blank=True, editable=False, db_index=True,
+        verbose_name='Основной город'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(
@@ -42,10 +52,9 @@ class Client(models.Model):
 
     def get_primary_phone_number(self):
         """Возвращает номер основного телефона без кода страны (+7)"""
-        phone = self.phones.filter(is_primary=True).first()
-        if not phone or not phone.phone:
+        p = self.primary_phone
+        if not p:
             return ""
-        p = phone.phone
         return p[2:] if p.startswith('+7') and len(p) > 2 else p
 
     def __str__(self):
@@ -254,4 +263,25 @@ class ClientCar(models.Model):
     class Meta:
         db_table = 'client_cars'
         verbose_name = 'Автомобиль клиента'
-        verbose_name_plural = 'Автомобили клиентов'
\ No newline at end of file
+        verbose_name_plural = 'Автомобили клиентов'
+
+class ClientSearchDocument(models.Model):
+    """
+    Нормализованный поисковый документ клиента (см. apps.clients.search).
+    На SQLite индексируется FTS5-таблицей client_search_fts.
+    """
+    client = models.OneToOneField(
+        Client,
+        on_delete=models.CASCADE,
+        related_name='search_document',
+        verbose_name='Клиент'
+    )
+    document = models.TextField(verbose_name='Документ')
+
+    def __str__(self):
+        return self.document[:100]
+
+    class Meta:
+        db_table = 'client_search'
+        verbose_name = 'Поисковый документ клиента'
+        verbose_name_plural = 'Поисковые документы клиентов'
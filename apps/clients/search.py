@@ -0,0 +1,201 @@
+"""
+Поисковый индекс клиентов.
+
+Для каждого клиента хранится нормализованный документ (ClientSearchDocument):
+ФИО/название, телефоны (только цифры), ИИН, БИН, название компании,
+госномера и VIN автомобилей. На SQLite поверх таблицы документов построен
+FTS5-индекс с триграммным токенизатором (client_search_fts), который
+синхронизируется триггерами и даёт ранжированный поиск по подстроке.
+На других СУБД используется поиск по подстроке в таблице документов.
+"""
+import re
+
+from django.apps import apps as global_apps
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'client_search_fts'
+DOCUMENT_TABLE = 'client_search'
+# Триграммный токенизатор ищет подстроки не короче 3 символов
+MIN_TERM_LENGTH = 3
+
+_TERM_RE = re.compile(r'[^\w]+', re.UNICODE)
+_PHONE_QUERY_RE = re.compile(r'^[\d\s()+\-]+$')
+
+
+def normalize(value):
+    """Нижний регистр, ё → е, без пунктуации."""
+    if not value:
+        return ''
+    return _TERM_RE.sub(' ', str(value).lower().replace('ё', 'е')).strip()
+
+
+def compact(value):
+    """Госномер/VIN/телефон без пробелов и разделителей."""
+    return normalize(value).replace(' ', '')
+
+
+def normalize_phone(value):
+    """Только цифры, 8XXXXXXXXXX → 7XXXXXXXXXX."""
+    digits = ''.join(ch for ch in str(value or '') if ch.isdigit())
+    if len(digits) == 11 and digits.startswith('8'):
+        digits = '7' + digits[1:]
+    return digits
+
+
+def build_documents(client_ids, registry=None):
+    """
+    Документы индекса для клиентов: {client_id: текст}.
+    registry — реестр моделей (в миграциях передаётся исторический).
+    """
+    registry = registry or global_apps
+    Client = registry.get_model('clients', 'Client')
+    parts = {
+        pk: [normalize(name)]
+        for pk, name in Client.objects.filter(pk__in=client_ids).values_list('pk', 'name')
+    }
+    if not parts:
+        return {}
+    ids = list(parts)
+
+    def collect(model_name, *fields):
+        model = registry.get_model('clients', model_name)
+        return model.objects.filter(client_id__in=ids).values_list('client_id', *fields)
+
+    for client_id, first, last, middle, iin in collect(
+            'IndividualClientData', 'first_name', 'last_name', 'middle_name', 'iin'):
+        parts[client_id] += [normalize(last), normalize(first), normalize(middle), compact(iin)]
+    for client_id, company, bin_, tax in collect(
+            'LegalEntityClientData', 'company_name', 'bin', 'tax_number'):
+        parts[client_id] += [normalize(company), compact(bin_), compact(tax)]
+    for client_id, phone in collect('ClientPhone', 'phone'):
+        parts[client_id].append(normalize_phone(phone))
+    for client_id, plate, vin in collect('ClientCar', 'license_plate', 'vin_number'):
+        parts[client_id] += [compact(plate), compact(vin)]
+
+    documents = {}
+    for pk, values in parts.items():
+        # Порядок слов сохраняется, повторы (ФИО в name и в данных физлица) убираются
+        words = (word for value in values for word in value.split())
+        documents[pk] = ' '.join(dict.fromkeys(words))
+    return documents
+
+
+def reindex_clients(client_ids=None, chunk_size=1000, registry=None):
+    """Пересобрать документы индекса (None — все клиенты). Возвращает число документов."""
+    registry = registry or global_apps
+    Client = registry.get_model('clients', 'Client')
+    Document = registry.get_model('clients', 'ClientSearchDocument')
+    if client_ids is None:
+        client_ids = Client.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size)
+    total = 0
+    chunk = []
+    for client_id in client_ids:
+        chunk.append(client_id)
+        if len(chunk) >= chunk_size:
+            total += _write_documents(Document, chunk, registry)
+            chunk = []
+    if chunk:
+        total += _write_documents(Document, chunk, registry)
+    return total
+
+
+def _write_documents(Document, client_ids, registry):
+    documents = build_documents(client_ids, registry)
+    with transaction.atomic():
+        Document.objects.filter(client_id__in=client_ids).delete()
+        Document.objects.bulk_create(
+            [Document(client_id=pk, document=text) for pk, text in documents.items()],
+            batch_size=500,
+        )
+    return len(documents)
+
+
+def fts_enabled():
+    """FTS5-индекс создаётся миграцией только на SQLite."""
+    return connection.vendor == 'sqlite'
+
+
+def query_terms(query):
+    """
+    Термы поискового запроса. Номер телефона (цифры, пробелы, скобки, +, -)
+    склеивается в один терм; ведущая 8 и в неполном номере заменяется на 7,
+    как в индексе. Термы короче MIN_TERM_LENGTH отбрасываются.
+    """
+    query = (query or '').strip()
+    if _PHONE_QUERY_RE.match(query):
+        digits = normalize_phone(query)
+        if digits.startswith('8'):
+            digits = '7' + digits[1:]
+        terms = [digits]
+    else:
+        terms = normalize(query).split()
+    return [t for t in dict.fromkeys(terms) if len(t) >= MIN_TERM_LENGTH]
+
+
+def _match_expression(terms):
+    # Каждый терм — фраза в кавычках; термы содержат только буквы и цифры
+    return ' AND '.join(f'"{term}"' for term in terms)
+
+
+def ranked_rowids(execute, terms, limit):
+    """
+    rowid документов FTS-индекса, лучшие совпадения (bm25) первыми.
+    execute(sql, params) -> список строк (курсор Django или sqlite3).
+
+    Ранжируется всё множество совпадений: FTS5 считает rank внутри
+    запроса и с LIMIT держит только limit лучших строк.
+    """
+    rows = execute(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+        f'ORDER BY rank LIMIT %s',
+        [_match_expression(terms), limit],
+    )
+    return [rowid for rowid, in rows]
+
+
+def search(query, limit=10):
+    """
+    Ранжированный поиск: список ID клиентов, лучшие совпадения первыми.
+    Пустой список, если в запросе нет термов длиной от MIN_TERM_LENGTH.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+    Document = global_apps.get_model('clients', 'ClientSearchDocument')
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            def execute(sql, params):
+                cursor.execute(sql, params)
+                return cursor.fetchall()
+            rowids = ranked_rowids(execute, terms, limit)
+        client_ids = dict(
+            Document.objects.filter(id__in=rowids).values_list('id', 'client_id')
+        )
+        return [client_ids[rowid] for rowid in rowids if rowid in client_ids]
+
+    qs = Document.objects.all()
+    for term in terms:
+        qs = qs.filter(document__contains=term)
+    return list(qs.values_list('client_id', flat=True)[:limit])
+
+
+def matching_client_ids(query):
+    """
+    Подзапрос ID всех подходящих клиентов для фильтра pk__in (без ранжирования).
+    None, если в запросе нет пригодных термов.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return None
+    if fts_enabled():
+        return RawSQL(
+            f'SELECT d.client_id FROM {FTS_TABLE} JOIN {DOCUMENT_TABLE} d '
+            f'ON d.id = {FTS_TABLE}.rowid WHERE {FTS_TABLE} MATCH %s',
+            [_match_expression(terms)],
+        )
+    Document = global_apps.get_model('clients', 'ClientSearchDocument')
+    qs = Document.objects.all()
+    for term in terms:
+        qs = qs.filter(document__contains=term)
+    return qs.values('client_id')
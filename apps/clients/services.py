@@ -0,0 +1,81 @@
+import threading
+from functools import partial
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import Client, ClientAddress, ClientPhone
+
+_pending = threading.local()
+
+
+def primary_contacts_updates():
+    """
+    Выражения для пересчёта основных телефона и города клиента:
+    запись с is_primary=True, иначе первая добавленная.
+    """
+    phone = (
+        ClientPhone.objects.filter(client=OuterRef('pk'))
+        .order_by('-is_primary', 'id')
+        .values('phone')[:1]
+    )
+    city = (
+        ClientAddress.objects.filter(client=OuterRef('pk'))
+        .order_by('-is_primary', 'id')
+        .values('city')[:1]
+    )
+    return {'primary_phone': Subquery(phone), 'primary_city': Subquery(city)}
+
+
+def refresh_primary_contacts(client_ids=None):
+    """Пересчитать primary_phone/primary_city одним UPDATE (None — все клиенты)."""
+    qs = Client.objects.all()
+    if client_ids is not None:
+        client_ids = list(client_ids)
+        if not client_ids:
+            return 0
+        qs = qs.filter(pk__in=client_ids)
+    return qs.update(**primary_contacts_updates())
+
+
+def schedule_primary_contacts_refresh(client_id):
+    """Пересчитать основные контакты клиента (после фиксации транзакции)."""
+    _schedule_refresh(refresh_primary_contacts, client_id)
+
+
+def schedule_search_reindex(client_id):
+    """Обновить поисковый документ клиента (после фиксации транзакции)."""
+    from .search import reindex_clients
+    _schedule_refresh(reindex_clients, client_id)
+
+
+def _schedule_refresh(func, client_id):
+    """
+    Вызвать func(client_ids). Внутри транзакции вызов откладывается до
+    фиксации: все изменения одной транзакции (редактирование, импорт)
+    обрабатываются одним вызовом.
+    """
+    if not connection.in_atomic_block:
+        func([client_id])
+        return
+    _pending_refreshes().setdefault(func, set()).add(client_id)
+    # Колбэк на каждый вызов: колбэки откаченной точки сохранения Django
+    # выбрасывает, а накопленные ID должны обработаться. Первый выполненный
+    # колбэк обрабатывает все ID, остальные ничего не делают.
+    transaction.on_commit(partial(_run_pending_refresh, func))
+
+
+def _pending_refreshes():
+    """
+    Отложенные вызовы текущего потока: func → ID клиентов. ID откатившейся
+    транзакции обработаются при следующей фиксации (пересчёт идемпотентен).
+    """
+    if not hasattr(_pending, 'refreshes'):
+        _pending.refreshes = {}
+    return _pending.refreshes
+
+
+def _run_pending_refresh(func):
+    client_ids = _pending_refreshes().pop(func, None)
+    if client_ids:
+        func(client_ids)
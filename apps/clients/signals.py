@@ -0,0 +1,58 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from apps.core.cache import CLIENTS, invalidate_tags
+
+from .models import (
+    Client,
+    ClientAddress,
+    ClientCar,
+    ClientPhone,
+    IndividualClientData,
+    LegalEntityClientData,
+)
+from .services import schedule_primary_contacts_refresh, schedule_search_reindex
+
+# Пакетный импорт завершён (bulk_create/bulk_update не отправляют post_save).
+# Аргументы: created, updated — количество клиентов.
+clients_imported = Signal()
+
+
+@receiver(post_save, sender=ClientPhone)
+@receiver(post_delete, sender=ClientPhone)
+@receiver(post_save, sender=ClientAddress)
+@receiver(post_delete, sender=ClientAddress)
+def client_contacts_changed(sender, instance, **kwargs):
+    """Телефон или адрес изменён — пересчитать основные контакты клиента."""
+    schedule_primary_contacts_refresh(instance.client_id)
+
+
+@receiver(post_save, sender=Client)
+def client_saved(sender, instance, **kwargs):
+    """Название клиента могло измениться — обновить поисковый документ."""
+    schedule_search_reindex(instance.pk)
+
+
+@receiver(post_save, sender=ClientPhone)
+@receiver(post_delete, sender=ClientPhone)
+@receiver(post_save, sender=ClientCar)
+@receiver(post_delete, sender=ClientCar)
+@receiver(post_save, sender=IndividualClientData)
+@receiver(post_delete, sender=IndividualClientData)
+@receiver(post_save, sender=LegalEntityClientData)
+@receiver(post_delete, sender=LegalEntityClientData)
+def client_search_data_changed(sender, instance, **kwargs):
+    """Изменились данные, входящие в поисковый документ клиента."""
+    schedule_search_reindex(instance.client_id)
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+@receiver(post_save, sender=ClientPhone)
+@receiver(post_delete, sender=ClientPhone)
+@receiver(post_save, sender=ClientAddress)
+@receiver(post_delete, sender=ClientAddress)
+@receiver(clients_imported)
+def clients_cache_changed(sender, **kwargs):
+    """Клиенты или их контакты изменились — сбросить кэш с тегом clients."""
+    invalidate_tags(CLIENTS)
@@ -1,3 +1,160 @@
-from django.test import TestCase
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
 
-# Create your tests here.
+from apps.core.testing import local_cache
+
+from . import importer, search
+from .models import (
+    Client,
+    ClientAddress,
+    ClientPhone,
+    ClientSearchDocument,
+    IndividualClientData,
+    LegalEntityClientData,
+)
+
+
+def clients_frame(*rows, start=0):
+    """Порция файла импорта: строки (телефон, тип, ФИО/компания[, город])."""
+    records = [
+        {'Телефон': phone, 'Тип клиента': kind, 'ФИО/Компания': name, 'Город': city[0] if city else ''}
+        for phone, kind, name, *city in rows
+    ]
+    return pd.DataFrame(records, index=pd.RangeIndex(start, start + len(records)))
+
+
+@local_cache
+class BulkClientImportTests(TestCase):
+    """Пакетный импорт клиентов из Excel."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email='imp@x.kz', username='imp@x.kz', password='pw'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def run_import(self, *frames, **kwargs):
+        return importer.import_clients(frames, self.user, **kwargs)
+
+    def test_creates_clients_with_related_data(self):
+        result = self.run_import(clients_frame(
+            ('8 701 111 22 33', 'Физ. лицо', 'Иванов Иван', 'Алматы'),
+            ('7012223344', 'Юр. лицо', 'ТОО Ромашка'),
+        ))
+        self.assertEqual((result['created'], result['updated'], result['skipped']), (2, 0, 0))
+        person = Client.objects.get(name='Иванов Иван')
+        self.assertEqual(person.client_type, 'individual')
+        # Основные контакты и поисковый документ пересчитаны вместе с порцией
+        self.assertEqual((person.primary_phone, person.primary_city), ('+77011112233', 'Алматы'))
+        self.assertTrue(IndividualClientData.objects.filter(client=person).exists())
+        self.assertIn('77011112233', ClientSearchDocument.objects.get(client=person).document)
+        company = Client.objects.get(name='ТОО Ромашка')
+        self.assertEqual(LegalEntityClientData.objects.get(client=company).company_name, 'ТОО Ромашка')
+        self.assertEqual(company.primary_phone, '+77012223344')
+
+    def test_repeated_phone_updates_same_client(self):
+        result = self.run_import(clients_frame(
+            ('87011112233', 'Физ. лицо', 'Иванов Иван'),
+            ('+7 (701) 111-22-33', 'Физ. лицо', 'Иванов Иван Петрович', 'Астана'),
+        ))
+        self.assertEqual((result['created'], result['updated']), (1, 1))
+        client = Client.objects.get()
+        self.assertEqual(client.name, 'Иванов Иван Петрович')
+        self.assertEqual(ClientPhone.objects.filter(client=client).count(), 1)
+        self.assertEqual(ClientAddress.objects.get(client=client).city, 'Астана')
+
+    def test_existing_client_matched_by_phone_and_name(self):
+        by_phone = Client.objects.create(client_type='individual', name='Старое имя')
+        ClientPhone.objects.create(client=by_phone, phone='+77015556677', is_primary=True)
+        by_name = Client.objects.create(client_type='legal_entity', name='ТОО Лютик')
+        result = self.run_import(clients_frame(
+            ('87015556677', 'Физ. лицо', 'Новое имя'),
+            ('', 'Юр. лицо', 'ТОО Лютик'),
+        ))
+        self.assertEqual((result['created'], result['updated']), (0, 2))
+        by_phone.refresh_from_db()
+        self.assertEqual(by_phone.name, 'Новое имя')
+        self.assertEqual(Client.objects.filter(name='ТОО Лютик').get(), by_name)
+
+    def test_skipped_rows(self):
+        result = self.run_import(clients_frame(
+            ('', '', ''),
+            ('87010000001', 'Неизвестно', 'Кто-то'),
+            ('87010000002', 'Физ. лицо', 'Я' * 300),
+            ('87010000003', 'Физ. лицо', 'Годный'),
+        ))
+        self.assertEqual(result['created'], 1)
+        self.assertEqual(result['skipped'], 3)
+        self.assertEqual((result['empty_rows'], result['invalid_type']), (1, 1))
+        self.assertEqual(len(result['errors']), 1)
+        self.assertIn('Строка 4', result['errors'][0])
+
+    def test_result_does_not_depend_on_frame_size(self):
+        rows = [
+            ('87010000001', 'Физ. лицо', 'Клиент А'),
+            ('87010000002', 'Физ. лицо', 'Клиент Б'),
+            ('87010000001', 'Физ. лицо', 'Клиент В'),
+            ('87010000003', 'Физ. лицо', 'Клиент А'),
+            ('87010000004', 'Физ. лицо', 'Клиент В'),
+        ]
+        with self.subTest('одной порцией'):
+            single = self.run_import(clients_frame(*rows), chunk_size=2)
+            expected = sorted(Client.objects.values_list('name', 'primary_phone'))
+        Client.objects.all().delete()
+        with self.subTest('порциями по 2'):
+            frames = [clients_frame(*rows[i:i + 2], start=i) for i in range(0, len(rows), 2)]
+            split = self.run_import(*frames, chunk_size=2)
+            self.assertEqual(sorted(Client.objects.values_list('name', 'primary_phone')), expected)
+        self.assertEqual(
+            (single['created'], single['updated']), (split['created'], split['updated'])
+        )
+
+
+class QueryTermsTests(SimpleTestCase):
+    """Разбор поискового запроса на термы."""
+
+    def test_words(self):
+        self.assertEqual(search.query_terms('Пётр  ИВАНОВ, ив'), ['петр', 'иванов'])
+
+    def test_full_phone(self):
+        self.assertEqual(search.query_terms('8 (701) 123-45-67'), ['77011234567'])
+
+    def test_partial_phone_leading_eight(self):
+        self.assertEqual(search.query_terms('8 707 12'), ['770712'])
+        self.assertEqual(search.query_terms('+7 707'), ['7707'])
+        self.assertEqual(search.query_terms('4567'), ['4567'])
+
+
+@local_cache
+class ClientSearchTests(TestCase):
+    """Ранжированный поиск по FTS-индексу документов."""
+
+    def setUp(self):
+        cache.clear()
+
+    def add_documents(self, *documents):
+        clients = Client.objects.bulk_create([
+            Client(client_type='individual', name=f'Клиент {i}') for i in range(len(documents))
+        ])
+        ClientSearchDocument.objects.bulk_create([
+            ClientSearchDocument(client=client, document=document)
+            for client, document in zip(clients, documents)
+        ])
+        return [client.pk for client in clients]
+
+    def test_best_match_outside_first_candidates(self):
+        filler = ' '.join(f'слово{i}' for i in range(20))
+        ids = self.add_documents(*[f'петров {filler}'] * 600, 'петров')
+        result = search.search('петров', limit=5)
+        self.assertEqual(len(result), 5)
+        self.assertEqual(result[0], ids[-1])
+
+    def test_partial_phone_with_eight(self):
+        ids = self.add_documents('иванов иван 77071234567', 'петров петр 77011112233')
+        self.assertEqual(search.search('8 707 123'), [ids[0]])
+        self.assertEqual(search.search('ива'), [ids[0]])
@@ -5,6 +5,7 @@ app_name = 'clients'
 
 urlpatterns = [
     path('', views.clients_list, name='clients_list'),
+    path('search/', views.client_typeahead, name='client_typeahead'),
     path('add/', views.add_client, name='add_client'),
     path('edit/<uuid:client_id>/', views.edit_client, name='edit_client'),
     path('delete/<uuid:client_id>/', views.delete_client, name='delete_client'),
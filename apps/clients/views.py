@@ -1,13 +1,11 @@
 import logging
-import pandas as pd
+import time
 from django.shortcuts import render, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.urls import reverse
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 from django.db import transaction
 from .models import (
     Client,
@@ -18,8 +16,12 @@ from .models import (
     LegalEntityClientData,
 )
 from .forms import IndividualClientForm, LegalEntityClientForm
+from . import importer as client_importer
+from . import search as client_search
 from apps.cities.models import City
-from apps.accounts.models import User
+from apps.imports.models import ImportJob
+from apps.imports.services import enqueue
+from apps.core.writes import coordinated_write
 
 # Настройка логгера
 logger = logging.getLogger('client')
@@ -34,8 +36,8 @@ def clients_list(request):
     # Маппинг полей для сортировки
     sort_mapping = {
         'name': 'name',
-        'phone': 'phones__phone',  # Сортировка по основному телефону
-        'city': 'addresses__city',  # Сортировка по основному городу
+        'phone': 'primary_phone',  # Сортировка по основному телефону
+        'city': 'primary_city',  # Сортировка по основному городу
         'email': 'email',
         'created_at': 'created_at',
     }
@@ -49,19 +51,18 @@ def clients_list(request):
     else:
         sort_field = f'-{sort_field}' if not sort_field.startswith('-') else sort_field
     
-    # Применяем сортировку с distinct для избежания дублирования
-    clients_qs = (Client.objects.select_related()
-                  .prefetch_related('phones', 'addresses')
-                  .distinct().order_by(sort_field))
+    # Основные телефон и город денормализованы в Client — одна таблица, без JOIN
+    clients_qs = Client.objects.order_by(sort_field)
     
-    # Поиск по имени и телефону
+    # Поиск по индексу: ФИО/название, телефоны, ИИН/БИН, госномера, VIN
     search_query = (request.GET.get('search') or '').strip()
     if search_query:
-        from django.db.models import Q
-        clients_qs = clients_qs.filter(
-            Q(name__icontains=search_query) |
-            Q(phones__phone__icontains=search_query)
-        ).distinct()
+        matching = client_search.matching_client_ids(search_query)
+        if matching is not None:
+            clients_qs = clients_qs.filter(pk__in=matching)
+        else:
+            # Слишком короткий запрос для индекса — только по имени
+            clients_qs = clients_qs.filter(name__icontains=search_query)
 
     # Пагинация
     try:
@@ -92,6 +93,40 @@ def clients_list(request):
     )
 
 @login_required(login_url='accounts:login')
+def client_typeahead(request):
+    """
+    Подсказки при вводе (AJAX): ранжированный поиск по индексу клиентов.
+    GET q — запрос (от 3 символов), limit — до 50 результатов.
+    """
+    started = time.perf_counter()
+    query = (request.GET.get('q') or '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+
+    ranked = client_search.search(query, limit=limit)
+    clients = Client.objects.only(
+        'id', 'name', 'client_type', 'primary_phone', 'primary_city'
+    ).in_bulk(ranked)
+    results = [
+        {
+            'id': str(client.pk),
+            'name': client.name,
+            'client_type': client.client_type,
+            'phone': client.primary_phone or '',
+            'city': client.primary_city or '',
+        }
+        for client in (clients.get(client_id) for client_id in ranked)
+        if client is not None
+    ]
+
+    response = JsonResponse({'results': results})
+    response['Server-Timing'] = f'search;dur={(time.perf_counter() - started) * 1000:.1f}'
+    return response
+
+@login_required(login_url='accounts:login')
+@coordinated_write
 def add_client(request):
     """Добавление нового клиента"""
     # Обработка AJAX запросов
@@ -370,6 +405,7 @@ def add_client(request):
     )
 
 @login_required(login_url='accounts:login')
+@coordinated_write
 def edit_client(request, client_id):
     """Редактирование клиента"""
     client = get_object_or_404(Client, id=client_id)
@@ -539,6 +575,7 @@ def edit_client(request, client_id):
     return render(request, 'clients/edit_client.html', context)
 
 @login_required(login_url='accounts:login')
+@coordinated_write
 def delete_client(request, client_id):
     """Удаление клиента"""
     client = get_object_or_404(Client, id=client_id)
@@ -568,6 +605,7 @@ def delete_client(request, client_id):
 
 
 @login_required(login_url='accounts:login')
+@coordinated_write
 def import_clients_excel(request):
     """Импорт клиентов из Excel файла"""
     if request.method != 'POST':
@@ -583,245 +621,27 @@ def import_clients_excel(request):
         return JsonResponse({'status': 'error', 'message': 'Поддерживаются только файлы Excel (.xlsx, .xls)'})
     
     try:
-        # Сохраняем файл временно
-        file_path = default_storage.save(f'temp/{excel_file.name}', ContentFile(excel_file.read()))
-        full_path = default_storage.path(file_path)
-        
-        # Читаем Excel файл
-        df = pd.read_excel(full_path)
-        
-        # Проверяем наличие необходимых колонок
-        required_columns = ['Телефон', 'Тип клиента', 'ФИО/Компания']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        # Проверяем наличие необходимых колонок (читается только заголовок)
+        missing_columns = client_importer.missing_columns(
+            client_importer.read_excel(excel_file, nrows=0)
+        )
         if missing_columns:
-            # Удаляем временный файл
-            default_storage.delete(file_path)
             return JsonResponse({
                 'status': 'error', 
                 'message': f'Отсутствуют обязательные колонки: {", ".join(missing_columns)}'
             })
+        excel_file.seek(0)
         
-        # Получаем системного пользователя
-        admin_user = User.objects.filter(is_superuser=True).first()
-        if not admin_user:
-            admin_user = request.user
-        
-        imported_count = 0
-        skipped_count = 0
-        errors = []
-        duplicate_names = 0
-        duplicate_phones = 0
-        empty_rows = 0
-        invalid_type = 0
-        
-        with transaction.atomic():
-            for index, row in df.iterrows():
-                try:
-                    # Получаем данные из строки
-                    phone = str(row.get('Телефон', '')).strip() if pd.notna(row.get('Телефон')) else ''
-                    phone2 = str(row.get('Телефон 2', '')).strip() if pd.notna(row.get('Телефон 2')) else ''
-                    email = str(row.get('Email', '')).strip() if pd.notna(row.get('Email')) else ''
-                    client_type_raw = str(row.get('Тип клиента', '')).strip() if pd.notna(row.get('Тип клиента')) else ''
-                    full_name = str(row.get('ФИО/Компания', '')).strip() if pd.notna(row.get('ФИО/Компания')) else ''
-                    last_name = str(row.get('Фамилия', '')).strip() if pd.notna(row.get('Фамилия')) else ''
-                    first_name = str(row.get('Имя', '')).strip() if pd.notna(row.get('Имя')) else ''
-                    middle_name = str(row.get('Отчество', '')).strip() if pd.notna(row.get('Отчество')) else ''
-                    city = str(row.get('Город', '')).strip() if pd.notna(row.get('Город')) else ''
-                    
-                    # Проверяем что строка не пустая
-                    if not phone and not full_name:
-                        empty_rows += 1
-                        skipped_count += 1
-                        continue
-                    
-                    # Определяем тип клиента
-                    if client_type_raw in ['Физическое лицо', 'Физ. лицо', 'Физическое', 'individual']:
-                        client_type = 'individual'
-                    elif client_type_raw in ['Юридическое лицо', 'Юр. лицо', 'Юридическое', 'legal_entity']:
-                        client_type = 'legal_entity'
-                    else:
-                        invalid_type += 1
-                        skipped_count += 1
-                        continue
-
-                    # Нормализуем телефон
-                    def normalize_phone(phone_str):
-                        if not phone_str:
-                            return None
-                        digits = ''.join(filter(str.isdigit, phone_str))
-                        if len(digits) == 10:
-                            return f"+7{digits}"
-                        elif len(digits) == 11 and digits.startswith('7'):
-                            return f"+{digits}"
-                        elif len(digits) == 11 and digits.startswith('8'):
-                            return f"+7{digits[1:]}"
-                        return None
-
-                    normalized_phone = normalize_phone(phone)
-                    normalized_phone2 = normalize_phone(phone2) if phone2 else None
-
-                    # Проверяем существующих клиентов по телефону
-                    existing_client = None
-                    if normalized_phone:
-                        existing_client = Client.objects.filter(phones__phone=normalized_phone).first()
-                    
-                    # Если клиент не найден по телефону, проверяем по имени
-                    if not existing_client and full_name:
-                        existing_client = Client.objects.filter(name=full_name).first()
-                    
-                    # Если клиент существует, обновляем его данные
-                    if existing_client:
-                        # Обновляем основные данные клиента
-                        existing_client.name = full_name
-                        existing_client.first_name = first_name
-                        existing_client.last_name = last_name
-                        existing_client.middle_name = middle_name
-                        existing_client.email = email if email else existing_client.email
-                        existing_client.modified_by = admin_user
-                        existing_client.save()
-                        
-                        # Обновляем дополнительные данные в зависимости от типа
-                        if client_type == 'individual':
-                            try:
-                                individual_data = existing_client.individual_data
-                                individual_data.first_name = first_name
-                                individual_data.last_name = last_name
-                                individual_data.middle_name = middle_name if middle_name else None
-                                individual_data.save()
-                            except:
-                                IndividualClientData.objects.create(
-                                    client=existing_client,
-                                    first_name=first_name,
-                                    last_name=last_name,
-                                    middle_name=middle_name if middle_name else None
-                                )
-                        else:  # legal_entity
-                            try:
-                                legal_data = existing_client.legal_entity_data
-                                legal_data.company_name = full_name
-                                legal_data.save()
-                            except:
-                                LegalEntityClientData.objects.create(
-                                    client=existing_client,
-                                    company_name=full_name
-                                )
-                        
-                        # Обновляем или добавляем дополнительные телефоны
-                        if normalized_phone2:
-                            phone2_obj, created = ClientPhone.objects.get_or_create(
-                                client=existing_client,
-                                phone=normalized_phone2,
-                                defaults={
-                                    'is_primary': False,
-                                    'description': "Дополнительный номер",
-                                    'created_by': admin_user,
-                                    'modified_by': admin_user
-                                }
-                            )
-                        
-                        # Обновляем или добавляем адрес/город
-                        if city:
-                            address_obj, created = ClientAddress.objects.get_or_create(
-                                client=existing_client,
-                                is_primary=True,
-                                defaults={
-                                    'city': city,
-                                    'address': None,
-                                    'comment': None
-                                }
-                            )
-                            if not created:
-                                address_obj.city = city
-                                address_obj.save()
-                        
-                        imported_count += 1
-                        continue
-
-                    # Создаем клиента
-                    client = Client.objects.create(
-                        client_type=client_type,
-                        name=full_name,
-                        first_name=first_name,
-                        last_name=last_name,
-                        middle_name=middle_name,
-                        email=email if email else None,
-                        created_by=admin_user,
-                        modified_by=admin_user
-                    )
-
-                    # Создаем дополнительные данные в зависимости от типа
-                    if client_type == 'individual':
-                        IndividualClientData.objects.create(
-                            client=client,
-                            first_name=first_name,
-                            last_name=last_name,
-                            middle_name=middle_name if middle_name else None
-                        )
-                    else:  # legal_entity
-                        LegalEntityClientData.objects.create(
-                            client=client,
-                            company_name=full_name
-                        )
-
-                    # Добавляем телефоны
-                    if normalized_phone:
-                        ClientPhone.objects.create(
-                            client=client,
-                            phone=normalized_phone,
-                            is_primary=True,
-                            created_by=admin_user,
-                            modified_by=admin_user
-                        )
-
-                    if normalized_phone2:
-                        ClientPhone.objects.create(
-                            client=client,
-                            phone=normalized_phone2,
-                            is_primary=False,
-                            description="Дополнительный номер",
-                            created_by=admin_user,
-                            modified_by=admin_user
-                        )
-
-                    # Добавляем адрес/город как primary адрес, если указан
-                    if city:
-                        ClientAddress.objects.create(
-                            client=client,
-                            city=city,
-                            address=None,
-                            comment=None,
-                            is_primary=True
-                        )
-
-                    imported_count += 1
-
-                except Exception as e:
-                    errors.append(f'Строка {index + 2}: {str(e)}')
-                    skipped_count += 1
-        
-        # Удаляем временный файл
-        default_storage.delete(file_path)
-        
-        # Формируем результат
-        result = {
-            'status': 'success',
-            'message': 'Импорт завершен',
-            'imported': imported_count,
-            'skipped': skipped_count,
-            'duplicate_names': duplicate_names,
-            'duplicate_phones': duplicate_phones,
-            'empty_rows': empty_rows,
-            'invalid_type': invalid_type,
-            'errors': errors[:10] if errors else []  # Показываем только первые 10 ошибок
-        }
-        
-        return JsonResponse(result)
+        # Импорт выполняется воркером run_jobs; клиент опрашивает прогресс
+        job = enqueue(ImportJob.KIND_CLIENTS, excel_file, request.user)
+        return JsonResponse({
+            'status': 'queued',
+            'message': 'Импорт поставлен в очередь',
+            'job_id': job.pk,
+            'progress_url': reverse('imports:job_status', args=[job.pk]),
+        })
         
     except Exception as e:
-        # Удаляем временный файл в случае ошибки
-        if 'file_path' in locals():
-            default_storage.delete(file_path)
-        
         logger.error(f'Ошибка импорта Excel: {str(e)}', exc_info=True)
         return JsonResponse({
             'status': 'error',
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.core'
+    verbose_name = 'Инфраструктура'
+
+    def ready(self):
+        """Подключение настройки соединений с БД и проверок конфигурации"""
+        import apps.core.checks  # noqa
+        import apps.core.signals  # noqa
@@ -0,0 +1,100 @@
+"""
+Инвалидация кэша по тегам.
+
+Тег — именованная версия в кэше ('orders', 'clients', 'products',
+'scope:42' — заказы ответственного 42). cache_tags(*tags) возвращает
+токен версий тегов, который входит в ключ кэша; invalidate_tags меняет
+версии, и все ключи с этими тегами перестают находиться (старые записи
+вытесняются по TTL). Теги сбрасывают сигналы моделей в orders, clients
+и products, поэтому закэшированные данные свежие без коротких TTL.
+
+Кэш общий для процессов только с CACHE_BACKEND=database или redis
+(см. settings). Сброс выполняется после коммита транзакции, иначе
+параллельный запрос успел бы закэшировать старые данные под новой версией.
+По той же причине данные, прочитанные с реплики, кэшируются с тегом
+replica: реплика могла ещё не получить запись, сбросившую теги.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.views.decorators.cache import cache_page
+
+from .routers import replica_configured
+
+TAG_KEY = 'tag:{}'
+
+# Все заказы (для отчётов без ограничения видимости)
+ORDERS = 'orders'
+# Пакетные изменения заказов, затронутые ответственные неизвестны
+ORDERS_BULK = 'orders:bulk'
+CLIENTS = 'clients'
+PRODUCTS = 'products'
+# Данные реплики (сбрасывает refresh_sqlite_replica после обновления копии)
+REPLICA_DATA = 'replica'
+
+
+def scope_tag(responsible_id):
+    return f'scope:{responsible_id}'
+
+
+def scope_tags(responsible_ids):
+    """Теги заказов области видимости (None — все заказы)."""
+    if responsible_ids is None:
+        return [ORDERS]
+    return [ORDERS_BULK, *(scope_tag(pk) for pk in sorted(set(responsible_ids)))]
+
+
+def replica_tags():
+    """Тег реплики для кэша данных, читаемых с неё (без реплики — пусто)."""
+    return [REPLICA_DATA] if replica_configured() else []
+
+
+def _initial_version():
+    # Версия от времени: если ключ тега вытеснен, старые записи не оживут
+    return time.time_ns() // 1000
+
+
+def cache_tags(*tags):
+    """Токен текущих версий тегов для ключа кэша."""
+    keys = [TAG_KEY.format(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # add: параллельный процесс мог уже создать тег
+            initial = _initial_version()
+            cache.add(key, initial, None)
+            versions[key] = cache.get(key, initial)
+    raw = ':'.join(f'{key}={versions[key]}' for key in keys)
+    return hashlib.md5(raw.encode()).hexdigest()[:16]
+
+
+def _bump(tags):
+    for tag in tags:
+        key = TAG_KEY.format(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def invalidate_tags(*tags):
+    """Сбросить теги после коммита текущей транзакции (вне транзакции — сразу)."""
+    tags = tuple(dict.fromkeys(tags))
+    transaction.on_commit(lambda: _bump(tags))
+
+
+def cache_page_tagged(timeout, tags):
+    """
+    cache_page, ключ которого включает версии тегов: tags(request) — список
+    тегов ответа. Ответ живёт timeout или до сброса любого из тегов.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key_prefix = cache_tags(*tags(request))
+            return cache_page(timeout, key_prefix=key_prefix)(view)(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,25 @@
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Сброс тегов (apps/core/cache.py) должен доходить до всех процессов:
+    с кэшем в памяти процесса изменения из других воркеров и команд
+    (run_jobs, refresh_sqlite_replica) не видны, отчёты отдаются устаревшими
+    до истечения TTL.
+    """
+    if not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache)):
+        return []
+    return [
+        Warning(
+            'Кэш в памяти процесса: сброс тегов кэша не доходит до других '
+            'воркеров и management-команд, отчёты и фильтры будут устаревшими '
+            'до истечения TTL.',
+            hint='Для сервера с несколькими процессами задайте CACHE_BACKEND=database или redis.',
+            id='core.W001',
+        )
+    ]
@@ -0,0 +1,99 @@
+import json
+import time
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client as TestClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.clients.models import Client
+from apps.products.models import Product
+from apps.timeclock.models import WorkSession
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк горячих страниц на текущей БД (DB_ENGINE): списки и поиск '
+        'заказов, товаров и клиентов, виджеты дашборда, аналитика, создание '
+        'заказа. Кэш очищается перед каждым запросом, все изменения откатываются. '
+        'Для сравнения SQLite и PostgreSQL запускается на каждой базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--search', default='зим', help='Строка поиска')
+
+    def handle(self, *args, **options):
+        settings_dict = connection.settings_dict
+        self.stdout.write(
+            f'БД: {connection.vendor} '
+            f'{".".join(map(str, connection.get_database_version()))}, '
+            f'CONN_MAX_AGE={settings_dict["CONN_MAX_AGE"]}, '
+            f'пул: {"да" if settings_dict["OPTIONS"].get("pool") else "нет"}'
+        )
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        User = get_user_model()
+        user = User.objects.create_superuser(
+            email='benchmark@example.com', username='benchmark', password=None,
+        )
+        WorkSession.objects.create(user=user, start_time=timezone.now())
+        browser = TestClient(HTTP_HOST='localhost')
+        browser.force_login(user)
+
+        search = options['search']
+        client = Client.objects.order_by('pk').first()
+        product = Product.objects.filter(is_active=True).order_by('pk').first()
+        order = None
+        if client and product:
+            order = json.dumps({
+                'client_id': str(client.pk),
+                'items': [{'product_id': product.pk, 'quantity': 2}],
+            })
+
+        endpoints = [
+            ('Заказы: список', reverse('orders:orders_list'), {}),
+            ('Заказы: поиск', reverse('orders:orders_list'), {'search': search}),
+            ('Заказы: подбор товара', reverse('orders:product_search'), {'q': search}),
+            ('Товары: поиск', reverse('products:products_list'), {'search': search}),
+            ('Клиенты: поиск', reverse('clients:clients_list'), {'search': search}),
+            ('Дашборд: KPI', reverse('dashboard:widget_kpis'), {'period': '1month'}),
+            ('Аналитика: обзор', reverse('analytics_api:overview'), {}),
+        ]
+        for title, url, params in endpoints:
+            self._bench(title, options['repeat'], lambda: browser.get(url, params))
+        if order:
+            self._bench(
+                'Заказы: создание', options['repeat'],
+                lambda: browser.post(reverse('orders:add_order'), order,
+                                     content_type='application/json'),
+            )
+
+    def _bench(self, title, repeat, request):
+        timings, queries, status = [], 0, None
+        for _ in range(repeat):
+            cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                status = request().status_code
+                timings.append(time.perf_counter() - started)
+            queries = len(captured)
+        p50, p95 = np.percentile(timings, [50, 95]) * 1000
+        self.stdout.write(
+            f'{title}: p50 {p50:.1f} мс, p95 {p95:.1f} мс, запросов {queries}, HTTP {status}'
+        )
@@ -0,0 +1,198 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+
+from apps.clients.models import Client
+from apps.core.writes import write_metrics, write_transaction
+from apps.orders.models import Order, OrderItem
+from apps.orders.pricing import promo_total, resolve_price
+from apps.products.models import Product
+
+# Профили PRAGMA: настройки SQLite по умолчанию и профиль из settings
+PROFILES = {
+    'default': {
+        'journal_mode': 'delete',
+        'synchronous': 'full',
+        'mmap_size': 0,
+        'cache_size': -2000,
+        'temp_store': 'default',
+    },
+    'tuned': settings.SQLITE_PRAGMAS,
+}
+# Режимы транзакции: обычный atomic (BEGIN DEFERRED) и write_transaction
+# (BEGIN IMMEDIATE + повтор при блокировке, как у представлений записи)
+MODES = ['deferred', 'coordinated']
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк конкурентной записи в SQLite: N процессов создают заказы '
+        '(как add_order) в копии БД, для каждого профиля PRAGMA — '
+        'пропускная способность, задержки p50/p95 и ошибки «database is locked». '
+        'Рабочая БД не изменяется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--orders', type=int, default=50, help='Заказов на процесс')
+        parser.add_argument('--items', type=int, default=3, help='Позиций в заказе')
+        parser.add_argument(
+            '--profile', action='append', dest='profiles', choices=list(PROFILES),
+            help='Профиль PRAGMA (можно несколько раз; по умолчанию все)',
+        )
+        parser.add_argument(
+            '--mode', action='append', dest='modes', choices=MODES,
+            help='Режим транзакции (можно несколько раз; по умолчанию все)',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(f'Бенчмарк только для SQLite, база: {connection.vendor}')
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError('Нужен запуск процессов через fork (Linux, macOS)')
+
+        self.stdout.write(
+            f'Процессов: {options["processes"]}, заказов на процесс: {options["orders"]}, '
+            f'позиций в заказе: {options["items"]}'
+        )
+        database = settings.DATABASES['default']['NAME']
+        pragmas = settings.SQLITE_PRAGMAS
+        with tempfile.TemporaryDirectory() as tmp:
+            try:
+                for name in options['profiles'] or list(PROFILES):
+                    for mode in options['modes'] or MODES:
+                        path = os.path.join(tmp, f'{name}-{mode}.sqlite3')
+                        self._copy_database(path)
+                        self._use_database(path, PROFILES[name])
+                        self._run(f'{name}/{mode}', mode, options)
+            finally:
+                self._use_database(database, pragmas)
+
+    @staticmethod
+    def _copy_database(path):
+        """Копия рабочей БД через online backup API (с учётом WAL)."""
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+
+    @staticmethod
+    def _use_database(path, pragmas):
+        """Переключить соединение default на файл path с профилем pragmas."""
+        connections.close_all()
+        settings.SQLITE_PRAGMAS = pragmas
+        connection.settings_dict['NAME'] = path
+
+    def _run(self, name, mode, options):
+        user, client_ids, product_ids = self._fixtures()
+        # Дочерние процессы открывают свои соединения
+        connections.close_all()
+
+        tasks = [
+            (user.pk, client_ids, product_ids, options['orders'], options['items'], mode, seed)
+            for seed in range(options['processes'])
+        ]
+        started = time.perf_counter()
+        with multiprocessing.get_context('fork').Pool(options['processes']) as pool:
+            results = pool.map(_create_orders, tasks)
+        elapsed = time.perf_counter() - started
+
+        latencies = np.array([value for result in results for value in result[0]])
+        locked = sum(result[1] for result in results)
+        retries = sum(result[2] for result in results)
+        created = len(latencies)
+        p50, p95 = np.percentile(latencies, [50, 95]) * 1000 if created else (0, 0)
+        self.stdout.write(
+            f'{name}: создано {created} заказов за {elapsed:.2f} с '
+            f'({created / elapsed:.0f} заказов/с), p50 {p50:.0f} мс, p95 {p95:.0f} мс, '
+            f'повторов: {retries}, database is locked: {locked}'
+        )
+
+    @staticmethod
+    def _fixtures():
+        """Пользователь, клиенты и товары копии БД (при пустой БД — синтетические)."""
+        User = get_user_model()
+        user = User.objects.filter(is_active=True).order_by('pk').first()
+        if user is None:
+            user = User.objects.create_user(email='benchmark@example.com', username='benchmark')
+        client_ids = list(Client.objects.order_by('pk').values_list('pk', flat=True)[:1000])
+        if not client_ids:
+            client_ids = [
+                Client.objects.create(client_type='individual', name=f'Клиент {i}').pk
+                for i in range(100)
+            ]
+        product_ids = list(
+            Product.objects.filter(is_active=True).order_by('pk')
+            .values_list('pk', flat=True)[:1000]
+        )
+        if not product_ids:
+            product_ids = [
+                Product.objects.create(code=f'BENCH-{i:05d}', name=f'Товар {i}', price=10000).pk
+                for i in range(100)
+            ]
+        return user, client_ids, product_ids
+
+
+def _create_orders(task):
+    """
+    Дочерний процесс: создать orders заказов по items позиций.
+    Возвращает (задержки успешных заказов в секундах, число ошибок
+    блокировки, число повторов).
+    """
+    user_id, client_ids, product_ids, orders, items, mode, seed = task
+    create = _coordinated_order if mode == 'coordinated' else _create_order
+    rnd = random.Random(seed)
+    latencies, locked = [], 0
+    retries = write_metrics()['retries']
+    for _ in range(orders):
+        started = time.perf_counter()
+        try:
+            create(
+                user_id, rnd.choice(client_ids),
+                [(rnd.choice(product_ids), rnd.randint(1, 4)) for _ in range(items)],
+            )
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            locked += 1
+        else:
+            latencies.append(time.perf_counter() - started)
+    retries = write_metrics()['retries'] - retries
+    connection.close()
+    return latencies, locked, retries
+
+
+def _create_order(user_id, client_id, items):
+    """Заказ с позициями — те же запросы, что у add_order."""
+    with transaction.atomic():
+        order = Order(
+            client_id=client_id, responsible_id=user_id,
+            created_by_id=user_id, updated_by_id=user_id,
+        )
+        order.save()
+        total = 0
+        for product_id, quantity in items:
+            product = Product.objects.get(pk=product_id)
+            price = resolve_price(product, order.price_level)
+            item = OrderItem(
+                order=order, product=product, price=price,
+                quantity=quantity, amount=price * quantity,
+            )
+            item.save()
+            total += item.amount
+        order.total_amount = promo_total(total, order.is_promo)
+        order.save(update_fields=['total_amount', 'updated_at'])
+
+
+_coordinated_order = write_transaction(_create_order)
@@ -0,0 +1,81 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from apps.core import sqlite
+from apps.core.writes import write_metrics
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживание SQLite: checkpoint WAL (по умолчанию TRUNCATE — WAL '
+        'переносится в БД и обрезается), PRAGMA optimize, при необходимости '
+        'полный ANALYZE и VACUUM. Запускать по cron в нерабочее время.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--checkpoint', choices=sqlite.CHECKPOINT_MODES, default='truncate',
+            help='Режим wal_checkpoint',
+        )
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Полный ANALYZE (по умолчанию только PRAGMA optimize)',
+        )
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help='VACUUM — вернуть свободные страницы (блокирует БД на время работы)',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError(f'Команда только для SQLite, база: {connection.vendor}')
+
+        before = sqlite.database_stats(connection)
+        self._stats('До', before)
+
+        if before['journal_mode'] == 'wal':
+            busy, log, done = self._timed(
+                f'Checkpoint {options["checkpoint"].upper()}',
+                lambda: sqlite.checkpoint(connection, options['checkpoint']),
+            )
+            self.stdout.write(f'  страниц в WAL: {log}, перенесено: {done}')
+            if busy:
+                self.stdout.write(self.style.WARNING(
+                    '  Checkpoint не завершён: БД занята другими соединениями'
+                ))
+        else:
+            self.stdout.write(f'Режим журнала {before["journal_mode"]}, checkpoint не нужен')
+
+        with connection.cursor() as cursor:
+            if options['analyze']:
+                self._timed('ANALYZE', lambda: cursor.execute('ANALYZE'))
+            self._timed('PRAGMA optimize', lambda: cursor.execute('PRAGMA optimize'))
+            if options['vacuum']:
+                self._timed('VACUUM', lambda: cursor.execute('VACUUM'))
+
+        self._stats('После', sqlite.database_stats(connection))
+        metrics = write_metrics()
+        self.stdout.write(
+            f'Координация записи: ожиданий блокировки {metrics["waits"]} '
+            f'({metrics["wait_ms"]} мс), повторов {metrics["retries"]} '
+            f'({metrics["retry_ms"]} мс), отказов {metrics["failures"]}'
+        )
+        self.stdout.write(self.style.SUCCESS('Обслуживание БД завершено'))
+
+    def _timed(self, title, func):
+        started = time.perf_counter()
+        result = func()
+        self.stdout.write(f'{title}: {(time.perf_counter() - started) * 1000:.0f} мс')
+        return result
+
+    def _stats(self, title, stats):
+        size = stats['page_size'] * stats['page_count']
+        free = stats['page_size'] * stats['freelist_count']
+        self.stdout.write(
+            f'{title}: журнал {stats["journal_mode"]}, БД {size / 2 ** 20:.1f} МБ '
+            f'(свободно {free / 2 ** 20:.1f} МБ), WAL {stats["wal_size"] / 2 ** 20:.1f} МБ'
+        )
@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from apps.core import sqlite
+from apps.core.cache import REPLICA_DATA, invalidate_tags
+from apps.core.routers import REPLICA
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновить локальную реплику SQLite (DB_REPLICA=True): копия основной БД '
+        'через online backup API подменяет файл SQLITE_REPLICA_PATH. С --interval '
+        'обновляет копию периодически — отставание реплики не больше интервала.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Обновлять каждые N секунд (0 — один раз)',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.vendor != 'sqlite':
+            raise CommandError(f'Команда только для SQLite, база: {connection.vendor}')
+        if REPLICA not in settings.DATABASES:
+            raise CommandError('Реплика не настроена: задайте DB_REPLICA=True')
+
+        path = settings.SQLITE_REPLICA_PATH
+        while True:
+            started = time.perf_counter()
+            size = sqlite.snapshot(connection, path)
+            # Отчёты, закэшированные со старой копии, устарели
+            invalidate_tags(REPLICA_DATA)
+            self.stdout.write(
+                f'{time.strftime("%H:%M:%S")} реплика {path} обновлена: '
+                f'{size / 2 ** 20:.1f} МБ за {(time.perf_counter() - started) * 1000:.0f} мс'
+            )
+            if not options['interval']:
+                break
+            # Не держим соединение между копиями
+            connection.close()
+            time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+from .routers import pin_to_primary, replica_configured
+from .writes import WRITE_METHODS
+
+
+class ReplicaPinMiddleware:
+    """После успешного запроса с записью закрепляет пользователя за основной БД.
+
+    Представления с replica_pin_exempt (heartbeat и т.п.) не закрепляют.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.method in WRITE_METHODS
+            and response.status_code < 400
+            and not getattr(request, 'replica_pin_exempt', False)
+            and replica_configured()
+        ):
+            pin_to_primary(response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(view_func, 'replica_pin_exempt', False):
+            request.replica_pin_exempt = True
+        return None
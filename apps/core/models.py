@@ -0,0 +1,2 @@
+# Моделей у приложения нет. Модуль нужен, чтобы migrate отправлял приложению
+# post_migrate: по нему создаётся таблица кэша (signals.create_cache_table).
@@ -0,0 +1,48 @@
+"""
+Индексы PostgreSQL для поиска по подстроке.
+
+Фильтр icontains в PostgreSQL — UPPER(колонка::text) LIKE UPPER('%...%'),
+contains — колонка::text LIKE '%...%'. B-tree такие условия не ускоряет,
+GIN-индекс pg_trgm по тому же выражению — ускоряет (для подстрок от трёх
+символов). Индексы создаются миграциями приложений через эти функции и в
+состояние моделей не попадают; на других СУБД функции ничего не делают.
+"""
+import warnings
+
+
+def _trigram_indexes(apps, app_label, indexes):
+    """(имя индекса, таблица, колонка, без учёта регистра) по описаниям миграции."""
+    for model_name, field_name, name, case_insensitive in indexes:
+        model = apps.get_model(app_label, model_name)
+        column = model._meta.get_field(field_name).column
+        yield name, model._meta.db_table, column, case_insensitive
+
+
+def create_trigram_indexes(apps, schema_editor, app_label, indexes):
+    """Создать GIN-индексы pg_trgm (и расширение pg_trgm, если его нет)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        available = cursor.fetchone()
+    if not available:
+        # Сервер без contrib: поиск работает, но без индексов
+        warnings.warn('Расширение pg_trgm недоступно, триграммные индексы не созданы')
+        return
+    quote = schema_editor.quote_name
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column, case_insensitive in _trigram_indexes(apps, app_label, indexes):
+        expression = f'({quote(column)})::text'
+        if case_insensitive:
+            expression = f'UPPER({expression})'
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {quote(name)} ON {quote(table)} '
+            f'USING gin (({expression}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor, app_label, indexes):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _, _ in _trigram_indexes(apps, app_label, indexes):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(name)}')
@@ -0,0 +1,139 @@
+"""
+Маршрутизация БД: чтение с реплики и таблица кэша.
+
+Тяжёлые отчёты (аналитика, выгрузки, дашборд) оформляются replica_reads:
+на время GET-запроса ORM читает с алиаса replica. Всё остальное, любая
+запись и чтение после записи в том же запросе идут в default.
+
+Реплика отстаёт, поэтому после запроса с записью ReplicaPinMiddleware
+ставит cookie, и ещё REPLICA_PIN_SECONDS пользователь читает только
+с основной БД — свои изменения он видит сразу. Если реплика не настроена
+(DB_REPLICA=False) или недоступна, чтение идёт с основной БД.
+
+CacheRouter держит таблицу DatabaseCache в отдельной БД cache (если она
+настроена) и никогда не читает её с реплики.
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+REPLICA = 'replica'
+CACHE_DATABASE = 'cache'
+# app_label модели таблицы DatabaseCache
+CACHE_APP_LABEL = 'django_cache'
+PIN_COOKIE = 'primary_until'
+READ_METHODS = frozenset(['GET', 'HEAD'])
+
+# Алиас для чтения в текущем запросе (None — default)
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def replica_available():
+    """Реплика отвечает (для SQLite — файл копии существует)."""
+    if not replica_configured():
+        return False
+    if connections[REPLICA].vendor == 'sqlite' and not os.path.exists(settings.SQLITE_REPLICA_PATH):
+        return False
+    try:
+        connections[REPLICA].ensure_connection()
+    except DatabaseError as e:
+        logger.warning(f'Реплика недоступна, чтение с основной БД: {e}')
+        return False
+    return True
+
+
+def is_pinned(request):
+    """Пользователь недавно писал и пока читает с основной БД."""
+    try:
+        return int(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def pin_to_primary(response):
+    """Закрепить пользователя за основной БД на REPLICA_PIN_SECONDS."""
+    seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 15)
+    response.set_cookie(
+        PIN_COOKIE, str(int(time.time()) + seconds),
+        max_age=seconds, httponly=True, samesite='Lax',
+    )
+
+
+def replica_reads(view):
+    """
+    Представление только для чтения: GET/HEAD читают с реплики, если
+    пользователь не закреплён за основной БД и реплика доступна.
+    Подходит и для функций, и (через method_decorator) для методов классов.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in READ_METHODS or is_pinned(request) or not replica_available():
+            return view(request, *args, **kwargs)
+        token = _read_alias.set(REPLICA)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
+
+
+def replica_pin_exempt(view):
+    """Запись в представлении не закрепляет пользователя за основной БД (служебные POST)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return view(*args, **kwargs)
+    wrapper.replica_pin_exempt = True
+    return wrapper
+
+
+class CacheRouter:
+    """Таблица кэша — в БД cache, если она есть, иначе в default."""
+
+    @staticmethod
+    def _alias():
+        return CACHE_DATABASE if CACHE_DATABASE in settings.DATABASES else DEFAULT_DB_ALIAS
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == CACHE_APP_LABEL:
+            return self._alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_read(model, **hints)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == CACHE_DATABASE:
+            return app_label == CACHE_APP_LABEL
+        if app_label == CACHE_APP_LABEL:
+            return db == self._alias()
+        return None
+
+
+class ReplicaRouter:
+    """Чтение — с алиаса из replica_reads, запись и миграции — только default."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Записали — дальше в этом запросе читаем свои данные с основной БД
+        _read_alias.set(None)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — копия default, связи между ними допустимы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
@@ -0,0 +1,27 @@
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+
+from .routers import CacheRouter
+from .sqlite import apply_pragmas
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """PRAGMA профиля производительности на каждом новом соединении SQLite"""
+    if connection.vendor == 'sqlite':
+        apply_pragmas(connection)
+
+
+@receiver(post_migrate)
+def create_cache_table(sender, using, **kwargs):
+    """Таблица DatabaseCache создаётся вместе с миграциями (в БД cache, если она есть)"""
+    # post_migrate приходит от каждого приложения — создаём один раз
+    if sender.name != 'apps.core' or not isinstance(caches[DEFAULT_CACHE_ALIAS], DatabaseCache):
+        return
+    if using in (DEFAULT_DB_ALIAS, CacheRouter._alias()):
+        call_command('createcachetable', database=CacheRouter._alias(), verbosity=0)
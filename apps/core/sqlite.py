@@ -0,0 +1,91 @@
+"""
+Профиль производительности SQLite.
+
+apply_pragmas выполняет PRAGMA из settings.SQLITE_PRAGMAS на каждом новом
+соединении (сигнал connection_created, см. signals). journal_mode=wal
+сохраняется в самом файле БД, остальные PRAGMA действуют только на
+соединение, поэтому выполняются каждый раз.
+
+Остальные функции — для обслуживания (команда db_maintenance):
+размер WAL-файла, страницы и свободные страницы, checkpoint; snapshot —
+копия БД для локальной реплики (команда refresh_sqlite_replica).
+"""
+import os
+import sqlite3
+
+from django.conf import settings
+
+CHECKPOINT_MODES = ['passive', 'full', 'restart', 'truncate']
+
+
+def apply_pragmas(connection, pragmas=None):
+    """Выполнить PRAGMA на соединении SQLite (по умолчанию SQLITE_PRAGMAS)."""
+    if pragmas is None:
+        pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            # Значения проверены при чтении настроек (int или Choices)
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def pragma(connection, name):
+    """Текущее значение PRAGMA name."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def wal_path(connection):
+    return f'{connection.settings_dict["NAME"]}-wal'
+
+
+def wal_size(connection):
+    """Размер WAL-файла в байтах (0, если файла нет)."""
+    try:
+        return os.path.getsize(wal_path(connection))
+    except OSError:
+        return 0
+
+
+def database_stats(connection):
+    """Размер страницы, число страниц и свободных страниц, размер WAL."""
+    return {
+        'journal_mode': pragma(connection, 'journal_mode'),
+        'page_size': pragma(connection, 'page_size'),
+        'page_count': pragma(connection, 'page_count'),
+        'freelist_count': pragma(connection, 'freelist_count'),
+        'wal_size': wal_size(connection),
+    }
+
+
+def checkpoint(connection, mode='truncate'):
+    """
+    Перенести WAL в файл БД. Возвращает (busy, страниц в WAL,
+    перенесено страниц); busy=1 — checkpoint не завершён из-за читателей.
+    """
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f'Неизвестный режим checkpoint: {mode}')
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA wal_checkpoint({mode.upper()})')
+        return tuple(cursor.fetchone())
+
+
+def snapshot(connection, path):
+    """
+    Согласованная копия БД в path через online backup API (с учётом WAL).
+    Копия пишется во временный файл в режиме журнала DELETE и подменяет
+    path атомарно: открытые читатели дочитывают старую копию, новые
+    соединения открывают новую. Возвращает размер копии в байтах.
+    """
+    tmp = f'{path}.tmp'
+    connection.ensure_connection()
+    target = sqlite3.connect(tmp)
+    try:
+        connection.connection.backup(target)
+        # Копия читается как неизменяемая — без WAL-файлов рядом
+        target.execute('PRAGMA journal_mode = delete')
+    finally:
+        target.close()
+    os.replace(tmp, path)
+    return os.path.getsize(path)
@@ -0,0 +1,10 @@
+"""Общее для тестов приложений."""
+from django.test import override_settings
+
+# Кэш в памяти процесса: таблица DatabaseCache живёт в отдельной БД cache,
+# которой нет среди тестовых баз
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+
+local_cache = override_settings(CACHES=LOCMEM_CACHES)
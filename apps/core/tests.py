@@ -0,0 +1,200 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+
+from apps.cities.models import City
+from apps.clients.models import Client
+from apps.orders.models import Order
+from apps.orders.signals import orders_repriced
+
+from .cache import (
+    CLIENTS,
+    ORDERS,
+    ORDERS_BULK,
+    PRODUCTS,
+    cache_page_tagged,
+    cache_tags,
+    invalidate_tags,
+    scope_tags,
+)
+from .checks import check_shared_cache
+from .testing import local_cache
+from .writes import coordinated_write
+
+_real_enter = transaction.Atomic.__enter__
+
+
+def failing_begin(failures, message='database is locked'):
+    """Первые failures входов в транзакцию падают с OperationalError (занятая БД)."""
+    remaining = [failures]
+
+    def enter(atomic):
+        if remaining[0]:
+            remaining[0] -= 1
+            raise OperationalError(message)
+        return _real_enter(atomic)
+
+    return mock.patch.object(transaction.Atomic, '__enter__', enter)
+
+
+@local_cache
+@override_settings(DB_WRITE_RETRIES=3, DB_WRITE_RETRY_DELAY=0, DB_WRITE_RETRY_MAX_DELAY=0)
+class CoordinatedWriteTests(TransactionTestCase):
+    """coordinated_write: транзакция записи, повтор BEGIN и ответ 503."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.calls = []
+
+        @coordinated_write
+        def view(request):
+            self.calls.append(connection.in_atomic_block)
+            City.objects.create(name=f'Город {len(self.calls)}')
+            if request.GET.get('fail'):
+                raise OperationalError(request.GET['fail'])
+            return HttpResponse('ok')
+
+        self.view = view
+
+    def test_get_runs_without_transaction(self):
+        self.assertEqual(self.view(self.factory.get('/')).status_code, 200)
+        self.assertEqual(self.calls, [False])
+
+    def test_post_runs_in_transaction(self):
+        self.assertEqual(self.view(self.factory.post('/')).status_code, 200)
+        self.assertEqual(self.calls, [True])
+        self.assertEqual(City.objects.count(), 1)
+
+    def test_begin_is_retried_view_runs_once(self):
+        with failing_begin(2), self.assertLogs('apps.core.writes', 'WARNING') as logs:
+            response = self.view(self.factory.post('/'))
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.calls, [True])
+        self.assertEqual(City.objects.count(), 1)
+
+    def test_busy_after_all_retries(self):
+        with failing_begin(10), self.assertLogs('apps.core.writes', 'ERROR'):
+            response = self.view(self.factory.post('/', HTTP_X_REQUESTED_WITH='XMLHttpRequest'))
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(json.loads(response.content)['status'], 'error')
+        self.assertEqual(self.calls, [])
+
+    def test_lock_in_view_body_is_not_retried(self):
+        response = self.view(self.factory.post('/?fail=database+is+locked'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.calls), 1)
+        # Запись тела откатывается вместе с транзакцией
+        self.assertEqual(City.objects.count(), 0)
+        self.assertFalse(connection.in_atomic_block)
+
+    def test_other_errors_propagate(self):
+        with self.assertRaises(OperationalError):
+            self.view(self.factory.post('/?fail=no+such+table'))
+        with failing_begin(1, 'disk I/O error'), self.assertRaises(OperationalError):
+            self.view(self.factory.post('/'))
+        self.assertEqual(City.objects.count(), 0)
+
+
+@local_cache
+class CacheTagsTests(TestCase):
+    """Версии тегов кэша и их сброс сигналами."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.manager = User.objects.create_user(email='m1@x.kz', username='m1@x.kz', password='pw')
+        cls.other = User.objects.create_user(email='m2@x.kz', username='m2@x.kz', password='pw')
+        cls.client_obj = Client.objects.create(client_type='individual', name='Клиент')
+
+    def setUp(self):
+        cache.clear()
+
+    def create_order(self, responsible):
+        return Order.objects.create(
+            client=self.client_obj, responsible=responsible, created_by=responsible,
+            source=Order.SOURCE_CHOICES[0][0], payment_method=Order.PAYMENT_CHOICES[0][0],
+        )
+
+    def tokens(self):
+        return {
+            'orders': cache_tags(ORDERS),
+            'manager': cache_tags(*scope_tags([self.manager.pk])),
+            'other': cache_tags(*scope_tags([self.other.pk])),
+            'clients': cache_tags(CLIENTS),
+        }
+
+    def test_scope_tags(self):
+        self.assertEqual(scope_tags(None), [ORDERS])
+        self.assertEqual(scope_tags([2, 1, 2]), [ORDERS_BULK, 'scope:1', 'scope:2'])
+
+    def test_token_changes_only_after_commit(self):
+        before = cache_tags(ORDERS, CLIENTS)
+        self.assertEqual(cache_tags(ORDERS, CLIENTS), before)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            invalidate_tags(ORDERS)
+            # До коммита параллельный запрос ещё видит старую версию
+            self.assertEqual(cache_tags(ORDERS, CLIENTS), before)
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(cache_tags(ORDERS, CLIENTS), before)
+
+    def test_lost_tag_key_does_not_revive_old_entries(self):
+        before = cache_tags(PRODUCTS)
+        cache.delete('tag:products')
+        self.assertNotEqual(cache_tags(PRODUCTS), before)
+
+    def test_order_change_invalidates_its_scope_only(self):
+        before = self.tokens()
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.create_order(self.manager)
+        after = self.tokens()
+        self.assertNotEqual(after['orders'], before['orders'])
+        self.assertNotEqual(after['manager'], before['manager'])
+        self.assertEqual(after['other'], before['other'])
+        self.assertEqual(after['clients'], before['clients'])
+
+        # Смена ответственного сбрасывает области обоих
+        with self.captureOnCommitCallbacks(execute=True):
+            order.responsible = self.other
+            order.save()
+        changed = self.tokens()
+        self.assertNotEqual(changed['manager'], after['manager'])
+        self.assertNotEqual(changed['other'], after['other'])
+
+    def test_bulk_reprice_invalidates_all_scopes(self):
+        before = self.tokens()
+        with self.captureOnCommitCallbacks(execute=True):
+            orders_repriced.send(sender=Order, orders=1, items=1)
+        after = self.tokens()
+        self.assertNotEqual(after['manager'], before['manager'])
+        self.assertNotEqual(after['other'], before['other'])
+
+    def test_cache_page_tagged(self):
+        calls = []
+
+        @cache_page_tagged(60, lambda request: [ORDERS])
+        def view(request):
+            calls.append(1)
+            return HttpResponse(str(len(calls)))
+
+        request = RequestFactory().get('/report/')
+        self.assertEqual(view(request).content, b'1')
+        self.assertEqual(view(request).content, b'1')
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_tags(ORDERS)
+        self.assertEqual(view(request).content, b'2')
+
+    def test_per_process_cache_warning(self):
+        self.assertEqual([error.id for error in check_shared_cache(None)], ['core.W001'])
+        database_cache = {'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'django_cache',
+        }}
+        with override_settings(CACHES=database_cache):
+            self.assertEqual(check_shared_cache(None), [])
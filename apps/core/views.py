@@ -0,0 +1,24 @@
+import logging
+
+from django.db import DatabaseError, connection
+from django.http import JsonResponse
+
+from .routers import replica_available, replica_configured
+
+logger = logging.getLogger(__name__)
+
+
+def health(request):
+    """Проверка для балансировщика и мониторинга: приложение отвечает, БД доступна"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except DatabaseError as e:
+        logger.error(f'Health check failed: {e}')
+        return JsonResponse({'status': 'error', 'database': connection.vendor}, status=503)
+    data = {'status': 'ok', 'database': connection.vendor}
+    if replica_configured():
+        # Без реплики отчёты читают с основной БД — это не отказ
+        data['replica'] = 'ok' if replica_available() else 'unavailable'
+    return JsonResponse(data)
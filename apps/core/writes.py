@@ -0,0 +1,191 @@
+"""
+Координация записи в SQLite.
+
+SQLite допускает одного писателя. Транзакция Django по умолчанию
+начинается с BEGIN (DEFERRED): блокировка записи берётся только на первом
+INSERT/UPDATE, и если её уже держит другой процесс, SQLite сразу отвечает
+«database is locked», не дожидаясь busy_timeout (иначе была бы взаимная
+блокировка). Поэтому:
+
+- immediate_atomic — transaction.atomic, внешняя транзакция которого
+  начинается с BEGIN IMMEDIATE: блокировка записи берётся в самом начале,
+  ожидание занятой БД идёт через busy_timeout;
+- retry_on_lock — повтор функции при «database is locked» с ограниченной
+  экспоненциальной задержкой (если busy_timeout всё же истёк);
+- write_transaction — обе вещи вместе для функций записи;
+- coordinated_write — для представлений: GET проходит как есть,
+  POST/PUT/PATCH/DELETE выполняются в immediate_atomic, повторяется только
+  взятие блокировки (BEGIN IMMEDIATE) — тело представления с его побочными
+  эффектами (файлы, сообщения, сброс кэша) выполняется один раз. Блокировка,
+  не взятая после всех попыток или потерянная позже, — ответ 503
+  с Retry-After вместо 500.
+
+Метрики (ожидания блокировки, повторы, отказы и суммарное время) копятся
+в кэше, см. write_metrics; повторы и отказы пишутся в лог. Для других СУБД
+immediate_atomic — обычный transaction.atomic, повторов нет.
+"""
+import logging
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, OperationalError, transaction
+from django.http import HttpResponse, JsonResponse
+
+logger = logging.getLogger(__name__)
+
+WRITE_METHODS = frozenset(['POST', 'PUT', 'PATCH', 'DELETE'])
+
+METRICS_KEY = 'db_writes:{}'
+METRICS = ['waits', 'wait_ms', 'retries', 'retry_ms', 'failures']
+# Ожидание блокировки короче порога в метрики не попадает
+WAIT_THRESHOLD = 0.01
+
+BUSY_MESSAGE = 'База данных занята, повторите действие через несколько секунд'
+
+
+def is_lock_error(exc):
+    """Ошибка блокировки SQLite («database is locked» / «database table is locked»)."""
+    return isinstance(exc, OperationalError) and 'locked' in str(exc)
+
+
+def _record(name, value=1):
+    key = METRICS_KEY.format(name)
+    try:
+        cache.incr(key, value)
+    except ValueError:
+        cache.set(key, value, None)
+
+
+def write_metrics():
+    """Счётчики координации записи: waits, wait_ms, retries, retry_ms, failures."""
+    values = cache.get_many([METRICS_KEY.format(name) for name in METRICS])
+    return {name: values.get(METRICS_KEY.format(name), 0) for name in METRICS}
+
+
+def reset_write_metrics():
+    cache.delete_many([METRICS_KEY.format(name) for name in METRICS])
+
+
+class ImmediateAtomic(transaction.Atomic):
+    """transaction.Atomic, внешняя транзакция SQLite которого — BEGIN IMMEDIATE."""
+
+    def __enter__(self):
+        connection = transaction.get_connection(self.using)
+        if connection.vendor != 'sqlite' or connection.in_atomic_block:
+            return super().__enter__()
+        connection.ensure_connection()
+        # Режим BEGIN читается при открытии транзакции — подменяем на время входа
+        mode, connection.transaction_mode = connection.transaction_mode, 'IMMEDIATE'
+        started = time.perf_counter()
+        try:
+            super().__enter__()
+        finally:
+            connection.transaction_mode = mode
+            waited = time.perf_counter() - started
+            if waited >= WAIT_THRESHOLD:
+                _record('waits')
+                _record('wait_ms', int(waited * 1000))
+
+
+def immediate_atomic(using=None, savepoint=True, durable=False):
+    """Как transaction.atomic (контекстный менеджер или декоратор), но с BEGIN IMMEDIATE."""
+    if callable(using):
+        return ImmediateAtomic(DEFAULT_DB_ALIAS, savepoint, durable)(using)
+    return ImmediateAtomic(using, savepoint, durable)
+
+
+def _delay(attempt):
+    """Задержка перед повтором attempt (0, 1, ...): экспонента с потолком и разбросом."""
+    base = getattr(settings, 'DB_WRITE_RETRY_DELAY', 0.05)
+    limit = getattr(settings, 'DB_WRITE_RETRY_MAX_DELAY', 1.0)
+    return min(limit, base * 2 ** attempt) * random.uniform(0.5, 1)
+
+
+def retry_on_lock(func=None, *, using=None):
+    """
+    Повторять func при ошибке блокировки SQLite (не более DB_WRITE_RETRIES
+    повторов). Внутри внешней транзакции не повторяет — ошибка уходит
+    наверх, к тому, кто транзакцию открыл.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            retries = getattr(settings, 'DB_WRITE_RETRIES', 4)
+            attempt = 0
+            while True:
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as exc:
+                    if not is_lock_error(exc) or transaction.get_connection(using).in_atomic_block:
+                        raise
+                    if attempt >= retries:
+                        _record('failures')
+                        logger.error(f'{func.__qualname__}: БД занята, попыток {attempt + 1}')
+                        raise
+                    delay = _delay(attempt)
+                    attempt += 1
+                    _record('retries')
+                    _record('retry_ms', int(delay * 1000))
+                    logger.warning(
+                        f'{func.__qualname__}: БД занята, повтор {attempt} '
+                        f'через {delay * 1000:.0f} мс'
+                    )
+                    time.sleep(delay)
+        return wrapper
+
+    return decorator(func) if func is not None else decorator
+
+
+def write_transaction(func=None, *, using=None):
+    """Функция записи целиком в immediate_atomic с повтором при блокировке."""
+    def decorator(func):
+        return retry_on_lock(ImmediateAtomic(using, True, False)(func), using=using)
+
+    return decorator(func) if func is not None else decorator
+
+
+def _busy_response(request):
+    retry_after = str(max(1, round(getattr(settings, 'DB_WRITE_RETRY_MAX_DELAY', 1.0))))
+    if (
+        request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+        or 'application/json' in request.headers.get('Content-Type', '')
+        or request.path.startswith('/api/')
+    ):
+        response = JsonResponse({'status': 'error', 'message': BUSY_MESSAGE}, status=503)
+    else:
+        response = HttpResponse(BUSY_MESSAGE, status=503, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = retry_after
+    return response
+
+
+class _RetryingImmediateAtomic(ImmediateAtomic):
+    """ImmediateAtomic, который при блокировке повторяет только вход в транзакцию."""
+
+    def __enter__(self):
+        # Ошибка BEGIN IMMEDIATE возникает до тела блока — повтор ничего не дублирует
+        retry_on_lock(super().__enter__, using=self.using)()
+
+
+def coordinated_write(view):
+    """
+    Представление, меняющее данные: POST/PUT/PATCH/DELETE выполняются
+    в immediate_atomic. Повторяется только BEGIN IMMEDIATE, само
+    представление — один раз; при занятой БД после всех повторов или
+    при блокировке в теле и на COMMIT — ответ 503.
+    Подходит и для функций, и (через method_decorator) для dispatch классов.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in WRITE_METHODS:
+            return view(request, *args, **kwargs)
+        try:
+            with _RetryingImmediateAtomic(None, True, False):
+                return view(request, *args, **kwargs)
+        except OperationalError as exc:
+            if not is_lock_error(exc):
+                raise
+            return _busy_response(request)
+    return wrapper
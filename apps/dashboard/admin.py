@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import StatusCounter
 
-# Register your models here.
+
+@admin.register(StatusCounter)
+class StatusCounterAdmin(admin.ModelAdmin):
+    list_display = ('id', 'responsible', 'status', 'count')
+    list_filter = ('status',)
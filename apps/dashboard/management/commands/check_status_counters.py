@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from apps.dashboard.services import rebuild_status_counters, status_counter_mismatches
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики статусов заказов (StatusCounter) с таблицей заказов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Пересобрать счётчики, если найдены расхождения',
+        )
+
+    def handle(self, *args, **options):
+        mismatches = status_counter_mismatches()
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('Счётчики статусов совпадают с заказами'))
+            return
+
+        for (responsible_id, status), (stored, live) in sorted(mismatches.items()):
+            self.stdout.write(
+                f'Ответственный {responsible_id}, статус {status}: '
+                f'счётчик {stored}, фактически {live}'
+            )
+        self.stdout.write(self.style.WARNING(f'Расхождений: {len(mismatches)}'))
+
+        if options['fix']:
+            rows = rebuild_status_counters()
+            self.stdout.write(self.style.SUCCESS(f'Счётчики пересобраны, строк: {rows}'))
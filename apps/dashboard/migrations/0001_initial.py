@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=30, verbose_name='Статус')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество')),
+                ('responsible', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_counters', to=settings.AUTH_USER_MODEL, verbose_name='Ответственный')),
+            ],
+            options={
+                'verbose_name': 'Счётчик статусов заказов',
+                'verbose_name_plural': 'Счётчики статусов заказов',
+                'unique_together': {('responsible', 'status')},
+            },
+        ),
+    ]
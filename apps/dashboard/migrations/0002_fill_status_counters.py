@@ -0,0 +1,33 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def fill_status_counters(apps, schema_editor):
+    """Начальное заполнение счётчиков статусов по существующим заказам."""
+    Order = apps.get_model('orders', 'Order')
+    StatusCounter = apps.get_model('dashboard', 'StatusCounter')
+    rows = (
+        Order.objects.values('responsible_id', 'status')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    StatusCounter.objects.bulk_create([
+        StatusCounter(
+            responsible_id=row['responsible_id'],
+            status=row['status'],
+            count=row['total'],
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+        ('orders', '0006_add_performance_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_status_counters, migrations.RunPython.noop),
+    ]
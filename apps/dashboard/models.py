@@ -1,3 +1,26 @@
 from django.db import models
+from django.conf import settings
 
-# Create your models here.
+
+class StatusCounter(models.Model):
+    """Количество заказов по (ответственный, статус) для диаграммы статусов.
+
+    Поддерживается сигналами заказов (+1/-1 при создании, удалении и смене
+    статуса или ответственного); сверяется командой check_status_counters.
+    """
+    responsible = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='status_counters',
+        verbose_name='Ответственный'
+    )
+    status = models.CharField('Статус', max_length=30)
+    count = models.IntegerField('Количество', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчик статусов заказов'
+        verbose_name_plural = 'Счётчики статусов заказов'
+        unique_together = [['responsible', 'status']]
+
+    def __str__(self):
+        return f'{self.responsible_id}:{self.status} = {self.count}'
@@ -0,0 +1,258 @@
+import hashlib
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.core.cache import cache_tags, replica_tags
+from apps.orders.models import Order
+from apps.clients.models import Client
+from apps.plans.models import PlanAssignment
+from .models import StatusCounter
+
+# Все статусы отмены (в диаграмме объединяются в "cancelled")
+CANCELLED_STATUSES = [
+    Order.STATUS_CANCELLED,
+    Order.STATUS_CANCEL_NO_ANSWER,
+    Order.STATUS_CANCEL_NOT_SUITABLE_YEAR,
+    Order.STATUS_CANCEL_WRONG_ORDER,
+    Order.STATUS_CANCEL_FOUND_OTHER,
+    Order.STATUS_CANCEL_DELIVERY_TERMS,
+    Order.STATUS_CANCEL_NO_QUANTITY,
+    Order.STATUS_CANCEL_INCOMPLETE,
+]
+
+DATA_VERSION_KEY = 'dashboard:data_version'
+STATIC_COUNT_TTL = 60 * 60
+
+
+def data_version():
+    """Текущая версия данных дашборда (меняется при записи заказов/клиентов/планов)."""
+    return cache.get_or_set(DATA_VERSION_KEY, 1, None)
+
+
+def bump_data_version():
+    """Сделать устаревшими все закэшированные метрики дашборда."""
+    try:
+        cache.incr(DATA_VERSION_KEY)
+    except ValueError:
+        cache.set(DATA_VERSION_KEY, 2, None)
+
+
+def scope_key(responsible_ids):
+    """Ключ области видимости: 'all' или хэш отсортированных ID ответственных."""
+    if responsible_ids is None:
+        return 'all'
+    raw = ','.join(str(i) for i in sorted(set(responsible_ids)))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _static_count_key(model):
+    return f'dashboard:count:{model._meta.label_lower}'
+
+
+def static_count(model):
+    """Количество записей справочника (товары, города) из кэша-счётчика."""
+    return cache.get_or_set(
+        _static_count_key(model), lambda: model.objects.count(), STATIC_COUNT_TTL
+    )
+
+
+def invalidate_static_count(model):
+    cache.delete(_static_count_key(model))
+
+
+def current_month_bounds():
+    """Первый и последний день текущего месяца."""
+    today = timezone.now().date()
+    month_start = date(today.year, today.month, 1)
+    if today.month == 12:
+        next_month = date(today.year + 1, 1, 1)
+    else:
+        next_month = date(today.year, today.month + 1, 1)
+    return month_start, next_month - timedelta(days=1)
+
+
+def order_metrics(responsible_ids, since, until):
+    """
+    Метрики заказов одним запросом: за период (всего/выполнено/отменено/активно)
+    и выполненные за текущий месяц для прогресса плана.
+    """
+    month_start, month_end = current_month_bounds()
+    tz = timezone.get_current_timezone()
+    month_since = datetime.combine(month_start, time.min, tzinfo=tz)
+    month_until = datetime.combine(month_end, time.max, tzinfo=tz)
+
+    qs = Order.objects.filter(
+        created_at__gte=min(since, month_since),
+        created_at__lte=max(until, month_until),
+    )
+    if responsible_ids is not None:
+        qs = qs.filter(responsible_id__in=responsible_ids)
+
+    in_period = Q(created_at__gte=since, created_at__lte=until)
+    completed = in_period & Q(status=Order.STATUS_COMPLETED)
+    cancelled = in_period & Q(status__in=CANCELLED_STATUSES)
+    active = in_period & ~Q(status__in=[Order.STATUS_COMPLETED] + CANCELLED_STATUSES)
+    completed_month = (
+        Q(created_at__gte=month_since, created_at__lte=month_until)
+        & Q(status=Order.STATUS_COMPLETED)
+    )
+
+    def amount(condition):
+        return Coalesce(
+            Sum('total_amount', filter=condition),
+            Value(0),
+            output_field=DecimalField(max_digits=18, decimal_places=2),
+        )
+
+    return qs.aggregate(
+        total_count=Count('id', filter=in_period),
+        total_sum=amount(in_period),
+        completed_count=Count('id', filter=completed),
+        completed_sum=amount(completed),
+        cancelled_count=Count('id', filter=cancelled),
+        cancelled_sum=amount(cancelled),
+        active_count=Count('id', filter=active),
+        active_sum=amount(active),
+        completed_month=Count('id', filter=completed_month),
+    )
+
+
+def status_counts(responsible_ids):
+    """Количество заказов по статусам за всё время (из StatusCounter); причины отмены — в 'cancelled'."""
+    qs = StatusCounter.objects.all()
+    if responsible_ids is not None:
+        qs = qs.filter(responsible_id__in=responsible_ids)
+    counts = {}
+    rows = qs.values('status').annotate(total=Sum('count')).values_list('status', 'total')
+    for status, count in rows.order_by():
+        if not count:
+            continue
+        if status in CANCELLED_STATUSES:
+            status = Order.STATUS_CANCELLED
+        counts[status] = counts.get(status, 0) + count
+    return counts
+
+
+def plan_target(responsible_ids):
+    """Суммарная цель (кол-во заказов) по назначениям, перекрывающим текущий месяц."""
+    month_start, month_end = current_month_bounds()
+    qs = PlanAssignment.objects.filter(
+        plan__start_date__lte=month_end,
+        plan__end_date__gte=month_start,
+    )
+    if responsible_ids is not None:
+        qs = qs.filter(manager_id__in=responsible_ids)
+    return qs.aggregate(total=Sum('target_count'))['total'] or 0
+
+
+def _cached(part, responsible_ids, period_token, compute):
+    """Кэш части метрик по (версия данных, область, период)."""
+    key = 'dashboard:{}:{}:{}:{}:{}'.format(
+        part, data_version(), cache_tags(*replica_tags()), scope_key(responsible_ids), period_token
+    )
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, getattr(settings, 'CACHE_TTL', 300))
+    return value
+
+
+def get_kpis(responsible_ids, period_token, since, until):
+    """
+    KPI за период: метрики заказов и новые клиенты (кэшируется).
+    period_token — стабильное описание периода (preset или диапазон дат).
+    """
+    def compute():
+        metrics = order_metrics(responsible_ids, since, until)
+        metrics['clients_count'] = Client.objects.filter(
+            created_at__gte=since, created_at__lte=until
+        ).count()
+        return metrics
+    return _cached('kpis', responsible_ids, period_token, compute)
+
+
+def get_status_counts(responsible_ids):
+    """Диаграмма статусов (не зависит от периода, кэшируется)."""
+    return _cached('status', responsible_ids, 'all', lambda: status_counts(responsible_ids))
+
+
+def get_plan_progress(responsible_ids, period_token, since, until):
+    """Прогресс плана за текущий месяц или None, если плана нет."""
+    total_target = _cached(
+        'plan_target', responsible_ids, 'month', lambda: plan_target(responsible_ids)
+    )
+    if total_target <= 0:
+        return None
+    completed_month = get_kpis(responsible_ids, period_token, since, until)['completed_month']
+    month_start, month_end = current_month_bounds()
+    return {
+        'plan_count': int(total_target),
+        'completed': int(completed_month),
+        'remaining': int(max(0, total_target - completed_month)),
+        'progress_percent': min(100, round((completed_month / total_target) * 100, 2)),
+        'is_completed': completed_month >= total_target,
+        'plan_name': 'План (текущий месяц)',
+        'plan_period': f"{month_start.strftime('%d.%m.%Y')} - {month_end.strftime('%d.%m.%Y')}",
+    }
+
+
+def adjust_status_counter(responsible_id, status, delta):
+    """Изменить счётчик (ответственный, статус) на delta."""
+    updated = StatusCounter.objects.filter(
+        responsible_id=responsible_id, status=status
+    ).update(count=F('count') + delta)
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            StatusCounter.objects.create(
+                responsible_id=responsible_id, status=status, count=delta
+            )
+    except IntegrityError:
+        # Строку успели создать параллельно — повторяем UPDATE
+        StatusCounter.objects.filter(
+            responsible_id=responsible_id, status=status
+        ).update(count=F('count') + delta)
+
+
+def live_status_counts():
+    """Фактические количества заказов по (ответственный, статус) из таблицы заказов."""
+    return {
+        (row['responsible_id'], row['status']): row['total']
+        for row in Order.objects.values('responsible_id', 'status')
+        .annotate(total=Count('id'))
+        .order_by()
+    }
+
+
+def status_counter_mismatches():
+    """Расхождения счётчиков с таблицей заказов: {(ответственный, статус): (счётчик, факт)}."""
+    live = live_status_counts()
+    stored = {
+        (row.responsible_id, row.status): row.count
+        for row in StatusCounter.objects.all()
+    }
+    mismatches = {}
+    for key in set(live) | set(stored):
+        if stored.get(key, 0) != live.get(key, 0):
+            mismatches[key] = (stored.get(key, 0), live.get(key, 0))
+    return mismatches
+
+
+def rebuild_status_counters():
+    """Полностью пересобрать счётчики статусов по таблице заказов."""
+    live = live_status_counts()
+    with transaction.atomic():
+        StatusCounter.objects.all().delete()
+        StatusCounter.objects.bulk_create([
+            StatusCounter(responsible_id=responsible_id, status=status, count=total)
+            for (responsible_id, status), total in live.items()
+        ])
+    bump_data_version()
+    return len(live)
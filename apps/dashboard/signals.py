@@ -0,0 +1,93 @@
+from django.db.models.signals import post_init, post_save, pre_save, post_delete
+from django.dispatch import receiver
+
+from apps.orders.models import Order
+from apps.orders.signals import orders_repriced
+from apps.clients.models import Client
+from apps.clients.signals import clients_imported
+from apps.plans.models import PlanAssignment
+from apps.products.models import Product
+from apps.products.signals import products_imported
+from apps.cities.models import City
+from .services import adjust_status_counter, bump_data_version, invalidate_static_count
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+@receiver(post_save, sender=PlanAssignment)
+@receiver(post_delete, sender=PlanAssignment)
+@receiver(clients_imported)
+@receiver(orders_repriced)
+def dashboard_data_changed(sender, **kwargs):
+    """Заказы, клиенты или планы изменились — метрики дашборда устарели."""
+    bump_data_version()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+def dashboard_static_count_changed(sender, created=True, **kwargs):
+    """Сбросить счётчик справочника при добавлении/удалении записи."""
+    if created:
+        invalidate_static_count(sender)
+
+
+@receiver(products_imported)
+def dashboard_products_imported(sender, created=0, deleted=0, **kwargs):
+    """Пакетный импорт добавил или удалил товары — сбросить счётчик."""
+    if created or deleted:
+        invalidate_static_count(Product)
+
+
+def _counter_key(order, fallback=None):
+    """(ответственный, статус) из загруженных полей, без догрузки отложенных.
+
+    Незагруженные поля берутся из fallback (исходные значения заказа).
+    """
+    responsible_id, status = fallback or (None, None)
+    status = order.__dict__.get('status', status)
+    responsible_id = order.__dict__.get('responsible_id', responsible_id)
+    if status is None or responsible_id is None:
+        return None
+    return responsible_id, status
+
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    """Запоминаем исходные статус и ответственного загруженного заказа."""
+    instance._status_counter_key = _counter_key(instance) if instance.pk else None
+
+
+@receiver(pre_save, sender=Order)
+def load_order_status(sender, instance, **kwargs):
+    """Если исходные значения не были загружены (only/defer) — берём из БД."""
+    if instance._state.adding or instance._status_counter_key is not None:
+        return
+    instance._status_counter_key = (
+        Order.objects.filter(pk=instance.pk)
+        .values_list('responsible_id', 'status')
+        .first()
+    )
+
+
+@receiver(post_save, sender=Order)
+def update_status_counters(sender, instance, created, **kwargs):
+    """+1/-1 в StatusCounter при создании заказа и смене статуса/ответственного."""
+    old_key = None if created else instance._status_counter_key
+    new_key = _counter_key(instance, fallback=old_key)
+    if old_key != new_key:
+        if old_key is not None:
+            adjust_status_counter(*old_key, -1)
+        if new_key is not None:
+            adjust_status_counter(*new_key, 1)
+    instance._status_counter_key = new_key
+
+
+@receiver(post_delete, sender=Order)
+def decrement_status_counter(sender, instance, **kwargs):
+    key = getattr(instance, '_status_counter_key', None) or _counter_key(instance)
+    if key is not None:
+        adjust_status_counter(*key, -1)
@@ -1,3 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from apps.clients.models import Client
+from apps.core.testing import local_cache
+from apps.orders.models import Order
+
+from .models import StatusCounter
+from .services import rebuild_status_counters, status_counter_mismatches, status_counts
+
+
+@local_cache
+class StatusCounterSignalTests(TestCase):
+    """StatusCounter ведётся сигналами заказа: создание, смена статуса/ответственного, удаление."""
+
+    @classmethod
+    def setUpTestData(cls):
+        users = get_user_model().objects
+        cls.manager = users.create_user(email='m1@x.kz', username='m1@x.kz', password='pw')
+        cls.other = users.create_user(email='m2@x.kz', username='m2@x.kz', password='pw')
+        cls.client_obj = Client.objects.create(client_type='individual', name='Клиент')
+
+    def setUp(self):
+        cache.clear()
+
+    def create_order(self, responsible=None, status=Order.STATUS_NEW):
+        responsible = responsible or self.manager
+        return Order.objects.create(
+            client=self.client_obj, responsible=responsible, created_by=responsible,
+            status=status,
+            source=Order.SOURCE_CHOICES[0][0], payment_method=Order.PAYMENT_CHOICES[0][0],
+        )
+
+    def counters(self):
+        return {
+            (row.responsible_id, row.status): row.count
+            for row in StatusCounter.objects.all()
+        }
+
+    def test_create_increments(self):
+        self.create_order()
+        self.create_order()
+        self.assertEqual(self.counters(), {(self.manager.pk, Order.STATUS_NEW): 2})
+
+    def test_status_change_moves_count(self):
+        order = self.create_order()
+        order.status = Order.STATUS_COMPLETED
+        order.save()
+        self.assertEqual(self.counters(), {
+            (self.manager.pk, Order.STATUS_NEW): 0,
+            (self.manager.pk, Order.STATUS_COMPLETED): 1,
+        })
+
+    def test_status_change_with_deferred_fields(self):
+        self.create_order(status=Order.STATUS_RESERVE)
+        # Ответственный не загружен — исходный ключ берётся из БД перед сохранением
+        order = Order.objects.only('id', 'status').get()
+        order.status = Order.STATUS_COMPLETED
+        order.save(update_fields=['status'])
+        self.assertEqual(self.counters(), {
+            (self.manager.pk, Order.STATUS_RESERVE): 0,
+            (self.manager.pk, Order.STATUS_COMPLETED): 1,
+        })
+
+    def test_responsible_change_moves_count(self):
+        order = self.create_order()
+        order.responsible = self.other
+        order.save()
+        self.assertEqual(self.counters(), {
+            (self.manager.pk, Order.STATUS_NEW): 0,
+            (self.other.pk, Order.STATUS_NEW): 1,
+        })
+
+    def test_save_without_changes_keeps_count(self):
+        order = self.create_order()
+        order.save()
+        Order.objects.get(pk=order.pk).save()
+        self.assertEqual(self.counters(), {(self.manager.pk, Order.STATUS_NEW): 1})
+
+    def test_delete_decrements(self):
+        order = self.create_order()
+        self.create_order()
+        Order.objects.get(pk=order.pk).delete()
+        self.assertEqual(self.counters(), {(self.manager.pk, Order.STATUS_NEW): 1})
+
+    def test_status_counts_merge_cancel_reasons(self):
+        self.create_order(status=Order.STATUS_CANCELLED)
+        self.create_order(status=Order.STATUS_CANCEL_NO_ANSWER)
+        self.create_order(responsible=self.other)
+        self.assertEqual(
+            status_counts(None),
+            {Order.STATUS_CANCELLED: 2, Order.STATUS_NEW: 1},
+        )
+        self.assertEqual(status_counts([self.other.pk]), {Order.STATUS_NEW: 1})
+
+    def test_mismatches_and_rebuild(self):
+        order = self.create_order()
+        # UPDATE в обход сигналов — счётчики расходятся с таблицей
+        Order.objects.filter(pk=order.pk).update(status=Order.STATUS_COMPLETED)
+        self.assertEqual(status_counter_mismatches(), {
+            (self.manager.pk, Order.STATUS_NEW): (1, 0),
+            (self.manager.pk, Order.STATUS_COMPLETED): (0, 1),
+        })
+        self.assertEqual(rebuild_status_counters(), 1)
+        self.assertEqual(status_counter_mismatches(), {})
+        self.assertEqual(self.counters(), {(self.manager.pk, Order.STATUS_COMPLETED): 1})
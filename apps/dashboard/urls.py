@@ -5,4 +5,7 @@ app_name = 'dashboard'
 
 urlpatterns = [
     path('', views.dashboard_view, name='dashboard'),
+    path('widgets/kpis/', views.widget_kpis, name='widget_kpis'),
+    path('widgets/status/', views.widget_status, name='widget_status'),
+    path('widgets/plan/', views.widget_plan, name='widget_plan'),
 ]
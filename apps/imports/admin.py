@@ -0,0 +1,13 @@
+from django.contrib import admin
+from .models import ImportJob
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'kind', 'status', 'original_name', 'processed', 'total',
+        'created_count', 'updated_count', 'deleted_count', 'error_count',
+        'created_by', 'created_at', 'finished_at',
+    )
+    list_filter = ('kind', 'status')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
@@ -0,0 +1,141 @@
+"""
+Потоковое чтение Excel (xlsx) для импортов.
+
+Книга открывается openpyxl в режиме read_only: лист читается строка за
+строкой, без загрузки всех ячеек в память. Из строки берутся только нужные
+колонки (по позиции), значения сразу приводятся к типу колонки: TEXT —
+строка ('' для пустой ячейки), NUMBER — float (NaN, если не число).
+iter_frames отдаёт порции DataFrame фиксированного размера, поэтому память
+ограничена порцией и числом нужных колонок, а не размером файла.
+
+Колонки задаются словарём {имя: (позиция с 0, тип)}; строки листа
+нумеруются с 1, как в Excel.
+"""
+import math
+from contextlib import contextmanager
+
+import pandas as pd
+from openpyxl import load_workbook
+
+TEXT = 'text'
+NUMBER = 'number'
+
+FRAME_SIZE = 5000
+
+
+def to_text(value):
+    """Значение ячейки как строка (целые числа — без '.0')."""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def to_number(value):
+    """Значение ячейки как float; пустое и нечисловое — NaN."""
+    if value is None:
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return math.nan
+
+
+CONVERTERS = {TEXT: to_text, NUMBER: to_number}
+
+
+@contextmanager
+def open_sheet(source, sheet_name=0):
+    """Лист книги в режиме read_only; source — путь или файловый объект."""
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        if isinstance(sheet_name, int):
+            yield workbook.worksheets[sheet_name]
+        else:
+            yield workbook[sheet_name]
+    finally:
+        workbook.close()
+
+
+def sheet_header(sheet, row=1):
+    """Заголовки колонок из строки row."""
+    for values in sheet.iter_rows(min_row=row, max_row=row, values_only=True):
+        return [to_text(value) for value in values]
+    return []
+
+
+def estimated_rows(sheet, first_row=1):
+    """Число строк данных по размерам листа (None, если размеры не записаны)."""
+    if sheet.max_row is None:
+        return None
+    return max(0, sheet.max_row - first_row + 1)
+
+
+def iter_rows(sheet, columns, first_row=1, limit=None):
+    """
+    Кортежи значений колонок columns начиная со строки first_row.
+    Пустые (в нужных колонках) строки в конце листа отбрасываются.
+    """
+    if limit == 0 or not columns:
+        return
+    positions = [position for position, _ in columns.values()]
+    converters = [CONVERTERS[kind] for _, kind in columns.values()]
+    empty = tuple(convert(None) for convert in converters)
+    pending_empty = 0
+    count = 0
+    for values in sheet.iter_rows(
+        min_row=first_row, max_col=max(positions) + 1, values_only=True
+    ):
+        width = len(values)
+        raw = [values[position] if position < width else None for position in positions]
+        if all(value is None for value in raw):
+            # Пустые строки отдаются, только если за ними есть данные
+            pending_empty += 1
+            continue
+        for _ in range(pending_empty):
+            yield empty
+            count += 1
+            if count == limit:
+                return
+        pending_empty = 0
+        yield tuple(convert(value) for convert, value in zip(converters, raw))
+        count += 1
+        if count == limit:
+            return
+
+
+def iter_frames(sheet, columns, first_row=1, limit=None, frame_size=FRAME_SIZE):
+    """
+    Порции DataFrame по frame_size строк с колонками — ключами columns.
+    Индекс сквозной, с 0 (номер строки листа — first_row + индекс).
+    """
+    names = list(columns)
+    rows = []
+    offset = 0
+    for row in iter_rows(sheet, columns, first_row=first_row, limit=limit):
+        rows.append(row)
+        if len(rows) >= frame_size:
+            yield _frame(rows, names, offset)
+            offset += len(rows)
+            rows = []
+    if rows:
+        yield _frame(rows, names, offset)
+
+
+def read_frame(sheet, columns, first_row=1, limit=None):
+    """Все строки листа одним DataFrame (только колонки columns)."""
+    frames = list(iter_frames(sheet, columns, first_row=first_row, limit=limit))
+    if not frames:
+        return pd.DataFrame(columns=list(columns))
+    return pd.concat(frames)
+
+
+def _frame(rows, names, offset):
+    return pd.DataFrame(
+        rows, columns=names, index=pd.RangeIndex(offset, offset + len(rows))
+    )
@@ -0,0 +1,66 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.imports.services import claim_next, requeue_stale, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        'Воркер фоновых импортов: выполняет задания ImportJob из очереди. '
+        'Должен работать постоянно рядом с веб-сервером (systemd, supervisor), '
+        'иначе загруженные через сайт файлы остаются в очереди.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить все задания из очереди и завершиться',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Пауза между проверками пустой очереди (сек)',
+        )
+        parser.add_argument(
+            '--requeue-after',
+            type=int,
+            default=5,
+            help='Вернуть в очередь задания, воркер которых не отмечался N минут '
+                 '(упал или был убит); 0 — не возвращать',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Воркер импорта запущен')
+        try:
+            while True:
+                close_old_connections()
+                self._requeue_stale(options['requeue_after'])
+                job = claim_next()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                self.stdout.write(f'Задание #{job.pk}: {job.get_kind_display()}, {job.original_name}')
+                job = run_job(job)
+                style = self.style.SUCCESS if job.status == job.STATUS_DONE else self.style.ERROR
+                self.stdout.write(style(
+                    f'  {job.get_status_display()}: создано {job.created_count}, '
+                    f'обновлено {job.updated_count}, удалено {job.deleted_count}, '
+                    f'ошибок {job.error_count}'
+                    + (f' — {job.message}' if job.message else '')
+                ))
+        except KeyboardInterrupt:
+            self.stdout.write('Воркер остановлен')
+
+    def _requeue_stale(self, minutes):
+        if not minutes:
+            return
+        requeued = requeue_stale(timedelta(minutes=minutes))
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Возвращено в очередь: {requeued}'))
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('clients', 'Клиенты'), ('products', 'Товары')], max_length=20, verbose_name='Тип импорта')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Завершён'), ('failed', 'Ошибка')], db_index=True, default='pending', max_length=20, verbose_name='Статус')),
+                ('file_name', models.CharField(max_length=500, verbose_name='Файл (в хранилище)')),
+                ('original_name', models.CharField(blank=True, max_length=255, verbose_name='Исходное имя файла')),
+                ('options', models.JSONField(blank=True, default=dict, verbose_name='Параметры')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Обработано строк')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Всего строк')),
+                ('created_count', models.PositiveIntegerField(default=0, verbose_name='Создано')),
+                ('updated_count', models.PositiveIntegerField(default=0, verbose_name='Обновлено')),
+                ('deleted_count', models.PositiveIntegerField(default=0, verbose_name='Удалено')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='Ошибок')),
+                ('errors', models.JSONField(blank=True, default=list, verbose_name='Ошибки (первые)')),
+                ('result', models.JSONField(blank=True, default=dict, verbose_name='Доп. результаты')),
+                ('message', models.TextField(blank=True, verbose_name='Сообщение')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начато')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Запустил')),
+            ],
+            options={
+                'verbose_name': 'Задание импорта',
+                'verbose_name_plural': 'Задания импорта',
+                'db_table': 'import_jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
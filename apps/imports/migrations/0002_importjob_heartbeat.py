@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Обновляется воркером во время выполнения; по нему находятся задания упавших воркеров', null=True, verbose_name='Воркер на связи'),
+        ),
+    ]
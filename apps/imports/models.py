@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from apps.accounts.models import User
+
+
+class ImportJob(models.Model):
+    """Задание фонового импорта (выполняется командой run_jobs)"""
+    KIND_CLIENTS = 'clients'
+    KIND_PRODUCTS = 'products'
+    KIND_CHOICES = (
+        (KIND_CLIENTS, 'Клиенты'),
+        (KIND_PRODUCTS, 'Товары'),
+    )
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Завершён'),
+        (STATUS_FAILED, 'Ошибка'),
+    )
+
+    kind = models.CharField(
+        max_length=20, choices=KIND_CHOICES, verbose_name='Тип импорта'
+    )
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING,
+        db_index=True, verbose_name='Статус'
+    )
+    file_name = models.CharField(
+        max_length=500, verbose_name='Файл (в хранилище)'
+    )
+    original_name = models.CharField(
+        max_length=255, blank=True, verbose_name='Исходное имя файла'
+    )
+    options = models.JSONField(default=dict, blank=True, verbose_name='Параметры')
+
+    processed = models.PositiveIntegerField(default=0, verbose_name='Обработано строк')
+    total = models.PositiveIntegerField(default=0, verbose_name='Всего строк')
+    created_count = models.PositiveIntegerField(default=0, verbose_name='Создано')
+    updated_count = models.PositiveIntegerField(default=0, verbose_name='Обновлено')
+    deleted_count = models.PositiveIntegerField(default=0, verbose_name='Удалено')
+    error_count = models.PositiveIntegerField(default=0, verbose_name='Ошибок')
+    errors = models.JSONField(default=list, blank=True, verbose_name='Ошибки (первые)')
+    result = models.JSONField(default=dict, blank=True, verbose_name='Доп. результаты')
+    message = models.TextField(blank=True, verbose_name='Сообщение')
+
+    created_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='import_jobs', verbose_name='Запустил'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Начато')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Завершено')
+    heartbeat_at = models.DateTimeField(
+        null=True, blank=True, verbose_name='Воркер на связи',
+        help_text='Обновляется воркером во время выполнения; по нему находятся задания упавших воркеров',
+    )
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    @property
+    def is_stalled(self):
+        """Задание давно ждёт в очереди — воркер run_jobs, похоже, не запущен."""
+        if self.status != self.STATUS_PENDING or not self.created_at:
+            return False
+        timeout = getattr(settings, 'IMPORT_PENDING_TIMEOUT', 120)
+        return timezone.now() - self.created_at > timedelta(seconds=timeout)
+
+    @property
+    def progress_percent(self):
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.total:
+            return 0
+        return min(100, round(self.processed * 100 / self.total, 1))
+
+    def as_dict(self):
+        """Состояние задания для JSON-опроса прогресса"""
+        return {
+            'id': self.pk,
+            'kind': self.kind,
+            'status': self.status,
+            'status_display': self.get_status_display(),
+            'finished': self.is_finished,
+            'stalled': self.is_stalled,
+            'processed': self.processed,
+            'total': self.total,
+            'progress_percent': self.progress_percent,
+            'created': self.created_count,
+            'updated': self.updated_count,
+            'deleted': self.deleted_count,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'result': self.result,
+            'message': self.message or (
+                'Задание не начато: воркер импорта (manage.py run_jobs) не запущен. '
+                'Импорт выполнится, когда воркер будет запущен.' if self.is_stalled else ''
+            ),
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+    def __str__(self):
+        return f'#{self.pk} {self.get_kind_display()} ({self.get_status_display()})'
+
+    class Meta:
+        db_table = 'import_jobs'
+        ordering = ['-created_at']
+        verbose_name = 'Задание импорта'
+        verbose_name_plural = 'Задания импорта'
@@ -0,0 +1,183 @@
+"""
+Очередь фоновых импортов в БД.
+
+Веб-запрос сохраняет файл и создаёт ImportJob (enqueue), воркер
+run_jobs забирает задания (claim_next) и выполняет их (run_job).
+Исполнитель задания — функция runner(job, progress) -> dict, заданная
+для каждого типа в RUNNERS; progress(processed, total) обновляет
+прогресс, результат содержит счётчики created/updated/deleted и errors.
+
+Пока задание выполняется, воркер раз в HEARTBEAT_INTERVAL секунд обновляет
+heartbeat_at. requeue_stale возвращает в очередь только задания, чей
+воркер перестал отмечаться (упал или был убит), а не просто долгие.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.core.writes import immediate_atomic
+
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+RUNNERS = {
+    ImportJob.KIND_CLIENTS: 'apps.clients.importer.run_import_job',
+    ImportJob.KIND_PRODUCTS: 'apps.products.importer.run_import_job',
+}
+
+# Сколько ошибок хранить в задании
+MAX_STORED_ERRORS = 50
+# Не чаще раза в столько секунд писать прогресс в БД
+PROGRESS_INTERVAL = 1.0
+# Период отметки «воркер жив» у выполняющегося задания (сек)
+HEARTBEAT_INTERVAL = 30
+
+
+def enqueue(kind, uploaded_file, user, **options):
+    """Сохранить загруженный файл и поставить задание в очередь."""
+    name = default_storage.save(
+        f'imports/{uuid.uuid4().hex}_{os.path.basename(uploaded_file.name)}', uploaded_file
+    )
+    return ImportJob.objects.create(
+        kind=kind,
+        file_name=name,
+        original_name=uploaded_file.name,
+        options=options,
+        created_by=user if user and user.is_authenticated else None,
+    )
+
+
+def claim_next():
+    """
+    Забрать следующее задание из очереди. Захват — условный UPDATE
+    по статусу, поэтому несколько воркеров не получат одно задание.
+    """
+    while True:
+        job_id = (
+            ImportJob.objects.filter(status=ImportJob.STATUS_PENDING)
+            .order_by('id').values_list('id', flat=True).first()
+        )
+        if job_id is None:
+            return None
+        claimed = ImportJob.objects.filter(
+            pk=job_id, status=ImportJob.STATUS_PENDING
+        ).update(
+            status=ImportJob.STATUS_RUNNING, started_at=timezone.now(), heartbeat_at=timezone.now(),
+        )
+        if claimed:
+            return ImportJob.objects.get(pk=job_id)
+
+
+def requeue_stale(older_than):
+    """
+    Вернуть в очередь задания в running, воркер которых не отмечался
+    дольше older_than (упал или был остановлен). Долгие задания живого
+    воркера не трогаются. older_than должен быть больше HEARTBEAT_INTERVAL.
+    """
+    return ImportJob.objects.filter(
+        status=ImportJob.STATUS_RUNNING,
+        heartbeat_at__lt=timezone.now() - older_than,
+    ).update(status=ImportJob.STATUS_PENDING, started_at=None, heartbeat_at=None, processed=0)
+
+
+class _Heartbeat(threading.Thread):
+    """Фоновая отметка heartbeat_at, пока задание выполняется."""
+
+    def __init__(self, job_id):
+        super().__init__(name=f'import-job-{job_id}-heartbeat', daemon=True)
+        self.job_id = job_id
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(HEARTBEAT_INTERVAL):
+                try:
+                    ImportJob.objects.filter(
+                        pk=self.job_id, status=ImportJob.STATUS_RUNNING
+                    ).update(heartbeat_at=timezone.now())
+                except DatabaseError as e:
+                    # БД занята импортом — отметимся в следующий раз
+                    logger.warning(f'Import job #{self.job_id} heartbeat failed: {e}')
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class _Progress:
+    """Колбэк прогресса с ограничением частоты записи в БД."""
+
+    def __init__(self, job):
+        self.job = job
+        self.last = 0.0
+
+    def __call__(self, processed, total):
+        now = time.monotonic()
+        if processed < total and now - self.last < PROGRESS_INTERVAL:
+            return
+        self.last = now
+        ImportJob.objects.filter(pk=self.job.pk).update(processed=processed, total=total)
+
+
+def run_job(job):
+    """Выполнить задание и сохранить результат. Файл задания удаляется."""
+    logger.info(f'Import job #{job.pk} ({job.kind}) started')
+    heartbeat = _Heartbeat(job.pk)
+    heartbeat.start()
+    try:
+        runner = import_string(RUNNERS[job.kind])
+        stats = runner(job, _Progress(job))
+    except Exception as e:
+        logger.exception(f'Import job #{job.pk} failed')
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.STATUS_FAILED,
+            message=str(e),
+            finished_at=timezone.now(),
+        )
+    else:
+        errors = stats.get('errors') or []
+        extra = {
+            key: value for key, value in stats.items()
+            if key not in ('created', 'updated', 'deleted', 'errors')
+        }
+        with immediate_atomic():
+            job.refresh_from_db(fields=['processed', 'total'])
+            ImportJob.objects.filter(pk=job.pk).update(
+                status=ImportJob.STATUS_DONE,
+                processed=max(job.processed, job.total),
+                created_count=stats.get('created', 0),
+                updated_count=stats.get('updated', 0),
+                deleted_count=stats.get('deleted', 0),
+                error_count=len(errors),
+                errors=errors[:MAX_STORED_ERRORS],
+                result=extra,
+                finished_at=timezone.now(),
+            )
+        logger.info(
+            f'Import job #{job.pk} done: created={stats.get("created", 0)} '
+            f'updated={stats.get("updated", 0)} deleted={stats.get("deleted", 0)} '
+            f'errors={len(errors)}'
+        )
+    finally:
+        heartbeat.stop()
+        try:
+            default_storage.delete(job.file_name)
+        except Exception:
+            logger.warning(f'Could not delete import file {job.file_name}')
+    job.refresh_from_db()
+    return job
+
+
+def job_file_path(job):
+    """Локальный путь к файлу задания."""
+    return default_storage.path(job.file_name)
@@ -0,0 +1,17 @@
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+
+from .models import ImportJob
+
+
+@login_required(login_url='accounts:login')
+def job_status(request, job_id):
+    """Прогресс и результат задания импорта (AJAX-опрос)."""
+    jobs = ImportJob.objects.all()
+    if not request.user.is_superuser:
+        jobs = jobs.filter(created_by=request.user)
+    job = get_object_or_404(jobs, pk=job_id)
+    response = JsonResponse(job.as_dict())
+    response['Cache-Control'] = 'no-store'
+    return response
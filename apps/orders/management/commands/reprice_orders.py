@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.orders.models import Order
+from apps.orders.pricing import REPRICE_STATUSES, reprice_orders
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитать цены позиций и итоги открытых заказов по текущим ценам '
+        'товаров (по умолчанию статусы «Новый» и «Резерв»)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--status', action='append', dest='statuses',
+            help='Статус заказов (можно несколько раз)',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать изменения, ничего не записывать',
+        )
+
+    def handle(self, *args, **options):
+        statuses = options['statuses'] or REPRICE_STATUSES
+        known = {value for value, _ in Order.STATUS_CHOICES}
+        unknown = set(statuses) - known
+        if unknown:
+            raise CommandError(f'Неизвестные статусы: {", ".join(sorted(unknown))}')
+
+        report = reprice_orders(statuses=statuses, dry_run=options['dry_run'])
+        self.stdout.write(
+            f'Заказов: {report["orders"]}, позиций: {report["items"]}\n'
+            f'Изменится заказов: {report["orders_changed"]}, '
+            f'позиций: {report["items_changed"]}\n'
+            f'Сумма: {report["total_before"]} → {report["total_after"]} '
+            f'({report["delta"]:+})'
+        )
+        for order in report['largest']:
+            self.stdout.write(f'  №{order["order_number"]}: {order["old"]} → {order["new"]}')
+        if options['dry_run']:
+            self.stdout.write('Пробный запуск: изменения не записаны')
+        else:
+            self.stdout.write(self.style.SUCCESS('Цены заказов пересчитаны'))
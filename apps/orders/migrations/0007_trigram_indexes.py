@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:10
+
+from django.db import migrations
+
+from apps.core.postgres import create_trigram_indexes, drop_trigram_indexes
+
+# GIN-индексы pg_trgm для поиска icontains/contains (только PostgreSQL):
+# (модель, поле, имя индекса, без учёта регистра)
+TRIGRAM_INDEXES = [
+    ('Order', 'order_number', 'orders_number_trgm', True),
+    ('Order', 'sale_number', 'orders_sale_number_trgm', True),
+    ('OrderItem', 'product_code', 'order_items_code_trgm', True),
+    ('OrderItem', 'product_name', 'order_items_name_trgm', True),
+]
+
+
+def create_indexes(apps, schema_editor):
+    create_trigram_indexes(apps, schema_editor, 'orders', TRIGRAM_INDEXES)
+
+
+def drop_indexes(apps, schema_editor):
+    drop_trigram_indexes(apps, schema_editor, 'orders', TRIGRAM_INDEXES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_add_performance_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
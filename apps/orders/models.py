@@ -228,7 +228,7 @@ class OrderItem(models.Model):
         if self.product:
             # Заполняем базовые поля, если они пустые
             if not self.product_code:
-                self.product_code = self.product.code
+                self.product_code = self.product.code or ''
             if not self.product_name:
                 self.product_name = self.product.name
             # Выбираем цену в зависимости от уровня цен заказа (если не задана)
@@ -259,15 +259,5 @@ class OrderItem(models.Model):
         """Возвращает цену в зависимости от уровня цен заказа"""
         if not self.product:
             return 0
-        
-        price_level = self.order.price_level
-        
-        if price_level == 'wholesale' and self.product.wholesale_price:
-            return self.product.wholesale_price
-        elif price_level == 'promotional' and self.product.promotional_price:
-            return self.product.promotional_price
-        elif price_level == 'retail' and self.product.retail_price:
-            return self.product.retail_price
-        else:
-            # Fallback на основную цену
-            return self.product.price
+        from .pricing import resolve_price
+        return resolve_price(self.product, self.order.price_level)
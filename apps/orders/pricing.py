@@ -0,0 +1,187 @@
+"""
+Цены заказов: выбор цены товара по уровню цен заказа и пересчёт
+открытых заказов.
+
+Цена позиции — цена товара уровня заказа (оптовая/акционная/розничная);
+если она не задана (пусто или 0) — основная цена товара. Акция заказа
+(is_promo) даёт -10% на итог заказа.
+
+reprice_orders пересчитывает сразу все заказы в статусах REPRICE_STATUSES
+(например, после импорта прайса): цены товаров загружаются одной матрицей
+«товар × уровень» (в тиынах, int64), цена каждой позиции выбирается
+индексами NumPy, итоги заказов суммируются np.add.at. Изменённые позиции
+и заказы записываются bulk_update в транзакции immediate_atomic (с повтором
+при блокировке SQLite); в режиме dry_run возвращается только отчёт.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.writes import immediate_atomic, retry_on_lock
+from apps.products.models import Product, ProductPrice
+
+from .models import Order, OrderItem
+from .signals import orders_repriced
+
+# Уровень цен заказа → поле цены товара
+LEVEL_FIELDS = ProductPrice.LEVEL_FIELDS
+# Колонки матрицы цен: 0 — основная цена (запасная), дальше уровни
+PRICE_COLUMNS = ['price', *LEVEL_FIELDS.values()]
+LEVEL_COLUMNS = {level: index for index, level in enumerate(LEVEL_FIELDS, start=1)}
+
+PROMO_FACTOR = Decimal('0.9')
+
+REPRICE_STATUSES = [Order.STATUS_NEW, Order.STATUS_RESERVE]
+BATCH_SIZE = None
+REPORT_TOP = 20
+
+CENT = Decimal('0.01')
+
+
+def resolve_price(product, price_level):
+    """Цена товара для уровня цен заказа (основная цена, если уровня нет)."""
+    field = LEVEL_FIELDS.get(price_level)
+    price = getattr(product, field) if field else None
+    return price or product.price
+
+
+def promo_total(total, is_promo):
+    """Итог заказа с учётом акции -10% (округление до тиына, половина — вверх)."""
+    total = Decimal(total)
+    if is_promo:
+        total *= PROMO_FACTOR
+    return total.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def promo_cents(totals, promo):
+    """То же для массива итогов в тиынах (int64): правило округления как в promo_total."""
+    return np.where(promo, (totals * 9 + 5) // 10, totals)
+
+
+def _cents(value):
+    return int(Decimal(value or 0) * 100)
+
+
+def _money(cents):
+    return (Decimal(int(cents)) / 100).quantize(CENT)
+
+
+def price_matrix(products):
+    """
+    (ids, matrix) для queryset товаров: отсортированные id и цены
+    в тиынах по колонкам PRICE_COLUMNS (0 — цена не задана).
+    """
+    rows = list(products.order_by('id').values_list('id', *PRICE_COLUMNS))
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    matrix = np.array(
+        [[_cents(value) for value in row[1:]] for row in rows], dtype=np.int64
+    ).reshape(len(rows), len(PRICE_COLUMNS))
+    return ids, matrix
+
+
+@retry_on_lock
+def reprice_orders(statuses=REPRICE_STATUSES, dry_run=False, batch_size=BATCH_SIZE,
+                   top=REPORT_TOP):
+    """
+    Пересчитать цены позиций и итоги заказов в статусах statuses по текущим
+    ценам товаров. Возвращает отчёт: orders, items, orders_changed,
+    items_changed, total_before, total_after, delta, largest (заказы
+    с наибольшим изменением итога).
+    """
+    # Чтение и запись — одна транзакция: блокировку записи берём сразу
+    # (BEGIN IMMEDIATE), иначе переход от чтения к записи в SQLite падает
+    # с «database is locked», если другой процесс успел записать
+    with (transaction.atomic() if dry_run else immediate_atomic()):
+        orders = list(
+            Order.objects.filter(status__in=statuses).order_by('id')
+            .values_list('id', 'order_number', 'price_level', 'is_promo', 'total_amount')
+        )
+        items = list(
+            OrderItem.objects.filter(order__status__in=statuses)
+            .values_list('id', 'order_id', 'product_id', 'price', 'amount', 'quantity')
+        )
+        product_ids, matrix = price_matrix(
+            Product.objects.filter(
+                id__in=OrderItem.objects.filter(order__status__in=statuses)
+                .values('product_id')
+            )
+        )
+
+        order_ids = np.array([order[0] for order in orders], dtype=np.int64)
+        level_columns = np.array(
+            [LEVEL_COLUMNS.get(order[2], 0) for order in orders], dtype=np.int64
+        )
+        promo = np.array([order[3] for order in orders], dtype=bool)
+        totals_before = np.array([_cents(order[4]) for order in orders], dtype=np.int64)
+
+        item_ids = np.array([item[0] for item in items], dtype=np.int64)
+        item_orders = np.searchsorted(
+            order_ids, np.array([item[1] for item in items], dtype=np.int64)
+        )
+        item_products = np.searchsorted(
+            product_ids, np.array([item[2] for item in items], dtype=np.int64)
+        )
+        prices_before = np.array([_cents(item[3]) for item in items], dtype=np.int64)
+        amounts_before = np.array([_cents(item[4]) for item in items], dtype=np.int64)
+        quantities = np.array([item[5] for item in items], dtype=np.int64)
+
+        # Цена уровня заказа, если не задана — основная цена товара
+        prices = matrix[item_products, level_columns[item_orders]]
+        prices = np.where(prices > 0, prices, matrix[item_products, 0])
+        amounts = prices * quantities
+
+        totals = np.zeros(len(orders), dtype=np.int64)
+        np.add.at(totals, item_orders, amounts)
+        # Акция -10%
+        totals = promo_cents(totals, promo)
+
+        items_changed = (prices != prices_before) | (amounts != amounts_before)
+        orders_changed = totals != totals_before
+
+        deltas = totals - totals_before
+        largest = np.argsort(-np.abs(deltas), kind='stable')[:top]
+        report = {
+            'orders': len(orders),
+            'items': len(items),
+            'orders_changed': int(orders_changed.sum()),
+            'items_changed': int(items_changed.sum()),
+            'total_before': _money(totals_before.sum()),
+            'total_after': _money(totals.sum()),
+            'delta': _money(deltas.sum()),
+            'largest': [
+                {
+                    'order_number': orders[index][1],
+                    'old': _money(totals_before[index]),
+                    'new': _money(totals[index]),
+                }
+                for index in largest if deltas[index]
+            ],
+        }
+        if dry_run or not (report['items_changed'] or report['orders_changed']):
+            return report
+
+        OrderItem.objects.bulk_update(
+            [
+                OrderItem(pk=int(item_ids[index]), price=_money(prices[index]),
+                          amount=_money(amounts[index]))
+                for index in np.flatnonzero(items_changed)
+            ],
+            ['price', 'amount'],
+            batch_size=batch_size,
+        )
+        now = timezone.now()
+        Order.objects.bulk_update(
+            [
+                Order(pk=int(order_ids[index]), total_amount=_money(totals[index]),
+                      updated_at=now)
+                for index in np.flatnonzero(orders_changed)
+            ],
+            ['total_amount', 'updated_at'],
+            batch_size=batch_size,
+        )
+        transaction.on_commit(lambda: orders_repriced.send(
+            sender=Order, orders=report['orders_changed'], items=report['items_changed'],
+        ))
+    return report
@@ -0,0 +1,35 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import Signal, receiver
+
+from apps.core.cache import ORDERS, ORDERS_BULK, invalidate_tags, scope_tag
+
+from .models import Order
+
+# Цены открытых заказов пересчитаны пакетно (bulk_update не отправляет
+# post_save). Аргументы: orders, items — количество изменённых записей.
+orders_repriced = Signal()
+
+
+@receiver(post_init, sender=Order)
+def remember_responsible(sender, instance, **kwargs):
+    """Исходный ответственный — при смене сбрасывается кэш обоих."""
+    instance._cache_responsible_id = instance.__dict__.get('responsible_id')
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_changed(sender, instance, **kwargs):
+    """Заказ изменён — сбросить кэш всех заказов и области его ответственного."""
+    if 'responsible_id' not in instance.__dict__:
+        # Ответственный не загружен (only/defer) — область неизвестна
+        invalidate_tags(ORDERS, ORDERS_BULK)
+        return
+    responsible_ids = {instance._cache_responsible_id, instance.responsible_id} - {None}
+    invalidate_tags(ORDERS, *(scope_tag(pk) for pk in responsible_ids))
+    instance._cache_responsible_id = instance.__dict__.get('responsible_id')
+
+
+@receiver(orders_repriced)
+def orders_bulk_changed(sender, **kwargs):
+    """Пакетный пересчёт — затронутые ответственные неизвестны."""
+    invalidate_tags(ORDERS, ORDERS_BULK)
@@ -1 +1,26 @@
-# Create your tests here.
+from decimal import Decimal
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from .pricing import promo_cents, promo_total
+
+
+class PromoRoundingTests(SimpleTestCase):
+    """Итог акционного заказа одинаков при сохранении и при пакетном пересчёте."""
+
+    def test_half_cent_rounds_up_in_both_paths(self):
+        # 12.25 * 0.9 = 11.025
+        self.assertEqual(promo_total(Decimal('12.25'), True), Decimal('11.03'))
+        self.assertEqual(promo_cents(np.array([1225]), np.array([True]))[0], 1103)
+
+    def test_paths_agree(self):
+        totals = np.arange(0, 100000, 7, dtype=np.int64)
+        promo = np.ones(len(totals), dtype=bool)
+        vectorized = promo_cents(totals, promo)
+        for cents, result in zip(totals, vectorized):
+            self.assertEqual(promo_total(Decimal(int(cents)) / 100, True), Decimal(int(result)) / 100)
+
+    def test_without_promo_total_is_unchanged(self):
+        self.assertEqual(promo_total(Decimal('12.25'), False), Decimal('12.25'))
+        self.assertEqual(promo_cents(np.array([1225]), np.array([False]))[0], 1225)
@@ -9,27 +9,16 @@ from django.db.models import Q
 import logging
 from django.core.cache import cache
 import json
-from decimal import Decimal
 from datetime import timedelta
 
+from apps.core.cache import CLIENTS, ORDERS, cache_tags
+from apps.core.writes import coordinated_write
 from .models import Order, OrderItem
+from .pricing import promo_total, resolve_price
 from apps.products.models import Product
 from apps.clients.models import Client, ClientPhone
 
 
-def _get_price_by_level(product, price_level):
-    """Возвращает цену в зависимости от уровня цен заказа"""
-    if price_level == 'wholesale' and product.wholesale_price:
-        return product.wholesale_price
-    elif price_level == 'promotional' and product.promotional_price:
-        return product.promotional_price
-    elif price_level == 'retail' and product.retail_price:
-        return product.retail_price
-    else:
-        # Fallback на основную цену
-        return product.price
-
-
 @login_required
 def orders_list(request):
     """Список заказов"""
@@ -191,9 +180,9 @@ def orders_list(request):
     from apps.accounts.models import User
     from apps.clients.models import ClientPhone, ClientAddress
     
-    # Кешируем часто используемые данные
-    cache_key_prefix = 'orders_filters_'
-    cache_timeout = 300  # 5 минут
+    # Кешируем часто используемые данные до изменения заказов или клиентов
+    cache_key_prefix = f'orders_filters:{cache_tags(ORDERS, CLIENTS)}:'
+    cache_timeout = 60 * 60  # 1 час
     
     responsible_users = cache.get(f'{cache_key_prefix}responsible_users')
     if responsible_users is None:
@@ -253,6 +242,7 @@ def orders_list(request):
 
 @login_required
 @require_http_methods(["GET", "POST"])
+@coordinated_write
 def add_order(request):
     """Страница создания заказа и обработчик POST (AJAX)."""
     if request.method == 'GET':
@@ -341,7 +331,7 @@ def add_order(request):
                     )
 
                 # Определяем цену в зависимости от уровня цен заказа
-                price = _get_price_by_level(product, order.price_level)
+                price = resolve_price(product, order.price_level)
 
                 order_item = OrderItem(
                     order=order,
@@ -359,9 +349,7 @@ def add_order(request):
                 total += order_item.amount
 
             # Итоговая сумма и возможная акция -10%
-            if order.is_promo:
-                total = Decimal(total) * Decimal('0.9')
-            order.total_amount = total
+            order.total_amount = promo_total(total, order.is_promo)
             order.updated_at = timezone.now()
             order.save(update_fields=['total_amount', 'updated_at'])
 
@@ -394,6 +382,7 @@ def order_detail(request, pk):
 
 @login_required
 @require_http_methods(["GET", "POST"])
+@coordinated_write
 def edit_order(request, pk):
     """Страница редактирования заказа и обработчик POST (AJAX)."""
     order = get_object_or_404(Order.objects.prefetch_related('items'), pk=pk)
@@ -500,7 +489,7 @@ def edit_order(request, pk):
                     )
 
                 # Определяем цену в зависимости от уровня цен заказа
-                price = _get_price_by_level(product, order.price_level)
+                price = resolve_price(product, order.price_level)
 
                 order_item = OrderItem(
                     order=order,
@@ -517,9 +506,7 @@ def edit_order(request, pk):
                 order_item.save()
                 total += order_item.amount
 
-            if order.is_promo:
-                total = Decimal(total) * Decimal('0.9')
-            order.total_amount = total
+            order.total_amount = promo_total(total, order.is_promo)
             order.updated_at = timezone.now()
             order.save(update_fields=['total_amount', 'updated_at'])
 
@@ -643,6 +630,7 @@ def client_lookup(request):
 
 @login_required
 @require_http_methods(["POST"])
+@coordinated_write
 def update_order_status(request):
     """Обновить статус заказа (AJAX)."""
     # Поддержим JSON и form-encoded
@@ -8,15 +8,18 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.http import JsonResponse, HttpResponseBadRequest
+from django.utils.decorators import method_decorator
 from django.views.decorators.http import require_http_methods
 from django.db import transaction
 import json
 
+from apps.core.writes import coordinated_write
 from .models import Plan, PlanAssignment
 from .serializers import PlanSerializer, PlanListSerializer, PlanAssignmentSerializer
 from .services import recalc_assignment_progress, recalc_plan_progress
 
 
+@method_decorator(coordinated_write, name='dispatch')
 class PlanViewSet(viewsets.ModelViewSet):
     """ViewSet для управления планами"""
     
@@ -97,6 +100,7 @@ class PlanViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
+@method_decorator(coordinated_write, name='dispatch')
 class PlanAssignmentViewSet(viewsets.ModelViewSet):
     """ViewSet для управления назначениями планов"""
     
@@ -238,6 +242,7 @@ def plans_list(request):
 
 @login_required
 @require_http_methods(["GET", "POST"])
+@coordinated_write
 def add_plan(request):
     """Страница создания плана и обработчик POST"""
     from apps.accounts.models import User
@@ -343,6 +348,7 @@ def add_plan(request):
 
 @login_required
 @require_http_methods(["GET", "POST"])
+@coordinated_write
 def edit_plan(request, pk):
     """Страница редактирования плана и обработчик POST"""
     from apps.accounts.models import User
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Product, ProductGroup, Branch, Warehouse
+from .models import Product, ProductGroup, ProductPrice, Branch, Warehouse
 
 
 @admin.register(ProductGroup)
@@ -64,3 +64,19 @@ class WarehouseAdmin(admin.ModelAdmin):
     list_display = ('name', 'branch', 'is_active')
     list_filter = ('branch__city', 'branch', 'is_active')
     search_fields = ('name', 'branch__name', 'branch__city__name')
+
+
+@admin.register(ProductPrice)
+class ProductPriceAdmin(admin.ModelAdmin):
+    """Админка истории цен (только просмотр)"""
+    list_display = ('product', 'level', 'price', 'valid_from', 'valid_to')
+    list_filter = ('level',)
+    search_fields = ('product__code', 'product__name')
+    raw_id_fields = ('product',)
+    date_hierarchy = 'valid_from'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.products'
-    verbose_name = 'Товары'
\ No newline at end of file
+    verbose_name = 'Товары'
+
+    def ready(self):
+        """Подключение сигналов импорта товаров"""
+        import apps.products.signals  # noqa
@@ -0,0 +1,547 @@
+"""
+Импорт товаров из прайс-листа (Excel) и исполнитель фонового импорта.
+
+Этапы:
+- read: прайс читается потоково порциями, только нужные колонки
+  (apps.imports.excel);
+- extract: колонки прайса извлекаются и очищаются векторно (pandas):
+  служебные строки отбрасываются маской, цены разбираются to_numeric,
+  группа товара определяется по ключевым словам названия сразу для всех
+  строк, сезонность — по словарю уникальных значений, типоразмер
+  (ширина, профиль, диаметр, индексы) — регулярными выражениями по колонке
+  (apps.products.tire_size);
+- diff (режим delta): хэш нормализованных полей строки сравнивается
+  с content_hash товара, дальше идут только новые и изменённые строки;
+  изменения цен собираются в отчёт по уровням;
+- write: товары пишутся порциями через bulk_create(update_conflicts=True)
+  по уникальному коду — INSERT ... ON CONFLICT (code) DO UPDATE вместо
+  SELECT + INSERT/UPDATE на каждую строку. Каждая порция — в своей
+  транзакции;
+- reconcile (удаление отсутствующих): коды файла кладутся во временную
+  таблицу, товары без ссылок удаляются одним DELETE, остальные
+  отсутствующие деактивируются одним UPDATE.
+"""
+import hashlib
+import time
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+from django.db import connection, models
+from django.utils import timezone
+
+from apps.core.writes import immediate_atomic, retry_on_lock, write_transaction
+from apps.imports.excel import NUMBER, TEXT
+
+from .models import Product, ProductGroup
+from .signals import products_imported
+from .tire_size import SIZE_FIELDS, parse_sizes
+
+# Раскладка прайса: строка 1 — раздел, 2 — заголовки, данные с 3-й;
+# позиции колонок — с 0
+DATA_ROW = 3
+TEXT_COLUMNS = {
+    'code': 0,
+    'name': 1,
+    'sales_plan_selection': 133,
+    'dimension': 134,
+    'tire_type': 135,
+    'seasonality': 136,
+    'assortment_group': 137,
+}
+PRICE_COLUMNS = {
+    'wholesale_price': 129,
+    'promotional_price': 130,
+    'retail_price': 132,
+}
+# Колонки для потокового чтения (apps.imports.excel)
+PRICE_LIST_COLUMNS = {
+    **{field: (position, TEXT) for field, position in TEXT_COLUMNS.items()},
+    **{field: (position, NUMBER) for field, position in PRICE_COLUMNS.items()},
+}
+
+# Строки-заголовки и разделы прайса
+HEADER_CODE = 'Код'
+HEADER_NAME = 'Наименование'
+SKIP_CODE_MARKERS = ['АВТОШИНЫ', '07.10.2025', '14.10.2025']
+
+# Группа по ключевым словам названия: первое совпавшее правило,
+# внутри правила должны найтись все шаблоны
+GROUP_RULES = [
+    ('1', ['зимн', 'импорт']),
+    ('3', ['легкогруз']),
+    ('5', ['грузов']),
+    ('7', ['сельхоз']),
+    ('8', ['камер']),
+    ('9', ['флипер']),
+    ('9а', ['мото|вело']),
+    ('9г', ['диск|колпак']),
+    ('6', ['спецтехник']),
+    ('5.1', ['шинокомплект']),
+]
+DEFAULT_GROUP = '2'
+
+DIMENSION_PATTERN = r'(\d{3}/\d{2}R\d{2})'
+
+CHUNK_SIZE = 5000
+
+UPDATE_FIELDS = [
+    'name', 'sales_plan_selection', 'dimension', 'tire_type', 'seasonality',
+    'assortment_group', 'product_group', 'price', 'wholesale_price',
+    'promotional_price', 'retail_price', *SIZE_FIELDS, 'content_hash', 'is_active',
+    'updated_at',
+]
+
+# Поля строки прайса, из которых считается content_hash
+HASH_FIELDS = [
+    'name', 'sales_plan_selection', 'dimension', 'tire_type', 'seasonality',
+    'assortment_group', 'product_group', *PRICE_COLUMNS,
+]
+
+PRICE_LEVELS = {
+    'wholesale_price': 'Оптовая',
+    'promotional_price': 'Акционная',
+    'retail_price': 'Розничная',
+}
+PRICE_CHANGE_COLUMNS = ['code', 'name', 'level', 'old', 'new']
+# Сколько крупнейших изменений цены показывать в сводке по уровню
+REPORT_TOP = 20
+# Размер списка для IN (...) при загрузке текущих хэшей
+LOOKUP_CHUNK = 5000
+
+# Временная таблица с кодами файла для сверки
+CODES_TABLE = 'import_product_codes'
+# Строк на один executemany при заполнении временной таблицы
+STAGE_CHUNK = 10000
+
+# Сколько последних символов журнала команды сохранять в задании
+LOG_TAIL = 20000
+
+
+def _clean(series):
+    """Очищенные строки; NaN и 'nan' — ''."""
+    values = series.fillna('').astype(str).str.strip()
+    return values.mask(values == 'nan', '')
+
+
+def parse_prices(series):
+    """Цены: положительные числа, иначе NaN."""
+    prices = pd.to_numeric(series, errors='coerce')
+    return prices.where(prices > 0)
+
+
+def group_codes(names):
+    """Код группы товара по ключевым словам названия (векторно)."""
+    lower = names.str.lower()
+    conditions = []
+    for _, patterns in GROUP_RULES:
+        condition = pd.Series(True, index=names.index)
+        for pattern in patterns:
+            condition &= lower.str.contains(pattern, regex=True)
+        conditions.append(condition)
+    codes = np.select(conditions, [code for code, _ in GROUP_RULES], default=DEFAULT_GROUP)
+    return pd.Series(codes, index=names.index)
+
+
+def _price_text(series):
+    """Цена как строка с двумя знаками ('' для пустой) — для хэша."""
+    return series.round(2).map('{:.2f}'.format).where(series.notna(), '')
+
+
+def content_hashes(data):
+    """MD5 нормализованных полей каждой строки (колонки HASH_FIELDS)."""
+    parts = [
+        _price_text(data[field]) if field in PRICE_COLUMNS else data[field]
+        for field in HASH_FIELDS
+    ]
+    joined = parts[0].str.cat(parts[1:], sep='\x1f')
+    return joined.map(lambda value: hashlib.md5(value.encode()).hexdigest())
+
+
+def normalize_choice(value, choices):
+    """Значение поля с выбором по вхождению в подпись ('Зимние' → 'winter')."""
+    if not value:
+        return ''
+    value_lower = value.lower()
+    for choice_value, choice_label in choices:
+        if value_lower in choice_label.lower():
+            return choice_value
+    return ''
+
+
+def extract_products(df):
+    """
+    Извлечь товары из порции прайса (колонки PRICE_LIST_COLUMNS).
+    Возвращает (data, counters): data — по строке на код (последняя строка
+    файла с этим кодом), колонки — поля Product и product_group (код группы).
+    """
+    data = pd.DataFrame({'code': _clean(df['code']), 'name': _clean(df['name'])})
+    code, name = data['code'], data['name']
+    valid = (
+        (code != '') & (name != '')
+        & (code != HEADER_CODE) & (name != HEADER_NAME)
+        & ~code.str.contains('|'.join(SKIP_CODE_MARKERS), regex=True)
+        # Код — число или строка не короче 5 символов
+        & (code.str.isdigit() | (code.str.len() >= 5))
+    )
+    data = data[valid]
+    source = df[valid]
+
+    for field in TEXT_COLUMNS:
+        if field not in data:
+            data[field] = _clean(source[field])
+    for field in PRICE_COLUMNS:
+        data[field] = parse_prices(source[field])
+
+    # Размерность из названия, если колонка пустая
+    from_name = data['name'].str.extract(DIMENSION_PATTERN, expand=False).fillna('')
+    data['dimension'] = data['dimension'].mask(data['dimension'] == '', from_name)
+    data = data.join(parse_sizes(data['dimension'], data['name']))
+
+    seasons = data['seasonality'].unique()
+    data['seasonality'] = data['seasonality'].map({
+        value: normalize_choice(value, Product.SEASONALITY_CHOICES) for value in seasons
+    })
+    data['product_group'] = group_codes(data['name'])
+
+    # SQLite не проверяет длину строк — обрезаем по модели (кроме кода)
+    for field in TEXT_COLUMNS:
+        if field == 'code':
+            continue
+        max_length = Product._meta.get_field(field).max_length
+        data[field] = data[field].str.slice(0, max_length)
+
+    unique = data.drop_duplicates('code', keep='last').copy()
+    unique['content_hash'] = content_hashes(unique)
+    counters = {
+        'skipped': int((~valid).sum()),
+        'duplicates': len(data) - len(unique),
+    }
+    return unique, counters
+
+
+def _nullable(series):
+    """Список значений, NaN → None."""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def _build_products(part, group_ids):
+    columns = zip(
+        part['code'].tolist(),
+        part['name'].tolist(),
+        part['sales_plan_selection'].tolist(),
+        part['dimension'].tolist(),
+        part['tire_type'].tolist(),
+        part['seasonality'].tolist(),
+        part['assortment_group'].tolist(),
+        [group_ids.get(code) for code in part['product_group']],
+        _nullable(part['wholesale_price']),
+        _nullable(part['promotional_price']),
+        _nullable(part['retail_price']),
+        _nullable(part['tire_width']),
+        _nullable(part['tire_profile']),
+        _nullable(part['tire_rim']),
+        part['load_index'].tolist(),
+        part['speed_index'].tolist(),
+        part['content_hash'].tolist(),
+    )
+    return [
+        Product(
+            code=code,
+            name=name,
+            sales_plan_selection=sales_plan_selection,
+            dimension=dimension,
+            tire_type=tire_type,
+            seasonality=seasonality,
+            assortment_group=assortment_group,
+            product_group_id=group_id,
+            # Основная цена — розничная
+            price=retail_price or 0,
+            wholesale_price=wholesale_price,
+            promotional_price=promotional_price,
+            retail_price=retail_price,
+            tire_width=tire_width,
+            tire_profile=tire_profile,
+            tire_rim=tire_rim,
+            load_index=load_index,
+            speed_index=speed_index,
+            content_hash=content_hash,
+            is_active=True,
+        )
+        for (code, name, sales_plan_selection, dimension, tire_type, seasonality,
+             assortment_group, group_id, wholesale_price, promotional_price,
+             retail_price, tire_width, tire_profile, tire_rim, load_index,
+             speed_index, content_hash) in columns
+    ]
+
+
+def _current_state(codes):
+    """Текущие хэш, активность и цены товаров по кодам (DataFrame по code)."""
+    fields = ['code', 'content_hash', 'is_active', *PRICE_LEVELS]
+    rows = []
+    for start in range(0, len(codes), LOOKUP_CHUNK):
+        rows.extend(
+            Product.objects.filter(code__in=codes[start:start + LOOKUP_CHUNK])
+            .values_list(*fields)
+        )
+    current = pd.DataFrame(rows, columns=fields).set_index('code')
+    for level in PRICE_LEVELS:
+        current[level] = pd.to_numeric(current[level], errors='coerce').astype(float)
+    return current
+
+
+def diff_products(data):
+    """
+    Сравнить строки прайса с базой.
+    Возвращает (changed, unchanged, price_changes): changed — новые
+    и изменённые строки (и неактивные товары), unchanged — число строк
+    без изменений, price_changes — DataFrame изменений цен существующих
+    товаров (code, name, level, old, new).
+    """
+    current = _current_state(data['code'].tolist())
+    merged = data.join(current, on='code', rsuffix='_old')
+    exists = merged['content_hash_old'].notna()
+    changed = ~exists | (merged['content_hash'] != merged['content_hash_old'])
+    changed |= merged['is_active'].eq(False)
+
+    frames = []
+    for level in PRICE_LEVELS:
+        old = merged[f'{level}_old'].round(2)
+        new = merged[level].round(2)
+        differs = exists & (old != new) & ~(old.isna() & new.isna())
+        part = merged.loc[differs, ['code', 'name']].copy()
+        part['level'] = level
+        part['old'] = old[differs]
+        part['new'] = new[differs]
+        frames.append(part)
+    price_changes = pd.concat(frames, ignore_index=True)[PRICE_CHANGE_COLUMNS]
+    return data[changed], int((~changed).sum()), price_changes
+
+
+def _price(value):
+    return None if pd.isna(value) else float(value)
+
+
+def price_change_summary(price_changes, top=REPORT_TOP):
+    """
+    Сводка изменений цен по уровням: количество, рост/снижение,
+    появившиеся/снятые цены и крупнейшие изменения.
+    """
+    summary = {}
+    for level in PRICE_LEVELS:
+        rows = price_changes[price_changes['level'] == level]
+        both = rows['old'].notna() & rows['new'].notna()
+        delta = (rows['new'] - rows['old']).where(both)
+        largest = rows.loc[delta.abs().sort_values(ascending=False).index[:top]]
+        summary[level] = {
+            'changed': len(rows),
+            'up': int((delta > 0).sum()),
+            'down': int((delta < 0).sum()),
+            'added': int((rows['old'].isna() & rows['new'].notna()).sum()),
+            'removed': int((rows['old'].notna() & rows['new'].isna()).sum()),
+            'largest': [
+                {'code': code, 'name': name, 'old': _price(old), 'new': _price(new)}
+                for code, name, old, new in largest[['code', 'name', 'old', 'new']].itertuples(index=False)
+            ],
+        }
+    return summary
+
+
+def upsert_products(data, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Записать товары из extract_products порциями (вставка или обновление
+    по коду). Группы должны существовать. progress(processed, total)
+    вызывается после каждой порции. Возвращает (created, updated).
+    """
+    group_ids = dict(ProductGroup.objects.values_list('code', 'id'))
+    created = updated = 0
+    total = len(data)
+    for start in range(0, total, chunk_size):
+        part = data.iloc[start:start + chunk_size]
+        codes = part['code'].tolist()
+        existing = _write_chunk(_build_products(part, group_ids), codes)
+        created += len(codes) - existing
+        updated += existing
+        if progress:
+            progress(start + len(part), total)
+    return created, updated
+
+
+@write_transaction
+def _write_chunk(products, codes):
+    """Вставить или обновить порцию товаров. Возвращает число уже существовавших."""
+    existing = Product.objects.filter(code__in=codes).count()
+    Product.objects.bulk_create(
+        products,
+        update_conflicts=True,
+        unique_fields=['code'],
+        update_fields=UPDATE_FIELDS,
+    )
+    return existing
+
+
+def _relations(cascade):
+    """Таблицы, ссылающиеся на товар: удаляемые вместе с ним или защищающие его."""
+    return [
+        relation for relation in Product._meta.related_objects
+        if not relation.many_to_many
+        and (relation.on_delete is models.CASCADE) == cascade
+    ]
+
+
+def _unreferenced_condition(table):
+    """NOT EXISTS по каждой таблице, ссылающейся на товар (позиции заказов и т. п.)."""
+    quote = connection.ops.quote_name
+    conditions = []
+    for relation in _relations(cascade=False):
+        conditions.append('NOT EXISTS (SELECT 1 FROM {} WHERE {}.{} = {}.{})'.format(
+            quote(relation.related_model._meta.db_table),
+            quote(relation.related_model._meta.db_table),
+            quote(relation.field.column),
+            table,
+            quote(Product._meta.pk.column),
+        ))
+    return ' AND '.join(conditions) or '1 = 1'
+
+
+@retry_on_lock
+def reconcile_missing(codes):
+    """
+    Убрать товары, которых нет в прайсе: без ссылок — удалить,
+    со ссылками (история продаж, PROTECT) — деактивировать.
+    Возвращает (deleted, deactivated).
+    """
+    quote = connection.ops.quote_name
+    table = quote(Product._meta.db_table)
+    code = quote(Product._meta.get_field('code').column)
+    codes_table = quote(CODES_TABLE)
+    missing = f'({table}.{code} IS NULL OR {table}.{code} NOT IN (SELECT code FROM {codes_table}))'
+
+    with immediate_atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {codes_table}')
+        cursor.execute(f'CREATE TEMPORARY TABLE {codes_table} (code VARCHAR(50) PRIMARY KEY)')
+        codes = sorted(codes)
+        for start in range(0, len(codes), STAGE_CHUNK):
+            cursor.executemany(
+                f'INSERT INTO {codes_table} (code) VALUES (%s)',
+                [(value,) for value in codes[start:start + STAGE_CHUNK]],
+            )
+
+        removable = f'{missing} AND {_unreferenced_condition(table)}'
+        # Зависимые записи (история цен и т. п.) удаляются вместе с товаром
+        for relation in _relations(cascade=True):
+            cursor.execute('DELETE FROM {} WHERE {} IN (SELECT {} FROM {} WHERE {})'.format(
+                quote(relation.related_model._meta.db_table),
+                quote(relation.field.column),
+                quote(Product._meta.pk.column),
+                table,
+                removable,
+            ))
+        cursor.execute(f'DELETE FROM {table} WHERE {removable}')
+        deleted = cursor.rowcount
+        cursor.execute(
+            f'UPDATE {table} SET {quote("is_active")} = %s, {quote("updated_at")} = %s '
+            f'WHERE {missing} AND {table}.{quote("is_active")} = %s',
+            [False, connection.ops.adapt_datetimefield_value(timezone.now()), True],
+        )
+        deactivated = cursor.rowcount
+        cursor.execute(f'DROP TABLE {codes_table}')
+
+    if deleted or deactivated:
+        products_imported.send(sender=Product, created=0, updated=deactivated, deleted=deleted)
+    return deleted, deactivated
+
+
+def import_products(frames, delta=False, chunk_size=CHUNK_SIZE, progress=None, total=None):
+    """
+    Импортировать товары из порций прайса (DataFrame с колонками
+    PRICE_LIST_COLUMNS, см. apps.imports.excel.iter_frames). Порции обрабатываются по
+    очереди, в памяти держится одна. В режиме delta пишутся только новые
+    и изменённые строки (updated_at остальных не меняется).
+    progress(processed, total) вызывается после каждой порции.
+    Возвращает коды файла (для удаления отсутствующих), счётчики,
+    изменения цен (DataFrame, только в режиме delta) и время этапов.
+    """
+    stages = ['read', 'extract', 'diff', 'write'] if delta else ['read', 'extract', 'write']
+    timings = dict.fromkeys(stages, 0.0)
+    codes = set()
+    created = updated = unchanged = skipped = duplicates = processed = 0
+    changes = []
+
+    frames = iter(frames)
+    while True:
+        started = time.perf_counter()
+        df = next(frames, None)
+        timings['read'] += time.perf_counter() - started
+        if df is None:
+            break
+
+        started = time.perf_counter()
+        data, counters = extract_products(df)
+        skipped += counters['skipped']
+        # Повтор кода из предыдущей порции: строка запишется поверх (как последняя)
+        repeated = data['code'].isin(codes)
+        duplicates += counters['duplicates'] + int(repeated.sum())
+        codes.update(data['code'])
+        timings['extract'] += time.perf_counter() - started
+
+        if delta:
+            started = time.perf_counter()
+            data, part_unchanged, part_changes = diff_products(data)
+            unchanged += part_unchanged
+            changes.append(part_changes)
+            timings['diff'] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        part_created, part_updated = upsert_products(data, chunk_size=chunk_size)
+        created += part_created
+        updated += part_updated
+        timings['write'] += time.perf_counter() - started
+
+        processed += len(df)
+        if progress:
+            progress(processed, max(total or 0, processed))
+
+    if created or updated:
+        products_imported.send(sender=Product, created=created, updated=updated)
+
+    price_changes = None
+    if delta:
+        price_changes = (
+            pd.concat(changes, ignore_index=True) if changes
+            else pd.DataFrame(columns=PRICE_CHANGE_COLUMNS)
+        )
+    return {
+        'codes': codes,
+        'rows': processed,
+        'created': created,
+        'updated': updated,
+        'unchanged': unchanged,
+        'skipped': skipped,
+        'duplicates': duplicates,
+        'price_changes': price_changes,
+        'timings': {stage: round(seconds, 3) for stage, seconds in timings.items()},
+    }
+
+
+def run_import_job(job, progress):
+    """
+    Импорт товаров через universal_import с собственным потоком вывода
+    (без подмены sys.stdout) и структурированными счётчиками.
+    """
+    from apps.imports.services import job_file_path
+    from .management.commands.universal_import import Command
+
+    output = StringIO()
+    command = Command(stdout=output, stderr=output)
+    stats = command.import_file(
+        job_file_path(job),
+        limit=job.options.get('limit'),
+        clear_products=job.options.get('clear_products', False),
+        remove_missing=job.options.get('remove_missing', False),
+        delta=job.options.get('delta', False),
+        reprice_orders=job.options.get('reprice_orders', False),
+        progress=progress,
+    )
+    stats['log'] = output.getvalue()[-LOG_TAIL:]
+    return stats
@@ -0,0 +1,147 @@
+"""
+Список товаров: сортировка по белому списку, keyset-пагинация и
+кэшированное количество.
+
+Сортировать можно только по колонкам с индексом (поле, id). Страница
+выбирается условием «после (значение, id) последней строки предыдущей
+страницы» вместо OFFSET, поэтому время запроса не зависит от номера
+страницы, а COUNT(*) на каждую страницу не нужен. Количество товаров под
+фильтром кэшируется с тегом products; сигналы товаров сбрасывают тег при
+любом изменении каталога.
+"""
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+from apps.core.cache import PRODUCTS, cache_tags
+
+from .models import Product
+
+# Ключ сортировки → поле модели (у каждого есть индекс (поле, id))
+SORT_FIELDS = {
+    'code': 'code',
+    'name': 'name',
+    'price': 'price',
+    'assortment_group': 'assortment_group',
+    'created_at': 'created_at',
+}
+DEFAULT_SORT = 'created_at'
+
+PAGE_SIZES = [10, 25, 50, 100]
+DEFAULT_PAGE_SIZE = 25
+
+# Колонки, которые выводит шаблон списка
+LIST_FIELDS = [
+    'id', 'code', 'name', 'price', 'assortment_group', 'created_at',
+    'branch_city__name',
+]
+
+COUNT_TTL = 60 * 60
+
+
+def filtered_products(search=''):
+    """Активные товары, отфильтрованные поиском по коду и названию."""
+    products = Product.objects.filter(is_active=True)
+    if search:
+        products = products.filter(Q(code__icontains=search) | Q(name__icontains=search))
+    return products
+
+
+def cached_count(search=''):
+    """Количество товаров под фильтром (из кэша до изменения каталога)."""
+    digest = hashlib.md5(search.encode()).hexdigest()
+    return cache.get_or_set(
+        f'products:count:{cache_tags(PRODUCTS)}:{digest}',
+        lambda: filtered_products(search).count(),
+        COUNT_TTL,
+    )
+
+
+def encode_cursor(product, sort):
+    """Курсор строки: значение поля сортировки и id."""
+    field = Product._meta.get_field(SORT_FIELDS[sort])
+    value = field.value_to_string(product) if getattr(product, field.attname) is not None else None
+    raw = json.dumps([value, product.pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """(значение, id) из курсора; None, если курсор испорчен."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, pk = json.loads(raw)
+        field = Product._meta.get_field(SORT_FIELDS[sort])
+        return (None if value is None else field.to_python(value)), int(pk)
+    except (ValueError, TypeError, KeyError, json.JSONDecodeError, ValidationError):
+        return None
+
+
+def _ordering(field, descending):
+    # NULL (только у кода) — в начале при возрастании и в конце при убывании,
+    # одинаково в SQLite и PostgreSQL
+    if descending:
+        return [F(field).desc(nulls_last=True), F('id').desc()]
+    return [F(field).asc(nulls_first=True), F('id').asc()]
+
+
+def _after(field, value, pk, descending):
+    """Строки после (value, pk) в порядке _ordering(field, descending)."""
+    if descending:
+        if value is None:
+            return Q(**{f'{field}__isnull': True, 'id__lt': pk})
+        # field <= value — граница диапазона индекса, остальное — уточнение
+        return (
+            Q(**{f'{field}__lte': value})
+            & (Q(**{f'{field}__lt': value}) | Q(id__lt=pk))
+        ) | Q(**{f'{field}__isnull': True})
+    if value is None:
+        return Q(**{f'{field}__isnull': False}) | Q(**{f'{field}__isnull': True, 'id__gt': pk})
+    return Q(**{f'{field}__gte': value}) & (Q(**{f'{field}__gt': value}) | Q(id__gt=pk))
+
+
+def products_page(search='', sort=DEFAULT_SORT, descending=True, per_page=DEFAULT_PAGE_SIZE,
+                  after=None, before=None, last=False):
+    """
+    Страница списка товаров.
+
+    after / before — курсоры последней / первой строки соседней страницы,
+    last — последняя страница. Возвращает словарь: products,
+    has_next/has_previous, next_cursor/previous_cursor.
+    """
+    sort = sort if sort in SORT_FIELDS else DEFAULT_SORT
+    field = SORT_FIELDS[sort]
+    per_page = per_page if per_page in PAGE_SIZES else DEFAULT_PAGE_SIZE
+
+    after = decode_cursor(after, sort) if after else None
+    before = decode_cursor(before, sort) if before else None
+    # Назад и к последней странице — обратный порядок, затем разворот
+    backwards = before is not None or (last and after is None)
+
+    products = filtered_products(search).select_related('branch_city').only(*LIST_FIELDS)
+    if after is not None:
+        products = products.filter(_after(field, *after, descending))
+    elif before is not None:
+        products = products.filter(_after(field, *before, not descending))
+    products = list(
+        products.order_by(*_ordering(field, descending != backwards))[:per_page + 1]
+    )
+
+    more = len(products) > per_page
+    products = products[:per_page]
+    if backwards:
+        products.reverse()
+        has_previous, has_next = more, before is not None
+    else:
+        has_previous, has_next = after is not None, more
+
+    return {
+        'products': products,
+        'has_next': has_next and bool(products),
+        'has_previous': has_previous and bool(products),
+        'next_cursor': encode_cursor(products[-1], sort) if products else None,
+        'previous_cursor': encode_cursor(products[0], sort) if products else None,
+    }
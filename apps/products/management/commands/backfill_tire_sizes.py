@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.tire_size import BACKFILL_BATCH, backfill
+
+
+class Command(BaseCommand):
+    help = (
+        'Разобрать типоразмер (ширина, профиль, диаметр, индексы нагрузки '
+        'и скорости) из размерности и названия у всех товаров'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH)
+
+    def handle(self, *args, **options):
+        checked, updated = backfill(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Проверено товаров: {checked}, обновлено: {updated}')
+        )
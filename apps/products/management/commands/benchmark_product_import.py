@@ -0,0 +1,175 @@
+import math
+import random
+import re
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.imports import excel
+from apps.products import importer
+from apps.products.models import Product, ProductGroup
+
+MODELS = ['Nordman 8', 'Hakkapeliitta 10', 'Pilot Alpin 5', 'UltraGrip Arctic 2', 'Ecopia EP150']
+TIRE_TYPES = ['Легковая', 'Грузовая', 'Легкогрузовая', 'Сельскохозяйственная']
+SEASONS = ['Зимние', 'Летние', 'Всесезонные', '']
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк импорта прайса: пакетный upsert, delta-импорт без изменений '
+        'и построчный update_or_create на синтетическом прайсе '
+        '(по умолчанию 50 000 строк). '
+        'Все изменения откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50_000)
+        parser.add_argument(
+            '--legacy-rows', type=int, default=5000,
+            help='Сколько строк прогнать старым построчным путём (0 — не сравнивать)',
+        )
+        parser.add_argument('--chunk-size', type=int, default=importer.CHUNK_SIZE)
+        parser.add_argument('--file', help='Реальный прайс вместо синтетического')
+
+    def handle(self, *args, **options):
+        if options['file']:
+            started = time.perf_counter()
+            with excel.open_sheet(options['file']) as sheet:
+                df = excel.read_frame(
+                    sheet, importer.PRICE_LIST_COLUMNS, first_row=importer.DATA_ROW
+                )
+            self.stdout.write(
+                f'Чтение (потоково, {len(importer.PRICE_LIST_COLUMNS)} колонок): '
+                f'{time.perf_counter() - started:.2f} с'
+            )
+        else:
+            df = self._price_list(options['rows'])
+        rows = len(df)
+        self.stdout.write(f'Строк в прайсе: {rows}')
+
+        try:
+            with transaction.atomic():
+                self._run(df, options)
+                # Все изменения бенчмарка откатываются
+                raise _Rollback
+        except _Rollback:
+            pass
+        if resource is not None:
+            # ru_maxrss в Linux — в килобайтах
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+            self.stdout.write(f'Пиковая память процесса: {peak} МБ')
+
+    def _run(self, df, options):
+        rows = len(df)
+        self._ensure_groups()
+
+        started = time.perf_counter()
+        data, counters = importer.extract_products(df)
+        extract = time.perf_counter() - started
+        self.stdout.write(
+            f'Разбор (векторно): {extract:.2f} с, товаров {len(data)}, '
+            f'пропущено строк {counters["skipped"]}'
+        )
+
+        for title in ('Запись, первый импорт', 'Запись, повторный импорт'):
+            started = time.perf_counter()
+            created, updated = importer.upsert_products(
+                data, chunk_size=options['chunk_size']
+            )
+            duration = time.perf_counter() - started
+            self.stdout.write(
+                f'{title}: {duration:.2f} с ({len(data) / duration:.0f} строк/с), '
+                f'создано {created}, обновлено {updated}'
+            )
+
+        started = time.perf_counter()
+        result = importer.import_products([df], delta=True, chunk_size=options['chunk_size'])
+        duration = time.perf_counter() - started
+        self.stdout.write(
+            f'Delta-импорт без изменений: {duration:.2f} с, записано '
+            f'{result["created"] + result["updated"]}, без изменений {result["unchanged"]}'
+        )
+
+        legacy_rows = min(options['legacy_rows'], rows)
+        if legacy_rows:
+            started = time.perf_counter()
+            self._legacy_import(df.head(legacy_rows))
+            duration = time.perf_counter() - started
+            self.stdout.write(
+                f'Построчный update_or_create (старый путь), {legacy_rows} строк: '
+                f'{duration:.2f} с ({legacy_rows / duration:.0f} строк/с), '
+                f'оценка на {rows} строк: {duration * rows / legacy_rows:.0f} с'
+            )
+
+    @staticmethod
+    def _price_list(rows):
+        """Прайс в виде порции потокового чтения (колонки PRICE_LIST_COLUMNS)."""
+        rnd = random.Random(42)
+        records = []
+        for i in range(rows):
+            size = (
+                f'{rnd.choice([175, 185, 195, 205, 215, 225])}/'
+                f'{rnd.choice([55, 60, 65, 70])}R{rnd.randint(13, 20)}'
+            )
+            records.append({
+                # Каждая тысячная строка — раздел прайса
+                'code': 'АВТОШИНЫ ЛЕГКОВЫЕ' if i % 1000 == 0 else f'00-{i:08d}',
+                'name': f'{size} {rnd.choice(MODELS)} б/к ЗИМ',
+                'sales_plan_selection': 'Да',
+                'dimension': size if i % 2 else '',
+                'tire_type': rnd.choice(TIRE_TYPES),
+                'seasonality': rnd.choice(SEASONS),
+                'assortment_group': 'Эконом',
+                'wholesale_price': float(rnd.randint(20_000, 200_000)),
+                'promotional_price': float(rnd.randint(20_000, 200_000)) if i % 3 == 0 else math.nan,
+                'retail_price': float(rnd.randint(20_000, 200_000)),
+            })
+        return pd.DataFrame(records, columns=list(importer.PRICE_LIST_COLUMNS))
+
+    @staticmethod
+    def _ensure_groups():
+        codes = {code for code, _ in importer.GROUP_RULES} | {importer.DEFAULT_GROUP}
+        for code in codes:
+            ProductGroup.objects.get_or_create(code=code, defaults={'name': code})
+
+    @staticmethod
+    def _legacy_import(df):
+        """Прежний путь: iterrows, группа и update_or_create на каждую строку."""
+        for _, row in df.iterrows():
+            code = str(row['code']).strip()
+            name = str(row['name']).strip()
+            if not code or 'АВТОШИНЫ' in code:
+                continue
+            lower = name.lower()
+            group_code = next(
+                (group for group, patterns in importer.GROUP_RULES
+                 if all(re.search(pattern, lower) for pattern in patterns)),
+                importer.DEFAULT_GROUP,
+            )
+            try:
+                retail_price = float(row['retail_price']) or None
+            except (TypeError, ValueError):
+                retail_price = None
+            Product.objects.update_or_create(
+                code=code,
+                defaults={
+                    'name': name,
+                    'dimension': str(row['dimension']).strip(),
+                    'tire_type': str(row['tire_type']).strip(),
+                    'product_group': ProductGroup.objects.get(code=group_code),
+                    'price': retail_price or 0,
+                    'retail_price': retail_price,
+                    'is_active': True,
+                },
+            )
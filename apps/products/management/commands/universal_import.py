@@ -1,11 +1,23 @@
-import pandas as pd
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from apps.imports.excel import estimated_rows, iter_frames, open_sheet
+from apps.products.importer import (
+    DATA_ROW,
+    PRICE_COLUMNS,
+    PRICE_LEVELS,
+    PRICE_LIST_COLUMNS,
+    TEXT_COLUMNS,
+    import_products,
+    price_change_summary,
+    reconcile_missing,
+)
 from apps.products.models import Product, ProductGroup
+from apps.orders import pricing
 from apps.orders.models import OrderItem
 from apps.clients.models import Client
 from apps.accounts.models import User
 import os
+from itertools import chain
 
 
 class Command(BaseCommand):
@@ -48,6 +60,22 @@ class Command(BaseCommand):
             action='store_true',
             help='Проверить данные в базе после импорта'
         )
+        parser.add_argument(
+            '--delta',
+            action='store_true',
+            help='Записывать только новые и изменённые товары (по хэшу строки)'
+        )
+        parser.add_argument(
+            '--diff-report',
+            type=str,
+            default=None,
+            help='CSV-файл со всеми изменениями цен (только с --delta)'
+        )
+        parser.add_argument(
+            '--reprice-orders',
+            action='store_true',
+            help='Пересчитать цены открытых заказов (новые, резерв) после импорта'
+        )
 
     def handle(self, *args, **options):
         file_path = options['file_path']
@@ -57,29 +85,65 @@ class Command(BaseCommand):
         analyze_only = options['analyze_only']
         remove_missing = options['remove_missing']
         check_data = options['check_data']
+        delta = options['delta']
+        diff_report = options['diff_report']
+        reprice_orders = options['reprice_orders']
+        if diff_report and not delta:
+            raise CommandError('--diff-report используется только вместе с --delta')
 
         try:
-            # Проверяем существование файла
-            if not os.path.exists(file_path):
-                raise CommandError(f'Файл не найден: {file_path}')
+            self.import_file(
+                file_path,
+                limit=limit,
+                clear_products=clear_products,
+                clear_orders=clear_orders,
+                analyze_only=analyze_only,
+                remove_missing=remove_missing,
+                check_data=check_data,
+                delta=delta,
+                diff_report=diff_report,
+                reprice_orders=reprice_orders,
+            )
+        except CommandError:
+            raise
+        except FileNotFoundError:
+            raise CommandError(f'Файл не найден: {file_path}')
+        except Exception as e:
+            raise CommandError(f'Ошибка при импорте: {str(e)}')
 
-            self.stdout.write(f'Чтение файла: {file_path}')
-            
-            # Читаем файл, пропуская 1 строку (правильная структура)
-            df = pd.read_excel(file_path, skiprows=1)
-            
-            # Ограничиваем количество строк
-            if limit:
-                df = df.head(limit)
+    def import_file(self, file_path, limit=None, clear_products=False,
+                    clear_orders=False, analyze_only=False, remove_missing=False,
+                    check_data=False, delta=False, diff_report=None, reprice_orders=False,
+                    progress=None):
+        """
+        Импорт товаров из файла. Возвращает счётчики
+        {'created', 'updated', 'deleted', 'deactivated', 'errors'}, а в режиме delta также
+        'unchanged' и сводку 'price_changes', с reprice_orders — 'repriced';
+        progress(processed, total)
+        вызывается по ходу обработки строк.
+        """
+        # Проверяем существование файла
+        if not os.path.exists(file_path):
+            raise CommandError(f'Файл не найден: {file_path}')
+
+        self.stdout.write(f'Чтение файла: {file_path}')
+        
+        # Файл читается потоково порциями: только нужные колонки, данные с 3-й строки
+        with open_sheet(file_path) as sheet:
+            total = estimated_rows(sheet, DATA_ROW)
+            if limit and total is not None:
+                total = min(total, limit)
+            frames = iter_frames(sheet, PRICE_LIST_COLUMNS, first_row=DATA_ROW, limit=limit)
+            first = next(frames, None)
             
-            self.stdout.write(f'Найдено строк: {len(df)}')
+            self.stdout.write(f'Строк в листе: {total if total is not None else "неизвестно"}')
             
             # Анализ файла
-            self._analyze_file(df)
+            self._analyze_file(sheet, first)
             
             if analyze_only:
                 self.stdout.write(self.style.SUCCESS('Анализ завершен!'))
-                return
+                return {'created': 0, 'updated': 0, 'deleted': 0, 'deactivated': 0, 'errors': []}
             
             # Очистка данных при необходимости
             if clear_orders:
@@ -89,52 +153,53 @@ class Command(BaseCommand):
                 self._clear_products()
             
             # Импорт данных
-            self._import_products(df, remove_missing)
-            
-            # Проверка данных
-            if check_data:
-                self._check_imported_data()
-            
-            self.stdout.write(
-                self.style.SUCCESS('Импорт завершен успешно!')
+            frames = chain([first], frames) if first is not None else []
+            stats = self._import_products(
+                frames, remove_missing, delta=delta, diff_report=diff_report,
+                progress=progress, total=total,
             )
-            
-        except FileNotFoundError:
-            raise CommandError(f'Файл не найден: {file_path}')
-        except Exception as e:
-            raise CommandError(f'Ошибка при импорте: {str(e)}')
+        
+        # Пересчёт открытых заказов по новым ценам
+        if reprice_orders and (stats['created'] or stats['updated']):
+            stats['repriced'] = self._reprice_orders()
 
-    def _analyze_file(self, df):
-        """Анализ структуры файла"""
+        # Проверка данных
+        if check_data:
+            self._check_imported_data()
+        
+        self.stdout.write(
+            self.style.SUCCESS('Импорт завершен успешно!')
+        )
+        return stats
+
+    def _analyze_file(self, sheet, frame):
+        """Анализ структуры файла по первой порции строк"""
         self.stdout.write('\n=== АНАЛИЗ ФАЙЛА ===')
         
         # Общая информация
-        self.stdout.write(f'Общее количество строк: {len(df)}')
-        self.stdout.write(f'Количество колонок: {len(df.columns)}')
+        self.stdout.write(f'Количество колонок: {sheet.max_column}')
+        if frame is None:
+            self.stdout.write('Строк с данными нет')
+            return
         
         # Первые несколько строк
         self.stdout.write('\nПервые 3 строки:')
-        for i in range(min(3, len(df))):
-            row = df.iloc[i]
-            code = str(row.iloc[0]) if len(row) > 0 else ''
-            name = str(row.iloc[1]) if len(row) > 1 else ''
+        for i, (code, name) in enumerate(frame[['code', 'name']].head(3).itertuples(index=False)):
             self.stdout.write(f'  {i+1}. Код: {code[:20]}... Название: {name[:50]}...')
         
         # Анализ колонок с ценами
         self.stdout.write('\nАнализ цен (колонки 129-132):')
-        for i, col_idx in enumerate([129, 130, 131, 132]):
-            if col_idx < len(df.columns):
-                col_name = df.columns[col_idx] if col_idx < len(df.columns) else f'Col_{col_idx}'
-                sample_values = df.iloc[:5, col_idx].tolist()
-                self.stdout.write(f'  Колонка {col_idx} ({col_name}): {sample_values}')
+        for field, col_idx in PRICE_COLUMNS.items():
+            sample_values = frame[field].head(5).tolist()
+            self.stdout.write(f'  Колонка {col_idx} ({field}): {sample_values}')
         
         # Анализ дополнительных полей
         self.stdout.write('\nАнализ дополнительных полей (колонки 133-137):')
-        for i, col_idx in enumerate([133, 134, 135, 136, 137]):
-            if col_idx < len(df.columns):
-                col_name = df.columns[col_idx] if col_idx < len(df.columns) else f'Col_{col_idx}'
-                sample_values = df.iloc[:5, col_idx].tolist()
-                self.stdout.write(f'  Колонка {col_idx} ({col_name}): {sample_values}')
+        for field, col_idx in TEXT_COLUMNS.items():
+            if col_idx < 133:
+                continue
+            sample_values = frame[field].head(5).tolist()
+            self.stdout.write(f'  Колонка {col_idx} ({field}): {sample_values}')
 
     def _clear_orders(self):
         """Очистка заказов"""
@@ -177,120 +242,91 @@ class Command(BaseCommand):
         ProductGroup.objects.all().delete()
         self.stdout.write(f'Удалено групп товаров: {groups_count}')
 
-    def _import_products(self, df, remove_missing=False):
-        """Импорт товаров"""
+    def _import_products(self, frames, remove_missing=False, delta=False, diff_report=None,
+                         progress=None, total=None):
+        """Импорт товаров; возвращает счётчики created/updated/deleted/errors"""
         self.stdout.write('\n=== ИМПОРТ ТОВАРОВ ===')
         
         # Создаем группы товаров
         self._create_product_groups()
         
-        # Собираем коды товаров из файла для проверки
-        file_codes = set()
-        
-        # Обрабатываем товары
-        products_created = 0
-        products_updated = 0
-        
-        for index, row in df.iterrows():
-            # Извлекаем данные из строки
-            code = str(row.iloc[0]).strip() if len(row) > 0 else ''
-            name = str(row.iloc[1]).strip() if len(row) > 1 else ''
-            
-            # Извлекаем дополнительные данные из правильных колонок
-            sales_plan_selection = str(row.iloc[133]).strip() if len(row) > 133 else ''
-            dimension = str(row.iloc[134]).strip() if len(row) > 134 else ''
-            tire_type_raw = str(row.iloc[135]).strip() if len(row) > 135 else ''  # Легковая, Грузовая и т.д.
-            seasonality_raw = str(row.iloc[136]).strip() if len(row) > 136 else ''  # Зимние, Летние, Всесезонные
-            assortment_group = str(row.iloc[137]).strip() if len(row) > 137 else ''
-            
-            # Извлекаем цены из колонок 129-132
-            wholesale_price = self._parse_price(row.iloc[129]) if len(row) > 129 else None
-            promotional_price = self._parse_price(row.iloc[130]) if len(row) > 130 else None
-            retail_price = self._parse_price(row.iloc[132]) if len(row) > 132 else None
-            
-            # Пропускаем пустые строки или строки с заголовками
-            if (not code or not name or 
-                code == 'nan' or name == 'nan' or
-                code == 'Код' or name == 'Наименование' or
-                'АВТОШИНЫ' in code or '07.10.2025' in code or
-                '14.10.2025' in code):
-                continue
-            
-            # Пропускаем если код не похож на код товара
-            if not code.isdigit() and len(code) < 5:
-                continue
-            
-            # Добавляем код в множество для проверки
-            file_codes.add(code)
-            
-            # Определяем группу товара
-            product_group = self._get_product_group(name)
-            
-            # Определяем тип шины из столбца 135 (тип шины)
-            tire_type = self._determine_tire_type(tire_type_raw)
-            
-            # Создаем или обновляем товар
-            product, created = Product.objects.update_or_create(
-                code=code,
-                defaults={
-                    'name': name,
-                    'sales_plan_selection': sales_plan_selection if sales_plan_selection != 'nan' else '',
-                    'dimension': dimension if dimension != 'nan' else self._extract_dimension(name),
-                    'tire_type': tire_type,
-                    'seasonality': self._normalize_choice(seasonality_raw, Product.SEASONALITY_CHOICES),
-                    'assortment_group': assortment_group if assortment_group != 'nan' else '',
-                    'product_group': product_group,
-                    'price': retail_price or 0,  # Основная цена - розничная
-                    'wholesale_price': wholesale_price,
-                    'promotional_price': promotional_price,
-                    'retail_price': retail_price,
-                    'is_active': True,
-                }
-            )
-            
-            if created:
-                products_created += 1
-                if products_created % 100 == 0:
-                    self.stdout.write(f'Создано товаров: {products_created}')
-            else:
-                products_updated += 1
+        # Векторный разбор прайса и пакетная запись по коду товара
+        result = import_products(frames, delta=delta, progress=progress, total=total)
         
         # Удаляем товары, которых нет в файле
+        deleted = deactivated = 0
         if remove_missing:
-            self._remove_missing_products(file_codes)
+            deleted, deactivated = self._remove_missing_products(result['codes'])
         
-        self.stdout.write(f'Создано товаров: {products_created}')
-        self.stdout.write(f'Обновлено товаров: {products_updated}')
+        self.stdout.write(f'Прочитано строк: {result["rows"]}')
+        self.stdout.write(f'Создано товаров: {result["created"]}')
+        self.stdout.write(f'Обновлено товаров: {result["updated"]}')
+        self.stdout.write(
+            f'Пропущено строк: {result["skipped"]}, повторов кода: {result["duplicates"]}'
+        )
+        self.stdout.write('Время: ' + ', '.join(
+            f'{stage} {seconds} с' for stage, seconds in result['timings'].items()
+        ))
+        stats = {
+            'created': result['created'],
+            'updated': result['updated'],
+            'deleted': deleted,
+            'deactivated': deactivated,
+            'errors': [],
+        }
+        if delta:
+            self.stdout.write(f'Без изменений: {result["unchanged"]}')
+            stats['unchanged'] = result['unchanged']
+            stats['price_changes'] = self._report_price_changes(
+                result['price_changes'], diff_report
+            )
+        return stats
+
+    def _report_price_changes(self, price_changes, diff_report=None):
+        """Вывести сводку изменений цен по уровням и (опционально) записать CSV"""
+        summary = price_change_summary(price_changes)
+        self.stdout.write('\n=== ИЗМЕНЕНИЯ ЦЕН ===')
+        for level, title in PRICE_LEVELS.items():
+            info = summary[level]
+            self.stdout.write(
+                f'{title}: изменено {info["changed"]} (рост {info["up"]}, '
+                f'снижение {info["down"]}, появилась {info["added"]}, снята {info["removed"]})'
+            )
+            for item in info['largest'][:5]:
+                self.stdout.write(f'  {item["code"]}: {item["old"]} → {item["new"]}')
+        if diff_report:
+            report = price_changes.assign(
+                level=price_changes['level'].map(PRICE_LEVELS),
+                delta=price_changes['new'] - price_changes['old'],
+            )
+            report.to_csv(diff_report, index=False, encoding='utf-8-sig')
+            self.stdout.write(f'Отчёт об изменениях цен: {diff_report}')
+        return summary
+
+    def _reprice_orders(self):
+        """Пересчитать цены открытых заказов; возвращает сводку для результата"""
+        self.stdout.write('\n=== ПЕРЕСЧЁТ ОТКРЫТЫХ ЗАКАЗОВ ===')
+        report = pricing.reprice_orders()
+        self.stdout.write(
+            f'Изменено заказов: {report["orders_changed"]} из {report["orders"]}, '
+            f'позиций: {report["items_changed"]}, сумма: {report["delta"]:+}'
+        )
+        return {
+            'orders': report['orders_changed'],
+            'items': report['items_changed'],
+            'delta': float(report['delta']),
+        }
 
     def _remove_missing_products(self, file_codes):
-        """Удаляет товары, которых нет в файле"""
+        """
+        Убирает товары, которых нет в файле: без истории продаж удаляются,
+        остальные деактивируются. Возвращает (удалено, деактивировано)
+        """
         self.stdout.write('\n=== УДАЛЕНИЕ ОТСУТСТВУЮЩИХ ТОВАРОВ ===')
-        
-        # Находим товары в базе, которых нет в файле
-        existing_products = Product.objects.all()
-        products_to_delete = []
-        
-        for product in existing_products:
-            if product.code not in file_codes:
-                products_to_delete.append(product)
-        
-        if products_to_delete:
-            self.stdout.write(f'Найдено товаров для удаления: {len(products_to_delete)}')
-            
-            # Удаляем товары
-            deleted_count = 0
-            for product in products_to_delete:
-                try:
-                    product.delete()
-                    deleted_count += 1
-                    if deleted_count % 100 == 0:
-                        self.stdout.write(f'Удалено товаров: {deleted_count}')
-                except Exception as e:
-                    self.stdout.write(f'Ошибка при удалении товара {product.code}: {e}')
-            
-            self.stdout.write(f'Удалено товаров: {deleted_count}')
-        else:
-            self.stdout.write('Товары для удаления не найдены')
+        deleted, deactivated = reconcile_missing(file_codes)
+        self.stdout.write(f'Удалено товаров: {deleted}')
+        self.stdout.write(f'Деактивировано товаров (есть в заказах): {deactivated}')
+        return deleted, deactivated
 
     def _check_imported_data(self):
         """Проверка импортированных данных"""
@@ -350,73 +386,3 @@ class Command(BaseCommand):
             )
             if created:
                 self.stdout.write(f'Создана группа: {code} - {name}')
-
-    def _get_product_group(self, name):
-        """Определяет группу товара на основе названия"""
-        
-        name_lower = name.lower()
-        
-        # Определяем группу по ключевым словам в названии
-        if 'зимн' in name_lower and 'импорт' in name_lower:
-            return ProductGroup.objects.get(code='1')
-        elif 'легкогруз' in name_lower:
-            return ProductGroup.objects.get(code='3')
-        elif 'грузов' in name_lower:
-            return ProductGroup.objects.get(code='5')
-        elif 'сельхоз' in name_lower:
-            return ProductGroup.objects.get(code='7')
-        elif 'камер' in name_lower:
-            return ProductGroup.objects.get(code='8')
-        elif 'флипер' in name_lower:
-            return ProductGroup.objects.get(code='9')
-        elif 'мото' in name_lower or 'вело' in name_lower:
-            return ProductGroup.objects.get(code='9а')
-        elif 'диск' in name_lower or 'колпак' in name_lower:
-            return ProductGroup.objects.get(code='9г')
-        elif 'спецтехник' in name_lower:
-            return ProductGroup.objects.get(code='6')
-        elif 'шинокомплект' in name_lower:
-            return ProductGroup.objects.get(code='5.1')
-        else:
-            # По умолчанию - легковые шины
-            return ProductGroup.objects.get(code='2')
-
-    def _extract_dimension(self, name):
-        """Извлекает размерность из названия товара"""
-        import re
-        # Ищем паттерн размерности типа 155/65R13
-        match = re.search(r'\d{3}/\d{2}R\d{2}', name)
-        return match.group() if match else ''
-
-    def _determine_tire_type(self, tire_type_raw):
-        """Определяет тип шины на основе столбца 135 (тип шины)"""
-        if tire_type_raw and tire_type_raw != 'nan':
-            return tire_type_raw.strip()
-        
-        # По умолчанию пустая строка
-        return ''
-
-    def _normalize_choice(self, value, choices):
-        """Нормализует значение для полей с выбором"""
-        if not value or value == 'nan':
-            return ''
-        
-        value_lower = value.lower()
-        
-        # Обычная обработка для полей
-        for choice_value, choice_label in choices:
-            if value_lower in choice_label.lower():
-                return choice_value
-        return ''
-
-    def _parse_price(self, value):
-        """Парсит цену из значения"""
-        if not value or str(value) == 'nan':
-            return None
-        
-        try:
-            # Преобразуем в число
-            price = float(value)
-            return price if price > 0 else None
-        except (ValueError, TypeError):
-            return None
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def normalize_codes(apps, schema_editor):
+    """Пустые коды → NULL; у повторяющихся кодов код остаётся у самого нового товара."""
+    Product = apps.get_model('products', 'Product')
+    Product.objects.filter(code='').update(code=None)
+    duplicates = (
+        Product.objects.exclude(code__isnull=True)
+        .values('code').annotate(total=Count('id')).filter(total__gt=1)
+        .values_list('code', flat=True)
+    )
+    for code in list(duplicates):
+        ids = list(
+            Product.objects.filter(code=code).order_by('-id').values_list('id', flat=True)
+        )
+        Product.objects.filter(id__in=ids[1:]).update(code=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_alter_product_tire_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='code',
+            field=models.CharField(blank=True, db_index=True, max_length=50, null=True, verbose_name='Код товара'),
+        ),
+        migrations.RunPython(normalize_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='product',
+            name='code',
+            field=models.CharField(blank=True, max_length=50, null=True, unique=True, verbose_name='Код товара'),
+        ),
+    ]
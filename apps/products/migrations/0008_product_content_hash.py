@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_code_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32, verbose_name='Хэш строки прайса'),
+        ),
+    ]
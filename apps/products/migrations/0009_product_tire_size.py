@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cities', '0001_initial'),
+        ('products', '0008_product_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='load_index',
+            field=models.CharField(blank=True, max_length=7, verbose_name='Индекс нагрузки'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='speed_index',
+            field=models.CharField(blank=True, max_length=2, verbose_name='Индекс скорости'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='tire_profile',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Высота профиля, %'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='tire_rim',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=3, null=True, verbose_name='Посадочный диаметр'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='tire_width',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True, verbose_name='Ширина профиля'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['tire_width', 'tire_rim', 'tire_profile', 'seasonality'], name='products_tire_size_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+LEVEL_FIELDS = {
+    'wholesale': 'wholesale_price',
+    'promotional': 'promotional_price',
+    'retail': 'retail_price',
+}
+
+
+def seed_price_history(apps, schema_editor):
+    """Текущие цены товаров — действующие записи истории (с даты изменения товара)."""
+    Product = apps.get_model('products', 'Product')
+    ProductPrice = apps.get_model('products', 'ProductPrice')
+    rows = Product.objects.values_list('id', 'updated_at', *LEVEL_FIELDS.values())
+    batch = []
+    for product_id, updated_at, *prices in rows.iterator(chunk_size=2000):
+        for level, price in zip(LEVEL_FIELDS, prices):
+            if price is not None:
+                batch.append(ProductPrice(
+                    product_id=product_id, level=level, price=price, valid_from=updated_at,
+                ))
+        if len(batch) >= 2000:
+            ProductPrice.objects.bulk_create(batch)
+            batch = []
+    ProductPrice.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_product_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('wholesale', 'Оптовая'), ('promotional', 'Акционная'), ('retail', 'Розничная')], max_length=20, verbose_name='Уровень цен')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена')),
+                ('valid_from', models.DateTimeField(verbose_name='Действует с')),
+                ('valid_to', models.DateTimeField(blank=True, null=True, verbose_name='Действует по')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='products.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Цена товара',
+                'verbose_name_plural': 'История цен товаров',
+                'db_table': 'product_prices',
+                'ordering': ['product', 'level', '-valid_from'],
+                'indexes': [models.Index(fields=['level', 'product', 'valid_from'], name='product_prices_as_of_idx')],
+            },
+        ),
+        migrations.RunPython(seed_price_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:10
+
+from django.db import migrations
+
+from apps.core.postgres import create_trigram_indexes, drop_trigram_indexes
+
+# GIN-индексы pg_trgm для поиска icontains/contains (только PostgreSQL):
+# (модель, поле, имя индекса, без учёта регистра)
+TRIGRAM_INDEXES = [
+    ('Product', 'code', 'products_code_trgm', True),
+    ('Product', 'name', 'products_name_trgm', True),
+]
+
+
+def create_indexes(apps, schema_editor):
+    create_trigram_indexes(apps, schema_editor, 'products', TRIGRAM_INDEXES)
+
+
+def drop_indexes(apps, schema_editor):
+    drop_trigram_indexes(apps, schema_editor, 'products', TRIGRAM_INDEXES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_product_price_history'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -90,8 +90,9 @@ class Product(models.Model):
         ('all_season', 'Всесезонные'),
     ]
 
+    # Уникален: импорт прайса пишет товары через INSERT ... ON CONFLICT (code)
     code = models.CharField(
-        max_length=50, blank=True, verbose_name='Код товара', db_index=True
+        max_length=50, blank=True, null=True, unique=True, verbose_name='Код товара'
     )
     name = models.CharField(max_length=200, verbose_name='Наименование')
     description = models.TextField(blank=True, null=True)
@@ -150,6 +151,25 @@ class Product(models.Model):
     assortment_group = models.CharField(
         max_length=100, blank=True, verbose_name='Ассортиментная группа'
     )
+
+    # Типоразмер, разобранный из размерности/названия (apps.products.tire_size)
+    tire_width = models.DecimalField(
+        max_digits=6, decimal_places=2, null=True, blank=True,
+        verbose_name='Ширина профиля'
+    )
+    tire_profile = models.PositiveSmallIntegerField(
+        null=True, blank=True, verbose_name='Высота профиля, %'
+    )
+    tire_rim = models.DecimalField(
+        max_digits=3, decimal_places=1, null=True, blank=True,
+        verbose_name='Посадочный диаметр'
+    )
+    load_index = models.CharField(
+        max_length=7, blank=True, verbose_name='Индекс нагрузки'
+    )
+    speed_index = models.CharField(
+        max_length=2, blank=True, verbose_name='Индекс скорости'
+    )
     
     # Связь с группой товаров
     product_group = models.ForeignKey(
@@ -184,6 +204,11 @@ class Product(models.Model):
         verbose_name='Склад'
     )
     is_active = models.BooleanField(default=True, verbose_name='Активен')
+    # Хэш полей из строки прайса при последнем импорте (пусто — изменён вручную)
+    content_hash = models.CharField(
+        max_length=32, blank=True, default='', editable=False,
+        verbose_name='Хэш строки прайса'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -191,6 +216,77 @@ class Product(models.Model):
         db_table = 'products'
         verbose_name = 'Товар'
         verbose_name_plural = 'Товары'
+        indexes = [
+            # Сортировки списка товаров с keyset-пагинацией (apps.products.listing);
+            # код уникален и индексирован
+            models.Index(fields=['name', 'id'], name='products_name_id_idx'),
+            models.Index(fields=['price', 'id'], name='products_price_id_idx'),
+            models.Index(
+                fields=['assortment_group', 'id'], name='products_assortment_id_idx'
+            ),
+            models.Index(fields=['created_at', 'id'], name='products_created_id_idx'),
+            # Подбор по размеру: равенство по ширине и диаметру,
+            # диапазон по профилю, сезонность проверяется по индексу
+            models.Index(
+                fields=['tire_width', 'tire_rim', 'tire_profile', 'seasonality'],
+                name='products_tire_size_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.code} - {self.name} - {self.price}₸"
+
+
+class ProductPrice(models.Model):
+    """
+    История цен товара по уровням: период [valid_from, valid_to),
+    у действующей цены valid_to пустой. Новая запись появляется только при
+    изменении цены (apps.products.prices).
+    """
+
+    LEVEL_WHOLESALE = 'wholesale'
+    LEVEL_PROMOTIONAL = 'promotional'
+    LEVEL_RETAIL = 'retail'
+
+    LEVEL_CHOICES = [
+        (LEVEL_WHOLESALE, 'Оптовая'),
+        (LEVEL_PROMOTIONAL, 'Акционная'),
+        (LEVEL_RETAIL, 'Розничная'),
+    ]
+    # Уровень → поле цены товара
+    LEVEL_FIELDS = {
+        LEVEL_WHOLESALE: 'wholesale_price',
+        LEVEL_PROMOTIONAL: 'promotional_price',
+        LEVEL_RETAIL: 'retail_price',
+    }
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='price_history',
+        verbose_name='Товар'
+    )
+    level = models.CharField(
+        max_length=20, choices=LEVEL_CHOICES, verbose_name='Уровень цен'
+    )
+    price = models.DecimalField(
+        max_digits=10, decimal_places=2, verbose_name='Цена'
+    )
+    valid_from = models.DateTimeField(verbose_name='Действует с')
+    valid_to = models.DateTimeField(
+        null=True, blank=True, verbose_name='Действует по'
+    )
+
+    class Meta:
+        db_table = 'product_prices'
+        verbose_name = 'Цена товара'
+        verbose_name_plural = 'История цен товаров'
+        ordering = ['product', 'level', '-valid_from']
+        indexes = [
+            # Цена на дату: равенство по уровню и товару, диапазон по valid_from
+            models.Index(
+                fields=['level', 'product', 'valid_from'],
+                name='product_prices_as_of_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.level} {self.price} с {self.valid_from:%d.%m.%Y}"
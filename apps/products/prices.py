@@ -0,0 +1,105 @@
+"""
+История цен товаров (ProductPrice) и цена на дату.
+
+sync_price_history сверяет текущие цены товаров с действующими записями
+истории двумя запросами на уровень: запись, цена которой больше не
+совпадает с ценой товара, закрывается (valid_to), для новой цены
+открывается запись. Если цена не менялась, ничего не пишется. Сверка
+вызывается после импорта прайса и сохранения товара (см. signals).
+
+price_as_of отвечает на «какая была цена на 1 марта» сразу для тысяч
+товаров одним запросом по индексу (level, product, valid_from).
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.core.writes import immediate_atomic, retry_on_lock
+
+from .models import Product, ProductPrice
+
+AS_OF_CHUNK = 10000
+
+
+@retry_on_lock
+def sync_price_history(product_ids=None, moment=None):
+    """
+    Записать изменения цен товаров (всех или product_ids) в историю.
+    Возвращает (открыто, закрыто) записей.
+    """
+    moment = connection.ops.adapt_datetimefield_value(moment or timezone.now())
+    quote = connection.ops.quote_name
+    products = quote(Product._meta.db_table)
+    history = quote(ProductPrice._meta.db_table)
+    pk = quote(Product._meta.pk.column)
+    product_id = quote(ProductPrice._meta.get_field('product').column)
+
+    scope, scope_params = '', []
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return 0, 0
+        scope = f' AND {{}} IN ({", ".join(["%s"] * len(product_ids))})'
+        scope_params = product_ids
+
+    opened = closed = 0
+    with immediate_atomic(), connection.cursor() as cursor:
+        for level, field in ProductPrice.LEVEL_FIELDS.items():
+            column = quote(Product._meta.get_field(field).column)
+            # Цена изменилась или снята — закрываем действующую запись
+            cursor.execute(
+                f'UPDATE {history} SET valid_to = %s '
+                f'WHERE valid_to IS NULL AND level = %s'
+                + scope.format(f'{history}.{product_id}')
+                + f' AND NOT EXISTS (SELECT 1 FROM {products} '
+                f'WHERE {products}.{pk} = {history}.{product_id} '
+                f'AND {products}.{column} = {history}.price)',
+                [moment, level, *scope_params],
+            )
+            closed += cursor.rowcount
+            # Цена есть, действующей записи нет — открываем новую
+            cursor.execute(
+                f'INSERT INTO {history} ({product_id}, level, price, valid_from, valid_to) '
+                f'SELECT {products}.{pk}, %s, {products}.{column}, %s, NULL '
+                f'FROM {products} WHERE {products}.{column} IS NOT NULL'
+                + scope.format(f'{products}.{pk}')
+                + f' AND NOT EXISTS (SELECT 1 FROM {history} '
+                f'WHERE {history}.{product_id} = {products}.{pk} '
+                f'AND {history}.level = %s AND {history}.valid_to IS NULL)',
+                [level, moment, *scope_params, level],
+            )
+            opened += cursor.rowcount
+    return opened, closed
+
+
+def _as_of_filter(moment):
+    """Условие «запись действовала в момент moment» (дата — на конец дня)."""
+    if isinstance(moment, datetime):
+        return Q(valid_from__lte=moment) & (Q(valid_to__isnull=True) | Q(valid_to__gt=moment))
+    # Цена на дату — действовавшая в конце этого дня
+    end = timezone.make_aware(datetime.combine(moment + timedelta(days=1), time.min))
+    return Q(valid_from__lt=end) & (Q(valid_to__isnull=True) | Q(valid_to__gte=end))
+
+
+def price_as_of(product_ids, level, moment):
+    """
+    Цены уровня level на дату/момент moment: {id товара: цена}.
+    Товары без цены на эту дату в словарь не попадают.
+    """
+    if level not in ProductPrice.LEVEL_FIELDS:
+        raise ValueError(f'Неизвестный уровень цен: {level}')
+    if not isinstance(moment, (date, datetime)):
+        raise TypeError('moment должен быть date или datetime')
+    product_ids = list(product_ids)
+    condition = _as_of_filter(moment)
+    prices = {}
+    for start in range(0, len(product_ids), AS_OF_CHUNK):
+        prices.update(
+            ProductPrice.objects.filter(
+                condition, level=level,
+                product_id__in=product_ids[start:start + AS_OF_CHUNK],
+            ).order_by().values_list('product_id', 'price')
+        )
+    return prices
@@ -0,0 +1,51 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.db import transaction
+from django.dispatch import Signal, receiver
+
+from apps.core.cache import PRODUCTS, invalidate_tags
+
+from .models import Product
+from .prices import sync_price_history
+from .tire_size import parse_size
+
+# Пакетный импорт или сверка товаров завершены (bulk_create и UPDATE/DELETE
+# без ORM не отправляют post_save/post_delete).
+# Аргументы: created, updated, deleted (необязателен) — количество товаров.
+products_imported = Signal()
+
+
+@receiver(pre_save, sender=Product)
+def forget_content_hash(sender, instance, update_fields=None, **kwargs):
+    """Товар изменён вне импорта — delta-импорт должен перезаписать его из прайса."""
+    if update_fields is None:
+        instance.content_hash = ''
+
+
+@receiver(pre_save, sender=Product)
+def fill_tire_size(sender, instance, update_fields=None, **kwargs):
+    """Типоразмер при ручном сохранении разбирается из размерности и названия."""
+    if update_fields is not None:
+        return
+    for field, value in parse_size(instance.dimension, instance.name).items():
+        setattr(instance, field, value)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(products_imported)
+def products_list_changed(sender, **kwargs):
+    """Каталог изменился — сбросить кэш с тегом products (количества списка товаров)."""
+    invalidate_tags(PRODUCTS)
+
+
+@receiver(post_save, sender=Product)
+def record_product_prices(sender, instance, **kwargs):
+    """Изменение цен товара вручную — в историю цен после коммита."""
+    pk = instance.pk
+    transaction.on_commit(lambda: sync_price_history([pk]))
+
+
+@receiver(products_imported)
+def record_imported_prices(sender, **kwargs):
+    """После импорта прайса — сверка истории цен по всем товарам."""
+    sync_price_history()
@@ -1,3 +1,372 @@
-from django.test import TestCase
+import base64
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.clients.models import Client
+from apps.core.testing import local_cache
+from apps.orders.models import Order, OrderItem
+from apps.timeclock.models import WorkSession
+
+from .importer import (
+    DEFAULT_GROUP,
+    GROUP_RULES,
+    PRICE_LIST_COLUMNS,
+    import_products,
+    reconcile_missing,
+)
+from .listing import decode_cursor, encode_cursor, products_page
+from .models import Product, ProductGroup, ProductPrice
+from .prices import price_as_of, sync_price_history
+from .tire_size import parse_size, parse_sizes
+
+
+def raw_cursor(value, pk):
+    raw = json.dumps([value, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+@local_cache
+class KeysetPaginationTests(TestCase):
+    """Постраничный список товаров по курсорам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Повторяющиеся цены: порядок внутри равных значений задаёт id
+        for i in range(23):
+            Product.objects.create(code=f'P{i:03d}', name=f'Товар {i}', price=Decimal(100 + i % 5))
+        Product.objects.create(code='OFF', name='Снят', price=1, is_active=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, sort, descending):
+        pages = [products_page(sort=sort, descending=descending, per_page=10)]
+        while pages[-1]['has_next']:
+            pages.append(products_page(
+                sort=sort, descending=descending, per_page=10, after=pages[-1]['next_cursor'],
+            ))
+        return pages
+
+    def test_forward_pages_cover_ordering_without_gaps(self):
+        for sort in ('price', 'code', 'created_at'):
+            for descending in (False, True):
+                pages = self.walk(sort, descending)
+                seen = [p.pk for page in pages for p in page['products']]
+                ordering = ('-' if descending else '') + sort
+                expected = list(
+                    Product.objects.filter(is_active=True)
+                    .order_by(ordering, ('-' if descending else '') + 'id')
+                    .values_list('pk', flat=True)
+                )
+                self.assertEqual(seen, expected, (sort, descending))
+                self.assertEqual([len(page['products']) for page in pages], [10, 10, 3])
+                self.assertFalse(pages[0]['has_previous'])
+
+    def test_previous_cursor_returns_to_previous_page(self):
+        pages = self.walk('price', False)
+        back = products_page(sort='price', descending=False, per_page=10,
+                             before=pages[2]['previous_cursor'])
+        self.assertEqual(back['products'], pages[1]['products'])
+        self.assertTrue(back['has_next'])
+        self.assertTrue(back['has_previous'])
+
+    def test_last_page(self):
+        pages = self.walk('price', True)
+        last = products_page(sort='price', descending=True, per_page=10, last=True)
+        self.assertEqual(last['products'][-3:], pages[-1]['products'])
+        self.assertFalse(last['has_next'])
+
+    def test_cursor_round_trip(self):
+        product = Product.objects.order_by('pk').first()
+        for sort in ('price', 'created_at', 'code'):
+            value, pk = decode_cursor(encode_cursor(product, sort), sort)
+            self.assertEqual(pk, product.pk)
+            self.assertEqual(value, getattr(product, sort))
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        first = products_page(sort='created_at', per_page=10)
+        for cursor in (raw_cursor('garbage', 1), 'не-base64', raw_cursor(None, 'x'), 'e30'):
+            self.assertIsNone(decode_cursor(cursor, 'created_at'))
+            self.assertIsNone(decode_cursor(cursor, 'price'))
+            page = products_page(sort='created_at', per_page=10, after=cursor)
+            self.assertEqual(page['products'], first['products'])
+        self.assertIsNone(decode_cursor(raw_cursor('100', 1), 'unknown'))
+
+
+class TireSizeParsingTests(SimpleTestCase):
+    """Разбор типоразмера из размерности и названия."""
+
+    CASES = [
+        # (размерность, название, ширина, профиль, диаметр, нагрузка, скорость)
+        ('205/55R16', 'Шина 205/55R16 91H', '205', 55, '16', '91', 'H'),
+        ('', 'Шина 245/40ZR18 97Y XL', '245', 40, '18', '97', 'Y'),
+        ('235/75R17,5', 'Шина 235/75Р17,5 136/133J', '235', 75, '17.5', '136/133', 'J'),
+        ('11R22.5', 'Шина 148/145M', '11', None, '22.5', '148/145', 'M'),
+        ('11,2-28', 'Шина 11,2-28 118A8', '11.2', None, '28', '118', 'A8'),
+        ('', 'Шина 35x12,5R18 118Q', '12.5', None, '18', '118', 'Q'),
+        ('4,00-8', '', '4.00', None, '8', '', ''),
+    ]
+
+    def test_parse_size(self):
+        for dimension, name, width, profile, rim, load, speed in self.CASES:
+            self.assertEqual(parse_size(dimension, name), {
+                'tire_width': Decimal(width),
+                'tire_profile': profile,
+                'tire_rim': Decimal(rim),
+                'load_index': load,
+                'speed_index': speed,
+            }, (dimension, name))
+
+    def test_not_a_tire(self):
+        self.assertEqual(parse_size('', 'Камера TR13'), {
+            'tire_width': None, 'tire_profile': None, 'tire_rim': None,
+            'load_index': '', 'speed_index': '',
+        })
+
+    def test_vectorized_matches_single(self):
+        dimensions = pd.Series([case[0] for case in self.CASES] + [''])
+        names = pd.Series([case[1] for case in self.CASES] + ['Камера TR13'])
+        sizes = parse_sizes(dimensions, names)
+        for index, (dimension, name) in enumerate(zip(dimensions, names)):
+            expected = parse_size(dimension, name)
+            row = sizes.iloc[index]
+            for field in ('tire_width', 'tire_rim'):
+                if expected[field] is None:
+                    self.assertTrue(pd.isna(row[field]))
+                else:
+                    self.assertEqual(Decimal(str(row[field])), expected[field])
+            profile = row['tire_profile']
+            self.assertEqual(None if pd.isna(profile) else int(profile), expected['tire_profile'])
+            self.assertEqual(row['load_index'], expected['load_index'])
+            self.assertEqual(row['speed_index'], expected['speed_index'])
+
+
+@local_cache
+class SizeSearchTests(TestCase):
+    """Подбор шин по индексированным полям типоразмера."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email='size@x.kz', username='size@x.kz', password='pw'
+        )
+        WorkSession.objects.create(user=cls.user, start_time=timezone.now())
+        # Поля типоразмера заполняет сигнал при сохранении
+        cls.exact = Product.objects.create(code='S1', name='Шина 205/55R16 91H', price=200)
+        cls.near = Product.objects.create(code='S2', name='Шина 205/56R16 92V', price=100)
+        Product.objects.create(code='S3', name='Шина 205/60R16 95T', price=50)
+        Product.objects.create(code='S4', name='Шина 205/55R17 94V', price=50)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def search(self, **params):
+        return self.client.get(reverse('products:size_search'), params)
+
+    def test_fields_filled_on_save(self):
+        self.exact.refresh_from_db()
+        self.assertEqual(
+            (self.exact.tire_width, self.exact.tire_profile, self.exact.tire_rim,
+             self.exact.load_index, self.exact.speed_index),
+            (Decimal('205'), 55, Decimal('16'), '91', 'H'),
+        )
+
+    def test_exact_size(self):
+        response = self.search(size='205/55R16')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.json()['products']], [self.exact.pk])
+
+    def test_profile_tolerance_exact_first(self):
+        # Допуск ограничен SIZE_SEARCH_MAX_TOLERANCE: 205/60 не попадает,
+        # точный профиль — первым, хотя соседний дешевле
+        response = self.search(size='205/55Р16', tolerance=5)
+        ids = [item['id'] for item in response.json()['products']]
+        self.assertEqual(ids, [self.exact.pk, self.near.pk])
+
+    def test_size_by_parts(self):
+        response = self.search(width='205', profile='56', rim='16')
+        self.assertEqual([item['id'] for item in response.json()['products']], [self.near.pk])
+
+    def test_invalid_size(self):
+        self.assertEqual(self.search(size='abc').status_code, 400)
+
+
+def price_list(*rows):
+    """Порция прайса: строки (код, название, розничная цена[, оптовая])."""
+    records = []
+    for code, name, retail, *rest in rows:
+        record = dict.fromkeys(PRICE_LIST_COLUMNS, '')
+        record.update(code=code, name=name, retail_price=retail,
+                      wholesale_price=rest[0] if rest else float('nan'),
+                      promotional_price=float('nan'))
+        records.append(record)
+    return pd.DataFrame(records, columns=list(PRICE_LIST_COLUMNS))
+
+
+class ProductImportTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for code in {code for code, _ in GROUP_RULES} | {DEFAULT_GROUP}:
+            ProductGroup.objects.create(code=code, name=f'Группа {code}')
+
+    def setUp(self):
+        cache.clear()
+
+
+@local_cache
+class DeltaImportTests(ProductImportTestCase):
+    """Пакетная запись прайса и delta-режим."""
+
+    FILE = [
+        ('10001', 'Шина 205/55R16 91H', 100, 90),
+        ('10002', 'Шина 195/65R15 91T', 80),
+        ('10003', 'Шина 215/60R16 95V', 120),
+    ]
+
+    def test_first_import_creates_products(self):
+        result = import_products([price_list(*self.FILE)], delta=True)
+        self.assertEqual((result['created'], result['updated'], result['unchanged']), (3, 0, 0))
+        product = Product.objects.get(code='10001')
+        self.assertEqual(product.price, Decimal('100'))
+        self.assertEqual(product.wholesale_price, Decimal('90'))
+        self.assertEqual((product.tire_width, product.tire_rim), (Decimal('205'), Decimal('16')))
+        self.assertTrue(product.content_hash)
+
+    def test_unchanged_rows_are_not_written(self):
+        import_products([price_list(*self.FILE)], delta=True)
+        Product.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        before = dict(Product.objects.values_list('code', 'updated_at'))
+
+        result = import_products([price_list(*self.FILE)], delta=True)
+        self.assertEqual((result['created'], result['updated'], result['unchanged']), (0, 0, 3))
+        self.assertEqual(dict(Product.objects.values_list('code', 'updated_at')), before)
+        self.assertTrue(result['price_changes'].empty)
+
+    def test_changed_price_is_written_and_reported(self):
+        import_products([price_list(*self.FILE)], delta=True)
+        changed = [('10001', 'Шина 205/55R16 91H', 110, 90), *self.FILE[1:]]
+        result = import_products([price_list(*changed)], delta=True)
+        self.assertEqual((result['updated'], result['unchanged']), (1, 2))
+        self.assertEqual(Product.objects.get(code='10001').retail_price, Decimal('110'))
+        self.assertEqual(
+            result['price_changes'][['code', 'level', 'old', 'new']].values.tolist(),
+            [['10001', 'retail_price', 100.0, 110.0]],
+        )
+
+    def test_manual_edit_is_overwritten_by_next_delta(self):
+        import_products([price_list(*self.FILE)], delta=True)
+        product = Product.objects.get(code='10002')
+        product.name = 'Изменено вручную'
+        product.save()
+        result = import_products([price_list(*self.FILE)], delta=True)
+        self.assertEqual((result['updated'], result['unchanged']), (1, 2))
+        self.assertEqual(Product.objects.get(code='10002').name, 'Шина 195/65R15 91T')
+
+    def test_duplicates_and_service_rows(self):
+        rows = [('Код', 'Наименование', None), *self.FILE, ('10001', 'Шина 205/55R16 91H', 105)]
+        result = import_products([price_list(*rows[:2]), price_list(*rows[2:])])
+        self.assertEqual((result['created'], result['updated']), (3, 1))
+        self.assertEqual(result['skipped'], 1)
+        self.assertEqual(result['duplicates'], 1)
+        self.assertEqual(Product.objects.get(code='10001').retail_price, Decimal('105'))
+
+
+@local_cache
+class ReconcileMissingTests(ProductImportTestCase):
+    """Товары, которых нет в прайсе: удаление или деактивация."""
+
+    def setUp(self):
+        super().setUp()
+        import_products([price_list(
+            ('20001', 'Шина 205/55R16 91H', 100),
+            ('20002', 'Шина 195/65R15 91T', 80),
+            ('20003', 'Шина 215/60R16 95V', 120),
+        )])
+        user = get_user_model().objects.create_user(
+            email='rec@x.kz', username='rec@x.kz', password='pw'
+        )
+        client = Client.objects.create(client_type='individual', name='Клиент')
+        order = Order.objects.create(
+            client=client, responsible=user, created_by=user,
+            source=Order.SOURCE_CHOICES[0][0], payment_method=Order.PAYMENT_CHOICES[0][0],
+        )
+        # Товар из истории продаж (PROTECT) удалить нельзя
+        OrderItem.objects.create(order=order, product=Product.objects.get(code='20002'), quantity=1)
+
+    def test_missing_products_deleted_or_deactivated(self):
+        self.assertTrue(ProductPrice.objects.filter(product__code='20001').exists())
+        deleted, deactivated = reconcile_missing({'20003'})
+        self.assertEqual((deleted, deactivated), (1, 1))
+        self.assertFalse(Product.objects.filter(code='20001').exists())
+        self.assertFalse(Product.objects.get(code='20002').is_active)
+        self.assertTrue(Product.objects.get(code='20003').is_active)
+        # История цен удалённого товара удаляется вместе с ним
+        self.assertFalse(ProductPrice.objects.filter(product__code='20001').exists())
+
+    def test_nothing_missing(self):
+        self.assertEqual(reconcile_missing({'20001', '20002', '20003'}), (0, 0))
+        self.assertEqual(Product.objects.filter(is_active=True).count(), 3)
+
+    def test_deactivated_product_returns_with_next_import(self):
+        reconcile_missing({'20003'})
+        import_products([price_list(('20002', 'Шина 195/65R15 91T', 80))], delta=True)
+        self.assertTrue(Product.objects.get(code='20002').is_active)
+
+
+@local_cache
+class PriceAsOfTests(TestCase):
+    """История цен и цена на дату."""
+
+    def setUp(self):
+        self.product = Product.objects.create(code='30001', name='Шина', price=100, retail_price=100)
+        self.other = Product.objects.create(code='30002', name='Шина 2', price=50)
+        self.march = timezone.make_aware(datetime(2025, 3, 1, 12))
+        self.april = timezone.make_aware(datetime(2025, 4, 10, 9))
+        sync_price_history(moment=self.march)
+        Product.objects.filter(pk=self.product.pk).update(retail_price=120)
+        sync_price_history(moment=self.april)
+
+    def test_history_records_only_changes(self):
+        self.assertEqual(sync_price_history(moment=self.april), (0, 0))
+        history = list(
+            ProductPrice.objects.filter(product=self.product, level=ProductPrice.LEVEL_RETAIL)
+            .order_by('valid_from').values_list('price', 'valid_from', 'valid_to')
+        )
+        self.assertEqual(history, [
+            (Decimal('100'), self.march, self.april),
+            (Decimal('120'), self.april, None),
+        ])
+
+    def test_price_as_of_date_and_moment(self):
+        ids = [self.product.pk, self.other.pk]
+        retail = ProductPrice.LEVEL_RETAIL
+        self.assertEqual(price_as_of(ids, retail, date(2025, 2, 28)), {})
+        self.assertEqual(price_as_of(ids, retail, date(2025, 3, 15)), {self.product.pk: Decimal('100')})
+        # Дата — цена на конец дня
+        self.assertEqual(price_as_of(ids, retail, date(2025, 4, 10)), {self.product.pk: Decimal('120')})
+        self.assertEqual(
+            price_as_of(ids, retail, self.april - timedelta(minutes=1)),
+            {self.product.pk: Decimal('100')},
+        )
+        self.assertEqual(price_as_of(ids, retail, self.april), {self.product.pk: Decimal('120')})
+
+    def test_removed_price(self):
+        Product.objects.filter(pk=self.product.pk).update(retail_price=None)
+        may = timezone.make_aware(datetime(2025, 5, 1))
+        self.assertEqual(sync_price_history(moment=may), (0, 1))
+        self.assertEqual(price_as_of([self.product.pk], ProductPrice.LEVEL_RETAIL, may), {})
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            price_as_of([self.product.pk], 'vip', date(2025, 3, 1))
+        with self.assertRaises(TypeError):
+            price_as_of([self.product.pk], ProductPrice.LEVEL_RETAIL, '2025-03-01')
@@ -0,0 +1,141 @@
+"""
+Разбор типоразмера шины из размерности и названия товара.
+
+Поддерживаемые записи размера (ширина, профиль, диаметр):
+- метрическая радиальная: 205/55R16, 245/40ZR18, 235/75R17,5, 185/75R16 C;
+- без профиля: 11R22.5, 9,00R20;
+- диагональная: 11,2-28, 23,5-25, 6,50-10;
+- внедорожная: 35x12,5R18, 33X15,50-16,5.
+
+Индексы нагрузки и скорости ищутся в названии после размера:
+91H, 104/102R, 136/133J, 118A8. Кириллические буквы, похожие на
+латинские (Р, А, В, Т, ...), перед разбором заменяются латинскими.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+import pandas as pd
+from django.db import transaction
+
+from .models import Product
+
+SIZE_PATTERN = (
+    r'(?<![\w.,/*-])'
+    # Внедорожный формат: наружный диаметр x ширина (35x12,5R18)
+    r'(?:\d{2}\s*X\s*)?'
+    r'(?P<width>\d{1,4}(?:[.,]\d{1,2})?)'
+    r'(?:\s*/\s*(?P<profile>\d{2,3}))?'
+    # Кириллическая Р (205/55Р16) после замены становится латинской P
+    r'\s*(?:Z?[RP]|-)\s*'
+    # Однозначный диаметр — только у дюймовых размеров: 4,00-8
+    r'(?P<rim>[1-9]\d(?:[.,]5)?|(?<=\d[.,]\d\d-)[4-9])'
+    r'(?![\d.,])'
+)
+LOAD_SPEED_PATTERN = (
+    r'(?<![\w.,/*-])'
+    r'(?P<load>\d{2,3}(?:/\d{2,3})?)'
+    r'(?P<speed>A[1-8]|[B-HJ-NP-WYZ])'
+    r'(?!\w)'
+)
+SIZE_RE = re.compile(SIZE_PATTERN)
+LOAD_SPEED_RE = re.compile(LOAD_SPEED_PATTERN)
+
+CYRILLIC_TO_LATIN = str.maketrans('АВЕКМНОРСТХ', 'ABEKMHOPCTX')
+
+SIZE_FIELDS = ['tire_width', 'tire_profile', 'tire_rim', 'load_index', 'speed_index']
+
+BACKFILL_BATCH = 5000
+
+
+def _decimal(value):
+    """'17,5' → Decimal('17.5'); пустое → None."""
+    if not value:
+        return None
+    try:
+        return Decimal(value.replace(',', '.'))
+    except InvalidOperation:
+        return None
+
+
+def parse_size(dimension='', name=''):
+    """
+    Типоразмер одного товара: словарь полей SIZE_FIELDS
+    (None / '' для нераспознанных).
+    """
+    result = dict.fromkeys(SIZE_FIELDS)
+    result['load_index'] = result['speed_index'] = ''
+    dimension = (dimension or '').upper().translate(CYRILLIC_TO_LATIN)
+    name = (name or '').upper().translate(CYRILLIC_TO_LATIN)
+
+    size = SIZE_RE.search(dimension) or SIZE_RE.search(name)
+    if size:
+        result['tire_width'] = _decimal(size['width'])
+        result['tire_profile'] = int(size['profile']) if size['profile'] else None
+        result['tire_rim'] = _decimal(size['rim'])
+        # Индексы ищем после размера (в названии он обычно первым)
+        name = SIZE_RE.sub(' ', name, count=1)
+    indexes = LOAD_SPEED_RE.search(name)
+    if indexes:
+        result['load_index'] = indexes['load']
+        result['speed_index'] = indexes['speed']
+    return result
+
+
+def parse_sizes(dimensions, names):
+    """
+    Векторный вариант parse_size для колонок прайса.
+    Возвращает DataFrame с колонками SIZE_FIELDS и индексом names;
+    ширина и диаметр — float (NaN, если размер не найден).
+    """
+    dimensions = dimensions.str.upper().str.translate(CYRILLIC_TO_LATIN)
+    names = names.str.upper().str.translate(CYRILLIC_TO_LATIN)
+
+    size = dimensions.str.extract(SIZE_PATTERN)
+    from_name = names.str.extract(SIZE_PATTERN)
+    size = size.where(size['width'].notna(), from_name)
+
+    indexes = names.str.replace(SIZE_PATTERN, ' ', n=1, regex=True).str.extract(
+        LOAD_SPEED_PATTERN
+    )
+    return pd.DataFrame({
+        'tire_width': _numbers(size['width']),
+        'tire_profile': pd.to_numeric(size['profile']).astype('Int64'),
+        'tire_rim': _numbers(size['rim']),
+        'load_index': indexes['load'].fillna(''),
+        'speed_index': indexes['speed'].fillna(''),
+    }, index=names.index)
+
+
+def _numbers(series):
+    return pd.to_numeric(series.str.replace(',', '.', regex=False))
+
+
+def backfill(batch_size=BACKFILL_BATCH):
+    """
+    Разобрать типоразмер у всех товаров (порциями по id).
+    Записываются только товары, у которых разбор дал другой результат.
+    Возвращает (проверено, обновлено).
+    """
+    checked = updated = 0
+    last_id = 0
+    while True:
+        batch = list(
+            Product.objects.filter(pk__gt=last_id).order_by('pk')
+            .only('pk', 'name', 'dimension', *SIZE_FIELDS)[:batch_size]
+        )
+        if not batch:
+            return checked, updated
+        last_id = batch[-1].pk
+        checked += len(batch)
+
+        changed = []
+        for product in batch:
+            size = parse_size(product.dimension, product.name)
+            if any(getattr(product, field) != value for field, value in size.items()):
+                for field, value in size.items():
+                    setattr(product, field, value)
+                changed.append(product)
+        if changed:
+            with transaction.atomic():
+                Product.objects.bulk_update(changed, SIZE_FIELDS)
+            updated += len(changed)
@@ -17,4 +17,5 @@ urlpatterns = [
         name='delete_product'
     ),
     path('import/', views.import_products, name='import_products'),
+    path('api/size-search/', views.size_search, name='size_search'),
 ]
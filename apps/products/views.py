@@ -1,3 +1,6 @@
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlencode
+
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
@@ -6,61 +9,56 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
-from django.core.paginator import Paginator
-import os
-import tempfile
+from django.db.models import F
+from django.db.models.functions import Abs
+from . import listing
 from .models import Product
-from django.db import models
+from .tire_size import parse_size
+from apps.imports.models import ImportJob
+from apps.imports.services import enqueue
+from apps.core.writes import coordinated_write
 from apps.cities.models import City
 
 
 @login_required(login_url='accounts:login')
 def products_list(request):
-    """Список всех товаров"""
-    sort_by = request.GET.get('sort', '-created_at')
-    order = request.GET.get('order', 'desc')
-    per_page = int(request.GET.get('per_page', 25))
-
-    sort_mapping = {
-        'code': 'code',
-        'name': 'name',
-        'price': 'price',
-        'assortment_group': 'assortment_group',
-        'branch_city': 'branch_city__name',
-        'created_at': 'created_at',
-    }
-
-    sort_field = sort_mapping.get(sort_by, sort_by)
-
-    if order == 'asc':
-        sort_field = sort_field
-    else:
-        if not sort_field.startswith('-'):
-            sort_field = f'-{sort_field}'
-
-    products_queryset = (
-        Product.objects.select_related('branch_city')
-        .filter(is_active=True)
-        .order_by(sort_field)
-    )
+    """Список всех товаров (keyset-пагинация, см. apps.products.listing)"""
+    sort_by = request.GET.get('sort', listing.DEFAULT_SORT)
+    if sort_by not in listing.SORT_FIELDS:
+        sort_by = listing.DEFAULT_SORT
+    order = 'asc' if request.GET.get('order') == 'asc' else 'desc'
+    try:
+        per_page = int(request.GET.get('per_page', listing.DEFAULT_PAGE_SIZE))
+    except ValueError:
+        per_page = listing.DEFAULT_PAGE_SIZE
+    if per_page not in listing.PAGE_SIZES:
+        per_page = listing.DEFAULT_PAGE_SIZE
 
     # Поиск по коду и названию
     search_query = (request.GET.get('search') or '').strip()
-    if search_query:
-        products_queryset = products_queryset.filter(
-            models.Q(code__icontains=search_query) | models.Q(name__icontains=search_query)
-        )
 
-    # Пагинация
-    paginator = Paginator(products_queryset, per_page)
-    page_number = request.GET.get('page')
-    products = paginator.get_page(page_number)
+    page = listing.products_page(
+        search=search_query,
+        sort=sort_by,
+        descending=order == 'desc',
+        per_page=per_page,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        last=request.GET.get('last') == '1',
+    )
 
     return render(
         request,
         'products/products_list.html',
         {
-            'products': products,
+            'products': page['products'],
+            'page': page,
+            'total_count': listing.cached_count(search_query),
+            # Параметры списка для ссылок пагинации
+            'list_query': urlencode({
+                'per_page': per_page, 'search': search_query,
+                'sort': sort_by, 'order': order,
+            }),
             'current_sort': sort_by,
             'current_order': order,
             'per_page': per_page,
@@ -69,13 +67,119 @@ def products_list(request):
     )
 
 
+# Подбор по размеру: допуск по профилю (±) и число результатов
+SIZE_SEARCH_MAX_TOLERANCE = 1
+SIZE_SEARCH_LIMIT = 100
+
+
+@login_required(login_url='accounts:login')
+@require_http_methods(["GET"])
+def size_search(request):
+    """
+    Подбор шин по типоразмеру (AJAX).
+
+    size=205/55R16 (или width, profile, rim), tolerance=1 — профиль ±1,
+    seasonality (winter/Зимние), tire_type, branch_city. Один запрос
+    по индексу products_tire_size_idx; сначала точный профиль, затем
+    соседние, внутри — по цене.
+    """
+    size = parse_size(request.GET.get('size', ''))
+    try:
+        width = size['tire_width'] or _size_param(request, 'width')
+        rim = size['tire_rim'] or _size_param(request, 'rim')
+        profile = size['tire_profile'] or _size_param(request, 'profile', int)
+        tolerance = int(request.GET.get('tolerance') or 0)
+    except ValueError:
+        return JsonResponse(
+            {'status': 'error', 'message': 'Неверный размер'}, status=400
+        )
+    tolerance = max(0, min(tolerance, SIZE_SEARCH_MAX_TOLERANCE))
+    if width is None or rim is None:
+        return JsonResponse(
+            {'status': 'error', 'message': 'Укажите размер, например 205/55R16'},
+            status=400,
+        )
+
+    products = Product.objects.filter(
+        is_active=True, tire_width=width, tire_rim=rim
+    )
+    if profile is None:
+        products = products.filter(tire_profile__isnull=True)
+    else:
+        products = products.filter(
+            tire_profile__range=(profile - tolerance, profile + tolerance)
+        )
+
+    seasonality = (request.GET.get('seasonality') or '').strip()
+    if seasonality:
+        seasons = {
+            **{label.lower(): value for value, label in Product.SEASONALITY_CHOICES},
+            **{value: value for value, _ in Product.SEASONALITY_CHOICES},
+        }
+        products = products.filter(seasonality=seasons.get(seasonality.lower(), seasonality))
+    tire_type = (request.GET.get('tire_type') or '').strip()
+    if tire_type:
+        products = products.filter(tire_type=tire_type)
+    branch_city = request.GET.get('branch_city')
+    if branch_city:
+        products = products.filter(branch_city_id=branch_city)
+
+    if profile is not None:
+        products = products.order_by(Abs(F('tire_profile') - profile), 'price')
+    else:
+        products = products.order_by('price')
+    products = products.select_related('branch_city').only(
+        'id', 'code', 'name', 'price', 'wholesale_price', 'promotional_price',
+        'retail_price', 'tire_width', 'tire_profile', 'tire_rim', 'load_index',
+        'speed_index', 'seasonality', 'tire_type', 'branch_city__name',
+    )[:SIZE_SEARCH_LIMIT]
+
+    results = [
+        {
+            'id': product.id,
+            'code': product.code or '',
+            'name': product.name,
+            'price': float(product.price),
+            'wholesale_price': float(product.wholesale_price) if product.wholesale_price else None,
+            'promotional_price': float(product.promotional_price) if product.promotional_price else None,
+            'retail_price': float(product.retail_price) if product.retail_price else None,
+            'size': {
+                'width': float(product.tire_width),
+                'profile': product.tire_profile,
+                'rim': float(product.tire_rim),
+                'load_index': product.load_index,
+                'speed_index': product.speed_index,
+            },
+            'seasonality': product.get_seasonality_display(),
+            'tire_type': product.tire_type,
+            'branch_city': product.branch_city.name if product.branch_city else '',
+        }
+        for product in products
+    ]
+    return JsonResponse({'status': 'success', 'products': results})
+
+
+def _size_param(request, name, cast=None):
+    """Числовой параметр размера ('17,5' → Decimal('17.5')); пустой → None."""
+    value = (request.GET.get(name) or '').strip().replace(',', '.')
+    if not value:
+        return None
+    if cast is int:
+        return int(value)
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(value)
+
+
 @login_required(login_url='accounts:login')
+@coordinated_write
 def add_product(request):
     """Добавление нового товара"""
     if request.method == 'POST':
         try:
             Product.objects.create(
-                code=request.POST.get('code'),
+                code=request.POST.get('code') or None,
                 name=request.POST.get('name'),
                 description=request.POST.get('description', ''),
                 price=request.POST.get('price'),
@@ -102,13 +206,14 @@ def add_product(request):
 
 
 @login_required(login_url='accounts:login')
+@coordinated_write
 def edit_product(request, product_id):
     """Редактирование товара"""
     product = get_object_or_404(Product, id=product_id)
 
     if request.method == 'POST':
         try:
-            product.code = request.POST.get('code')
+            product.code = request.POST.get('code') or None
             product.name = request.POST.get('name')
             product.description = request.POST.get('description', '')
             product.price = request.POST.get('price')
@@ -135,6 +240,7 @@ def edit_product(request, product_id):
 
 
 @login_required(login_url='accounts:login')
+@coordinated_write
 def delete_product(request, product_id):
     """Удаление товара"""
     product = get_object_or_404(Product, id=product_id)
@@ -155,6 +261,7 @@ def delete_product(request, product_id):
 
 @login_required(login_url='accounts:login')
 @require_http_methods(["POST"])
+@coordinated_write
 def import_products(request):
     """Импорт товаров из Excel файла"""
     try:
@@ -179,84 +286,26 @@ def import_products(request):
         limit = request.POST.get('limit')
         limit = int(limit) if limit else None
         
-        # Сохраняем файл во временную папку
-        temp_dir = tempfile.mkdtemp()
-        temp_file_path = os.path.join(temp_dir, uploaded_file.name)
-        
-        with open(temp_file_path, 'wb') as temp_file:
-            for chunk in uploaded_file.chunks():
-                temp_file.write(chunk)
-        
-        # Запускаем команду импорта
-        from django.core.management import call_command
-        from io import StringIO
-        import sys
-        
-        # Перенаправляем вывод команды
-        old_stdout = sys.stdout
-        sys.stdout = StringIO()
-        
-        try:
-            # Подготавливаем аргументы команды
-            args = [temp_file_path]
-            kwargs = {}
-            
-            if clear_existing:
-                kwargs['clear_products'] = True
-            
-            if limit:
-                kwargs['limit'] = limit
-            
-            # Всегда удаляем товары, которых нет в файле при обновлении через сайт
-            kwargs['remove_missing'] = True
-            
-            # Выполняем команду
-            call_command('universal_import', *args, **kwargs)
-            
-            # Получаем вывод команды
-            output = sys.stdout.getvalue()
-            
-            # Парсим результат из вывода
-            created = 0
-            updated = 0
-            deleted = 0
-            
-            for line in output.split('\n'):
-                if 'Создано товаров:' in line:
-                    try:
-                        created = int(line.split('Создано товаров:')[1].strip())
-                    except:
-                        pass
-                elif 'Обновлено товаров:' in line:
-                    try:
-                        updated = int(line.split('Обновлено товаров:')[1].strip())
-                    except:
-                        pass
-                elif 'Удалено товаров:' in line and 'УДАЛЕНИЕ ОТСУТСТВУЮЩИХ ТОВАРОВ' in output:
-                    try:
-                        deleted = int(line.split('Удалено товаров:')[1].strip())
-                    except:
-                        pass
-            
-            return JsonResponse({
-                'status': 'success',
-                'message': 'Импорт завершен успешно',
-                'created': created,
-                'updated': updated,
-                'deleted': deleted,
-                'output': output
-            })
-            
-        finally:
-            # Восстанавливаем stdout
-            sys.stdout = old_stdout
-            
-            # Удаляем временный файл
-            try:
-                os.unlink(temp_file_path)
-                os.rmdir(temp_dir)
-            except:
-                pass
+        # Импорт выполняется воркером run_jobs; клиент опрашивает прогресс.
+        # Всегда удаляем товары, которых нет в файле при обновлении через сайт;
+        # записываются только новые и изменённые товары, затем цены открытых
+        # заказов пересчитываются по новому прайсу
+        job = enqueue(
+            ImportJob.KIND_PRODUCTS,
+            uploaded_file,
+            request.user,
+            clear_products=clear_existing,
+            limit=limit,
+            remove_missing=True,
+            delta=True,
+            reprice_orders=True,
+        )
+        return JsonResponse({
+            'status': 'queued',
+            'message': 'Импорт поставлен в очередь',
+            'job_id': job.pk,
+            'progress_url': reverse('imports:job_status', args=[job.pk]),
+        })
     
     except Exception as e:
         return JsonResponse({
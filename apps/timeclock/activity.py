@@ -0,0 +1,116 @@
+"""
+Отложенная запись WorkSession.last_activity (write-behind).
+
+Отметки активности копятся в памяти процесса и сбрасываются в БД одним
+UPDATE ... CASE фоновым потоком раз в TIMECLOCK_ACTIVITY_FLUSH_INTERVAL
+секунд. Значение last_activity в БД отстаёт от реального не более чем на
+max_staleness() — это учитывает auto_close_sessions.
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Case, F, Q, Value, When
+
+from apps.core.writes import retry_on_lock
+
+from .models import WorkSession
+
+logger = logging.getLogger(__name__)
+
+# Минимальный интервал между отметками одной сессии (сек)
+ACTIVITY_TOUCH_INTERVAL = 60
+
+
+def flush_interval():
+    """Период сброса буфера в БД (сек). 0 — писать сразу."""
+    return getattr(settings, 'TIMECLOCK_ACTIVITY_FLUSH_INTERVAL', 30)
+
+
+def max_staleness():
+    """Максимальное отставание last_activity в БД от реальной активности."""
+    return timedelta(seconds=ACTIVITY_TOUCH_INTERVAL + flush_interval())
+
+
+class ActivityBuffer:
+    """Буфер отметок активности: session_id -> последнее время активности."""
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def touch(self, session_id, when):
+        """Записать отметку; при нулевом интервале сразу сбросить в БД."""
+        with self._lock:
+            prev = self._pending.get(session_id)
+            if prev is None or when > prev:
+                self._pending[session_id] = when
+        if flush_interval() <= 0:
+            self.flush()
+        else:
+            self._ensure_thread()
+
+    def discard(self, session_id):
+        """Забыть отметку закрытой сессии."""
+        with self._lock:
+            self._pending.pop(session_id, None)
+
+    def flush(self):
+        """Сбросить накопленные отметки одним UPDATE. Возвращает число строк."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            return _write_activity(pending)
+        except Exception as e:
+            # Возвращаем отметки в буфер, чтобы не потерять их
+            logger.error(f'Activity flush failed: {e}', exc_info=True)
+            with self._lock:
+                for sid, ts in pending.items():
+                    if sid not in self._pending or self._pending[sid] < ts:
+                        self._pending[sid] = ts
+            return 0
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name='timeclock-activity-flush', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(max(flush_interval(), 1))
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+@retry_on_lock
+def _write_activity(pending):
+    """Записать отметки {session_id: время} одним UPDATE ... CASE."""
+    whens = [
+        When(
+            Q(pk=sid) & (Q(last_activity__isnull=True) | Q(last_activity__lt=ts)),
+            then=Value(ts),
+        )
+        for sid, ts in pending.items()
+    ]
+    return WorkSession.objects.filter(
+        pk__in=list(pending), is_closed=False
+    ).update(last_activity=Case(*whens, default=F('last_activity')))
+
+
+buffer = ActivityBuffer()
+atexit.register(buffer.flush)
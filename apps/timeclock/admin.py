@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import WorkSession, DutyAssignment
+from .models import WorkSession, DutyAssignment, WorkDayTotal
 
 
 @admin.register(WorkSession)
@@ -15,3 +15,10 @@ class DutyAssignmentAdmin(admin.ModelAdmin):
     list_filter = ('date',)
     search_fields = ('manager__username', 'manager__first_name', 'manager__last_name')
 
+
+
+@admin.register(WorkDayTotal)
+class WorkDayTotalAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'date', 'seconds', 'updated_at')
+    list_filter = ('date',)
+    search_fields = ('user__username', 'user__first_name', 'user__last_name')
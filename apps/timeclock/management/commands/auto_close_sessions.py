@@ -1,36 +1,115 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Case, DateTimeField, ExpressionWrapper, F, Q, Value, When
 from django.utils import timezone
-from datetime import timedelta, time as dtime
+from datetime import datetime, timedelta
+from apps.timeclock.activity import max_staleness
 from apps.timeclock.models import WorkSession
+from apps.timeclock.services import forget_open_sessions, rebuild_day_totals
 
 
 class Command(BaseCommand):
-    help = 'Автоматически закрывает неактивные сессии после 18:00'
+    help = (
+        'Автоматически закрывает неактивные сессии: сегодняшние — после '
+        'времени отсечки (по умолчанию 18:00), за прошлые дни — всегда'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cutoff-time',
+            default='18:00',
+            help='Время (ЧЧ:ММ), после которого закрываются сегодняшние сессии',
+        )
+        parser.add_argument(
+            '--idle-minutes',
+            type=int,
+            default=20,
+            help='Сколько минут без активности считать уходом с работы',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, какие сессии будут закрыты',
+        )
 
     def handle(self, *args, **options):
+        try:
+            cutoff_time = datetime.strptime(options['cutoff_time'], '%H:%M').time()
+        except ValueError:
+            raise CommandError('Неверный формат --cutoff-time, ожидается ЧЧ:ММ')
+        idle = timedelta(minutes=options['idle_minutes'])
+
         now = timezone.localtime()
-        if now.time() < dtime(hour=18, minute=0):
-            self.stdout.write(self.style.WARNING('Слишком рано, автозакрытие работает после 18:00'))
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        open_sessions = WorkSession.objects.filter(is_closed=False)
+        if now.time() < cutoff_time:
+            # До времени отсечки закрываем только забытые сессии прошлых дней
+            open_sessions = open_sessions.filter(start_time__lt=today_start)
+            self.stdout.write(
+                self.style.WARNING(
+                    f'Раньше {cutoff_time:%H:%M}: закрываются только сессии прошлых дней'
+                )
+            )
+
+        # last_activity в БД может отставать на max_staleness() (отложенная запись)
+        stale_before = now - idle - max_staleness()
+        no_activity = open_sessions.filter(last_activity__isnull=True)
+        stale = open_sessions.filter(last_activity__lte=stale_before)
+
+        # Без активности: сегодняшние закрываем текущим временем,
+        # прошлых дней — временем начала (часы не засчитываются)
+        no_activity_end = Case(
+            When(start_time__lt=today_start, then=F('start_time')),
+            default=Value(now),
+            output_field=DateTimeField(),
+        )
+        stale_end = ExpressionWrapper(F('last_activity') + idle, output_field=DateTimeField())
+
+        if options['dry_run']:
+            self._report(no_activity, no_activity_end, stale, stale_end)
             return
 
-        cutoff = now - timedelta(minutes=20)
-        sessions = WorkSession.objects.filter(is_closed=False)
-        updated = []
-
-        for s in sessions:
-            if s.start_time.date() != now.date():
-                continue
-            if not s.last_activity:
-                s.close(end_time=now)
-                updated.append(s.id)
-                continue
-            if s.last_activity <= cutoff:
-                end_time = s.last_activity + timedelta(minutes=20)
-                s.close(end_time=end_time)
-                updated.append(s.id)
-
-        if updated:
-            self.stdout.write(self.style.SUCCESS(f'Закрыто сессий: {len(updated)}'))
+        with transaction.atomic():
+            affected = list(
+                open_sessions.filter(Q(last_activity__isnull=True) | Q(last_activity__lte=stale_before))
+                .values_list('user_id', 'start_time')
+            )
+            closed_idle = no_activity.update(end_time=no_activity_end, is_closed=True)
+            closed_stale = stale.update(end_time=stale_end, is_closed=True)
+            if affected:
+                user_ids = {user_id for user_id, _ in affected}
+                first_day = timezone.localtime(min(start for _, start in affected)).date()
+                rebuild_day_totals(first_day, now.date(), user_ids=user_ids)
+        if affected:
+            forget_open_sessions(user_ids)
+
+        total = closed_idle + closed_stale
+        if total:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Закрыто сессий: {total} (без активности: {closed_idle}, '
+                    f'по простою: {closed_stale})'
+                )
+            )
         else:
             self.stdout.write('Нет сессий для закрытия')
 
+    def _report(self, no_activity, no_activity_end, stale, stale_end):
+        """Вывести список сессий, которые будут закрыты (--dry-run)."""
+        rows = list(
+            no_activity.annotate(new_end=no_activity_end)
+            .values_list('id', 'user__username', 'start_time', 'new_end')
+        ) + list(
+            stale.annotate(new_end=stale_end)
+            .values_list('id', 'user__username', 'start_time', 'new_end')
+        )
+        if not rows:
+            self.stdout.write('Нет сессий для закрытия')
+            return
+        for sid, username, start, end in rows:
+            self.stdout.write(
+                f'#{sid} {username}: {timezone.localtime(start):%d.%m.%Y %H:%M} — '
+                f'{timezone.localtime(end):%d.%m.%Y %H:%M}'
+            )
+        self.stdout.write(self.style.WARNING(f'Будет закрыто сессий: {len(rows)} (dry-run)'))
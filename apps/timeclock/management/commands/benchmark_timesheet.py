@@ -0,0 +1,138 @@
+import io
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from openpyxl import Workbook, load_workbook
+
+from apps.timeclock import timesheet
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк формирования табеля на синтетических данных '
+        '(по умолчанию 500 сотрудников × 31 день), без обращения к БД'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=500)
+        parser.add_argument('--year', type=int, default=2025)
+        parser.add_argument('--month', type=int, default=1)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument(
+            '--template',
+            help='Путь к шаблону; по умолчанию other/Табель.xlsx или синтетический',
+        )
+
+    def handle(self, *args, **options):
+        year, month = options['year'], options['month']
+        employees, repeat = options['employees'], options['repeat']
+        rows = self._month_rows(employees)
+        session_rows = self._session_rows(employees, year, month)
+
+        template_path = options['template'] or timesheet.default_template_path()
+        tmp_path = None
+        if not os.path.exists(template_path):
+            tmp_path = self._synthetic_template()
+            template_path = tmp_path
+            self.stdout.write(f'Шаблон не найден, используется синтетический: {template_path}')
+
+        try:
+            self.stdout.write(f'Сотрудников: {employees}, строк сессий: {len(session_rows)}')
+            self._bench('Шаблон: первый разбор', 1,
+                        lambda: timesheet.render_month(year, month, rows, template_path))
+            self._bench('Шаблон: из памяти', repeat,
+                        lambda: timesheet.render_month(year, month, rows, template_path))
+            self._bench('Шаблон: load_workbook + очистка (старый путь)', repeat,
+                        lambda: self._legacy_month(template_path, rows))
+            self._bench('Сессии: write_only', repeat,
+                        lambda: timesheet.render_sessions(iter(session_rows)))
+            self._bench('Сессии: обычная книга (старый путь)', repeat,
+                        lambda: self._legacy_sessions(session_rows))
+        finally:
+            if tmp_path:
+                os.remove(tmp_path)
+
+    def _bench(self, title, repeat, func):
+        timings = []
+        size = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            size = len(func())
+            timings.append(time.perf_counter() - started)
+        self.stdout.write(
+            f'{title}: лучшее {min(timings) * 1000:.0f} мс, '
+            f'среднее {sum(timings) / len(timings) * 1000:.0f} мс, {size // 1024} КБ'
+        )
+
+    @staticmethod
+    def _month_rows(employees):
+        rnd = random.Random(42)
+        return [
+            {
+                'full_name': f'Сотрудник {i}',
+                'position': 'Менеджер',
+                'days': {day: round(rnd.uniform(6, 10), 2) for day in range(1, 32)},
+            }
+            for i in range(employees)
+        ]
+
+    @staticmethod
+    def _session_rows(employees, year, month):
+        rows = []
+        for i in range(employees):
+            for day in range(1, 32):
+                try:
+                    start = datetime.combine(date(year, month, day), datetime.min.time()) + timedelta(hours=9)
+                except ValueError:
+                    break
+                rows.append([start.date(), f'Сотрудник {i}', start, start + timedelta(hours=8), 8.0, ''])
+        return rows
+
+    @staticmethod
+    def _synthetic_template():
+        wb = Workbook()
+        ws = wb.active
+        ws['A1'] = 'Табель учёта рабочего времени за Январь 2025'
+        for day in range(1, 32):
+            ws.cell(row=4, column=timesheet.START_COL + day - 1, value=day)
+        for r in range(timesheet.START_ROW, timesheet.START_ROW + timesheet.MAX_ROWS):
+            for c in range(timesheet.NAME_COL, timesheet.TOTAL_COL + 1):
+                ws.cell(row=r, column=c, value=0)
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        wb.save(path)
+        return path
+
+    @staticmethod
+    def _legacy_month(template_path, rows):
+        wb = load_workbook(template_path)
+        ws = wb.active
+        for r in range(timesheet.START_ROW, timesheet.START_ROW + timesheet.MAX_ROWS):
+            ws.cell(row=r, column=timesheet.NAME_COL, value=None)
+            ws.cell(row=r, column=timesheet.POSITION_COL, value=None)
+            for c in range(timesheet.START_COL, timesheet.END_COL + 1):
+                ws.cell(row=r, column=c).value = None
+            ws.cell(row=r, column=timesheet.TOTAL_COL, value=None)
+        for row_idx, row in enumerate(rows, start=timesheet.START_ROW):
+            ws.cell(row=row_idx, column=timesheet.NAME_COL, value=row['full_name'])
+            ws.cell(row=row_idx, column=timesheet.POSITION_COL, value=row['position'])
+            for day, value in row['days'].items():
+                ws.cell(row=row_idx, column=timesheet.START_COL + day - 1, value=value)
+        stream = io.BytesIO()
+        wb.save(stream)
+        return stream.getvalue()
+
+    @staticmethod
+    def _legacy_sessions(session_rows):
+        wb = Workbook()
+        ws = wb.active
+        ws.append(timesheet.SESSION_HEADERS)
+        for row in session_rows:
+            ws.append(row)
+        stream = io.BytesIO()
+        wb.save(stream)
+        return stream.getvalue()
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from apps.timeclock.models import WorkSession
+from apps.timeclock.services import rebuild_day_totals
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает дневные итоги табеля (WorkDayTotal) по закрытым сессиям'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='Начало периода (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Конец периода (YYYY-MM-DD)')
+        parser.add_argument('--user', type=int, dest='user_id', help='ID пользователя')
+
+    def handle(self, *args, **options):
+        try:
+            date_from = self._parse_date(options['date_from'])
+            date_to = self._parse_date(options['date_to'])
+        except ValueError:
+            raise CommandError('Неверный формат даты, ожидается YYYY-MM-DD')
+
+        if date_from is None or date_to is None:
+            bounds = WorkSession.objects.filter(is_closed=True).aggregate(
+                first=Min('start_time'), last=Max('end_time')
+            )
+            if not bounds['first']:
+                self.stdout.write('Нет закрытых сессий')
+                return
+            date_from = date_from or timezone.localtime(bounds['first']).date()
+            date_to = date_to or timezone.localtime(bounds['last']).date()
+
+        user_ids = [options['user_id']] if options['user_id'] else None
+        # Пересчёт по месяцам, чтобы не держать все сессии в памяти
+        total = 0
+        chunk_start = date_from
+        while chunk_start <= date_to:
+            chunk_end = min(date_to, chunk_start + timedelta(days=30))
+            total += rebuild_day_totals(chunk_start, chunk_end, user_ids=user_ids)
+            chunk_start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Дневных итогов записано: {total} ({date_from} — {date_to})')
+        )
+
+    @staticmethod
+    def _parse_date(value):
+        if not value:
+            return None
+        return datetime.strptime(value[:10], '%Y-%m-%d').date()
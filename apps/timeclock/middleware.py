@@ -1,8 +1,7 @@
-from django.utils import timezone
 from django.shortcuts import redirect
 from django.http import JsonResponse
 import logging
-from .models import WorkSession
+from .services import has_open_session, touch_activity
 
 logger = logging.getLogger(__name__)
 
@@ -41,18 +40,10 @@ class WorkSessionRequiredMiddleware:
             is_exempt = any(path.startswith(exempt) for exempt in self.exempt_paths)
             
             if not is_exempt:
-                # Проверяем наличие активной сессии
+                # Проверяем наличие активной сессии (состояние кэшируется в services)
                 try:
-                    has_active_session = WorkSession.objects.filter(
-                        user=user,
-                        is_closed=False
-                    ).exists()
-                    
-                    logger.info(
-                        f'WorkSession check: user={user.username}, path={path}, method={request.method}, '
-                        f'has_active_session={has_active_session}, is_exempt={is_exempt}'
-                    )
-                    
+                    has_active_session = has_open_session(user.id)
+
                     if not has_active_session:
                         logger.warning(
                             f'BLOCKING REQUEST: user={user.username}, path={path}, method={request.method} - '
@@ -86,7 +77,7 @@ class WorkSessionRequiredMiddleware:
 
 
 class TimeclockActivityMiddleware:
-    """Обновляет last_activity для открытой сессии при каждом запросе пользователя."""
+    """Обновляет last_activity открытой сессии (не чаще раза в минуту, по кэшу состояния)."""
 
     def __init__(self, get_response):
         self.get_response = get_response
@@ -99,16 +90,7 @@ class TimeclockActivityMiddleware:
                 path = request.path
                 if path.startswith('/static') or path.startswith('/health'):
                     return response
-                session = (
-                    WorkSession.objects.filter(user=user, is_closed=False)
-                    .order_by('-start_time')
-                    .first()
-                )
-                if session:
-                    now = timezone.now()
-                    if not session.last_activity or (now - session.last_activity).total_seconds() > 60:
-                        session.last_activity = now
-                        session.save(update_fields=['last_activity'])
+                touch_activity(user.id)
         except Exception:
             # намеренно не мешаем основному запросу
             pass
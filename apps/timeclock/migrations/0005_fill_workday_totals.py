@@ -0,0 +1,39 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+
+def fill_workday_totals(apps, schema_editor):
+    """Начальное заполнение дневных итогов по уже закрытым сессиям."""
+    from apps.timeclock.services import split_by_day
+
+    WorkSession = apps.get_model('timeclock', 'WorkSession')
+    WorkDayTotal = apps.get_model('timeclock', 'WorkDayTotal')
+    totals = defaultdict(float)
+    sessions = (
+        WorkSession.objects.filter(is_closed=True, end_time__isnull=False)
+        .values_list('user_id', 'start_time', 'end_time')
+    )
+    for user_id, start, end in sessions.iterator():
+        for day, seconds in split_by_day(start, end):
+            totals[(user_id, day)] += seconds
+    WorkDayTotal.objects.all().delete()
+    WorkDayTotal.objects.bulk_create(
+        [
+            WorkDayTotal(user_id=user_id, date=day, seconds=int(round(seconds)))
+            for (user_id, day), seconds in totals.items()
+            if seconds > 0
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timeclock', '0004_workdaytotal'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_workday_totals, migrations.RunPython.noop),
+    ]
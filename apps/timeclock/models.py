@@ -32,6 +32,11 @@ class WorkSession(models.Model):
         self.end_time = end_time
         self.is_closed = True
         self.save(update_fields=['end_time', 'is_closed'])
+        from .activity import buffer as activity_buffer
+        from .services import forget_open_session, rollup_session
+        activity_buffer.discard(self.id)
+        forget_open_session(self.user_id)
+        rollup_session(self)
 
     def duration_seconds(self):
         if not self.end_time:
@@ -77,3 +82,25 @@ class WorkDayMark(models.Model):
         indexes = [models.Index(fields=['user', 'date'])]
         ordering = ('-date',)
 
+
+
+class WorkDayTotal(models.Model):
+    """Свод отработанного времени за день по закрытым сессиям (для табеля).
+
+    Сессии, пересекающие полночь, делятся по локальным суткам.
+    Поддерживается при закрытии сессий, пересобирается командой
+    rebuild_workday_totals. Время открытых сессий добавляется при чтении
+    (services.day_seconds).
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='workday_totals')
+    date = models.DateField()
+    seconds = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'date')
+        ordering = ('-date',)
+
+    def hours(self):
+        return round(self.seconds / 3600, 2)
@@ -0,0 +1,199 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils import timezone
+
+from .activity import ACTIVITY_TOUCH_INTERVAL, buffer as activity_buffer
+from .models import WorkDayTotal, WorkSession
+
+
+def _state_key(user_id):
+    return f'timeclock:open_session:{user_id}'
+
+
+def _state_ttl():
+    return getattr(settings, 'TIMECLOCK_SESSION_STATE_TTL', 60)
+
+
+def state_cache_enabled():
+    """
+    Состояние сессии кэшируется только в кэше, общем для процессов
+    (CACHE_BACKEND=database/redis). В кэше процесса старт, стоп в другом
+    воркере и автозакрытие из команды не сбросили бы запись — тогда
+    состояние каждый раз читается из БД (один запрос по индексу).
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def remember_open_session(session):
+    """Сохранить в кэше состояние открытой сессии пользователя."""
+    state = {'id': session.id, 'last_activity': session.last_activity}
+    if state_cache_enabled():
+        cache.set(_state_key(session.user_id), state, _state_ttl())
+    return state
+
+
+def forget_open_session(user_id):
+    """Сбросить кэш состояния сессии (после старта/закрытия/автозакрытия)."""
+    cache.delete(_state_key(user_id))
+
+
+def forget_open_sessions(user_ids):
+    """Массовый сброс кэша состояния для списка пользователей."""
+    cache.delete_many([_state_key(uid) for uid in set(user_ids)])
+
+
+def get_open_session_state(user_id):
+    """
+    Вернуть состояние открытой сессии: {'id', 'last_activity'}.
+    Если сессии нет — {'id': None, 'last_activity': None}.
+    Отсутствие сессии не кэшируется: после «Начать работу» в любом
+    воркере доступ открывается сразу.
+    """
+    if state_cache_enabled():
+        state = cache.get(_state_key(user_id))
+        if state is not None:
+            return state
+
+    session = (
+        WorkSession.objects.filter(user_id=user_id, is_closed=False)
+        .order_by('-start_time')
+        .only('id', 'user_id', 'last_activity')
+        .first()
+    )
+    if session:
+        return remember_open_session(session)
+    return {'id': None, 'last_activity': None}
+
+
+def has_open_session(user_id):
+    """Есть ли у пользователя открытая рабочая сессия."""
+    return get_open_session_state(user_id)['id'] is not None
+
+
+def touch_activity(user_id, now=None, force=False):
+    """
+    Отметить активность открытой сессии не чаще раза в минуту (force — всегда).
+    Запись в БД откладывается: отметка уходит в буфер activity и
+    сбрасывается пачкой. Возвращает актуальное состояние сессии.
+    """
+    state = get_open_session_state(user_id)
+    if state['id'] is None:
+        return state
+    if now is None:
+        now = timezone.now()
+    last = state['last_activity']
+    if not force and last and (now - last).total_seconds() <= ACTIVITY_TOUCH_INTERVAL:
+        return state
+    activity_buffer.touch(state['id'], now)
+    state = {'id': state['id'], 'last_activity': now}
+    if state_cache_enabled():
+        cache.set(_state_key(user_id), state, _state_ttl())
+    return state
+
+
+def day_bounds(date_from, date_to):
+    """Границы периода [date_from 00:00, date_to+1 00:00) в локальной зоне."""
+    tz = timezone.get_current_timezone()
+    start = datetime.combine(date_from, time.min, tzinfo=tz)
+    end = datetime.combine(date_to + timedelta(days=1), time.min, tzinfo=tz)
+    return start, end
+
+
+def split_by_day(start, end):
+    """Разбить интервал [start, end) по локальным суткам: (дата, секунды)."""
+    tz = timezone.get_current_timezone()
+    cur = timezone.localtime(start, tz)
+    end = timezone.localtime(end, tz)
+    while cur < end:
+        midnight = datetime.combine(cur.date() + timedelta(days=1), time.min, tzinfo=tz)
+        chunk_end = min(end, midnight)
+        seconds = (chunk_end.astimezone(dt_timezone.utc) - cur.astimezone(dt_timezone.utc)).total_seconds()
+        yield cur.date(), seconds
+        cur = chunk_end
+
+
+def rebuild_day_totals(date_from, date_to, user_ids=None):
+    """
+    Пересчитать WorkDayTotal за период [date_from, date_to] по закрытым сессиям.
+    user_ids=None — по всем пользователям. Операция идемпотентна.
+    """
+    period_start, period_end = day_bounds(date_from, date_to)
+    sessions = WorkSession.objects.filter(
+        is_closed=True,
+        end_time__isnull=False,
+        start_time__lt=period_end,
+        end_time__gt=period_start,
+    )
+    totals_qs = WorkDayTotal.objects.filter(date__gte=date_from, date__lte=date_to)
+    if user_ids is not None:
+        sessions = sessions.filter(user_id__in=user_ids)
+        totals_qs = totals_qs.filter(user_id__in=user_ids)
+
+    totals = defaultdict(float)
+    for user_id, start, end in sessions.values_list('user_id', 'start_time', 'end_time').iterator():
+        for day, seconds in split_by_day(max(start, period_start), min(end, period_end)):
+            totals[(user_id, day)] += seconds
+
+    rows = [
+        WorkDayTotal(user_id=user_id, date=day, seconds=int(round(seconds)))
+        for (user_id, day), seconds in totals.items()
+        if seconds > 0
+    ]
+    with transaction.atomic():
+        totals_qs.delete()
+        WorkDayTotal.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def open_session_seconds(date_from, date_to, user_ids=None, now=None):
+    """
+    Время открытых сессий за период [date_from, date_to] до момента now:
+    {(user_id, дата): секунды}. В WorkDayTotal сессия попадает только
+    при закрытии, поэтому текущий день добирается отсюда.
+    """
+    period_start, period_end = day_bounds(date_from, date_to)
+    period_end = min(period_end, now or timezone.now())
+    sessions = WorkSession.objects.filter(
+        is_closed=False,
+        start_time__lt=period_end,
+    )
+    if user_ids is not None:
+        sessions = sessions.filter(user_id__in=user_ids)
+
+    totals = defaultdict(float)
+    for user_id, start in sessions.values_list('user_id', 'start_time').iterator():
+        for day, seconds in split_by_day(max(start, period_start), period_end):
+            totals[(user_id, day)] += seconds
+    return totals
+
+
+def day_seconds(date_from, date_to, user_ids=None, now=None):
+    """
+    Отработанные секунды по дням за период: {(user_id, дата): секунды}.
+    Дневной свод по закрытым сессиям плюс идущие сейчас открытые сессии.
+    """
+    totals_qs = WorkDayTotal.objects.filter(date__gte=date_from, date__lte=date_to)
+    if user_ids is not None:
+        totals_qs = totals_qs.filter(user_id__in=user_ids)
+
+    totals = defaultdict(float)
+    for user_id, day, seconds in totals_qs.values_list('user_id', 'date', 'seconds'):
+        totals[(user_id, day)] += seconds
+    for key, seconds in open_session_seconds(date_from, date_to, user_ids, now).items():
+        totals[key] += seconds
+    return {key: int(round(seconds)) for key, seconds in totals.items() if seconds > 0}
+
+
+def rollup_session(session):
+    """Обновить дневные итоги по дням, которые затрагивает закрытая сессия."""
+    if not session.end_time:
+        return
+    date_from = timezone.localtime(session.start_time).date()
+    date_to = timezone.localtime(session.end_time).date()
+    rebuild_day_totals(date_from, max(date_from, date_to), user_ids=[session.user_id])
@@ -0,0 +1,137 @@
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.core.testing import local_cache
+
+from .models import WorkDayMark, WorkDayTotal, WorkSession
+from .services import day_seconds, rebuild_day_totals, split_by_day
+from .timesheet import month_rows
+
+
+def local(*args):
+    """Момент в локальной зоне проекта."""
+    return datetime(*args, tzinfo=timezone.get_current_timezone())
+
+
+class SplitByDayTests(TestCase):
+    """split_by_day: интервал делится по локальной полуночи."""
+
+    def test_within_day(self):
+        self.assertEqual(
+            list(split_by_day(local(2025, 3, 1, 9), local(2025, 3, 1, 18))),
+            [(date(2025, 3, 1), 9 * 3600)],
+        )
+
+    def test_across_midnight(self):
+        self.assertEqual(
+            list(split_by_day(local(2025, 3, 1, 22), local(2025, 3, 3, 1, 30))),
+            [
+                (date(2025, 3, 1), 2 * 3600),
+                (date(2025, 3, 2), 24 * 3600),
+                (date(2025, 3, 3), 1.5 * 3600),
+            ],
+        )
+
+    def test_empty_interval(self):
+        moment = local(2025, 3, 1, 9)
+        self.assertEqual(list(split_by_day(moment, moment)), [])
+
+
+@local_cache
+class WorkDayTotalTests(TestCase):
+    """Дневной свод по закрытым сессиям и добор открытых сессий."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email='tc@x.kz', username='tc@x.kz', password='pw', first_name='Иван', last_name='Петров'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def session(self, start, end=None):
+        return WorkSession.objects.create(
+            user=self.user, start_time=start, end_time=end, is_closed=end is not None
+        )
+
+    def totals(self):
+        return dict(WorkDayTotal.objects.values_list('date', 'seconds'))
+
+    def test_rebuild_splits_and_is_idempotent(self):
+        self.session(local(2025, 3, 1, 9), local(2025, 3, 1, 13))
+        self.session(local(2025, 3, 1, 22), local(2025, 3, 2, 2))
+        self.session(local(2025, 3, 2, 10))  # открытая — в свод не входит
+        expected = {date(2025, 3, 1): 6 * 3600, date(2025, 3, 2): 2 * 3600}
+
+        self.assertEqual(rebuild_day_totals(date(2025, 3, 1), date(2025, 3, 2)), 2)
+        self.assertEqual(self.totals(), expected)
+        rebuild_day_totals(date(2025, 3, 1), date(2025, 3, 2))
+        self.assertEqual(self.totals(), expected)
+
+    def test_rebuild_clips_to_period(self):
+        self.session(local(2025, 3, 1, 22), local(2025, 3, 2, 2))
+        rebuild_day_totals(date(2025, 3, 2), date(2025, 3, 2))
+        self.assertEqual(self.totals(), {date(2025, 3, 2): 2 * 3600})
+
+    def test_close_rolls_up_session(self):
+        start = timezone.now() - timedelta(hours=3)
+        session = self.session(start)
+        session.close(end_time=start + timedelta(hours=2))
+        self.assertEqual(sum(self.totals().values()), 2 * 3600)
+
+    def test_day_seconds_adds_open_session(self):
+        self.session(local(2025, 3, 2, 8), local(2025, 3, 2, 10))
+        rebuild_day_totals(date(2025, 3, 2), date(2025, 3, 2))
+        self.session(local(2025, 3, 2, 11))
+
+        seconds = day_seconds(
+            date(2025, 3, 1), date(2025, 3, 31), now=local(2025, 3, 2, 12, 30)
+        )
+        self.assertEqual(seconds, {(self.user.pk, date(2025, 3, 2)): int(3.5 * 3600)})
+
+    def test_day_seconds_open_session_across_midnight(self):
+        self.session(local(2025, 3, 1, 23))
+        seconds = day_seconds(
+            date(2025, 3, 1), date(2025, 3, 31), user_ids=[self.user.pk], now=local(2025, 3, 2, 1)
+        )
+        self.assertEqual(seconds, {
+            (self.user.pk, date(2025, 3, 1)): 3600,
+            (self.user.pk, date(2025, 3, 2)): 3600,
+        })
+
+    def open_today(self, hours):
+        """Открытая сессия, начатая hours часов назад, но не раньше полуночи."""
+        now = timezone.now()
+        midnight = local(*timezone.localdate().timetuple()[:3])
+        start = max(now - timedelta(hours=hours), midnight)
+        self.session(start)
+        return (now - start).total_seconds() / 3600
+
+    def test_month_rows_include_open_session_today(self):
+        today = timezone.localdate()
+        hours = self.open_today(0.5)
+        WorkDayMark.objects.create(user=self.user, date=today - timedelta(days=1), code='О')
+
+        rows = month_rows(today.year, today.month, today.replace(day=1), today)
+        self.assertEqual(len(rows), 1)
+        self.assertAlmostEqual(rows[0]['days'][today.day], hours, places=1)
+        if today.day > 1:
+            self.assertEqual(rows[0]['days'][today.day - 1], 'О')
+
+    def test_timesheet_view_includes_open_session(self):
+        today = timezone.localdate()
+        hours = self.open_today(1)
+        self.client.force_login(get_user_model().objects.create_superuser(
+            email='admin@x.kz', username='admin@x.kz', password='pw'
+        ))
+
+        response = self.client.get(reverse('api_timeclock:timesheet'), {'month': today.strftime('%Y-%m')})
+        self.assertEqual(response.status_code, 200)
+        [row] = response.json()['users']
+        self.assertAlmostEqual(row['hours'][str(today.day)], hours, places=1)
@@ -0,0 +1,216 @@
+"""
+Формирование XLSX-табеля.
+
+- Шаблон other/Табель.xlsx разбирается один раз: объединения в шапке дней
+  снимаются, строки сотрудников очищаются, результат хранится в памяти
+  байтами и на каждый запрос открывается из памяти (без диска и без
+  очистки 200×31 ячеек).
+- Плоская выгрузка сессий пишется в режиме openpyxl write_only.
+- Несколько месяцев/филиалов упаковываются в ZIP.
+"""
+import calendar
+import io
+import logging
+import os
+import threading
+import zipfile
+from collections import defaultdict
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils import column_index_from_string
+
+from .models import WorkDayMark
+from .services import day_seconds
+
+logger = logging.getLogger(__name__)
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Разметка шаблона: дни D:AH, итог AI, сотрудники со строки 6
+START_ROW = 6
+MAX_ROWS = 200
+NAME_COL = column_index_from_string('B')
+POSITION_COL = column_index_from_string('C')
+START_COL = column_index_from_string('D')
+END_COL = column_index_from_string('AH')
+TOTAL_COL = column_index_from_string('AI')
+
+MONTH_NAMES = {
+    1: 'Январь', 2: 'Февраль', 3: 'Март', 4: 'Апрель',
+    5: 'Май', 6: 'Июнь', 7: 'Июль', 8: 'Август',
+    9: 'Сентябрь', 10: 'Октябрь', 11: 'Ноябрь', 12: 'Декабрь'
+}
+WEEKDAY_NAMES = ['пн', 'вт', 'ср', 'чт', 'пт', 'сб', 'вс']
+
+SESSION_HEADERS = ['Дата', 'Пользователь', 'Начало', 'Конец', 'Часы', 'Примечание']
+
+_template_lock = threading.Lock()
+_template_cache = {'path': None, 'mtime': None, 'data': None}
+
+
+def default_template_path():
+    return os.path.join(settings.BASE_DIR, 'other', 'Табель.xlsx')
+
+
+def template_available(template_path=None):
+    return os.path.exists(template_path or default_template_path())
+
+
+def _prepare_template(template_path):
+    """Разобрать шаблон и подготовить «чистую» копию в байтах."""
+    wb = load_workbook(template_path)
+    ws = wb.active
+
+    # Разъединяем объединения в строках 4-5 (дни месяца), чтобы писать в ячейки
+    for merged_range in list(ws.merged_cells.ranges):
+        if (merged_range.min_row <= 5 and merged_range.max_row >= 4 and
+                merged_range.min_col <= END_COL and merged_range.max_col >= START_COL):
+            try:
+                ws.unmerge_cells(str(merged_range))
+            except Exception as e:
+                logger.warning(f'Could not unmerge {merged_range}: {e}')
+
+    # Очищаем строки сотрудников (ФИО, Должность, дни, итог)
+    for row in ws.iter_rows(min_row=START_ROW, max_row=START_ROW + MAX_ROWS - 1,
+                            min_col=NAME_COL, max_col=TOTAL_COL):
+        for cell in row:
+            if cell.value is not None:
+                cell.value = None
+
+    stream = io.BytesIO()
+    wb.save(stream)
+    return stream.getvalue()
+
+
+def open_template(template_path=None):
+    """
+    Вернуть новую книгу из подготовленного шаблона или None, если шаблона нет.
+    Шаблон перечитывается с диска только при изменении файла.
+    """
+    template_path = template_path or default_template_path()
+    try:
+        mtime = os.path.getmtime(template_path)
+    except OSError:
+        return None
+    with _template_lock:
+        if (_template_cache['path'] != template_path or
+                _template_cache['mtime'] != mtime):
+            logger.info(f'Preparing timesheet template: {template_path}')
+            _template_cache.update(
+                path=template_path, mtime=mtime, data=_prepare_template(template_path)
+            )
+        data = _template_cache['data']
+    return load_workbook(io.BytesIO(data))
+
+
+def month_rows(year, month, date_from, date_to, user_ids=None, all_users=False):
+    """
+    Строки табеля за месяц по дневному своду (с открытыми сессиями) и ручным отметкам.
+    Возвращает список {'full_name', 'position', 'days': {день: часы|код}}.
+    Заполняются только дни из [date_from, date_to]. По умолчанию в табель
+    попадают сотрудники с часами за период; all_users=True — все из user_ids.
+    """
+    days_in_month = calendar.monthrange(year, month)[1]
+    df = max(date_from, date(year, month, 1))
+    dt = min(date_to, date(year, month, days_in_month))
+
+    marks_qs = WorkDayMark.objects.filter(date__gte=df, date__lte=dt)
+    if user_ids is not None:
+        marks_qs = marks_qs.filter(user_id__in=user_ids)
+
+    days_by_user = defaultdict(dict)
+    for (user_id, day), seconds in day_seconds(df, dt, user_ids).items():
+        days_by_user[user_id][day.day] = round(seconds / 3600.0, 2)
+    # Ручная отметка важнее часов
+    marks_by_user = defaultdict(dict)
+    for user_id, day, code in marks_qs.values_list('user_id', 'date', 'code'):
+        marks_by_user[user_id][day.day] = code
+
+    if all_users and user_ids is not None:
+        users = get_user_model().objects.filter(id__in=user_ids)
+    else:
+        users = get_user_model().objects.filter(id__in=list(days_by_user), is_active=True)
+    users = (
+        users.select_related('position')
+        .order_by('last_name', 'first_name')
+    )
+    rows = []
+    for u in users:
+        days = dict(days_by_user[u.id])
+        days.update(marks_by_user.get(u.id, {}))
+        rows.append({
+            'full_name': getattr(u, 'full_name', None) or u.get_full_name() or u.username,
+            'position': getattr(getattr(u, 'position', None), 'name', '') or '',
+            'days': days,
+        })
+    return rows
+
+
+def render_month(year, month, rows, template_path=None):
+    """Заполнить шаблон табеля за месяц. Возвращает байты XLSX или None без шаблона."""
+    wb = open_template(template_path)
+    if wb is None:
+        return None
+    ws = wb.active
+    days_in_month = calendar.monthrange(year, month)[1]
+    month_name = MONTH_NAMES.get(month, '')
+
+    # Заголовок месяца (обычно в строках 1-2)
+    for row in ws.iter_rows(min_row=1, max_row=2, min_col=1, max_col=9):
+        for cell in row:
+            if cell.value and isinstance(cell.value, str):
+                for old_month in MONTH_NAMES.values():
+                    if old_month in cell.value:
+                        cell.value = cell.value.replace(
+                            old_month, month_name
+                        ).replace('2025', str(year))
+
+    # Номера дней в строке 4, дни недели в строке 5
+    for day_num in range(1, days_in_month + 1):
+        col = START_COL + day_num - 1
+        ws.cell(row=4, column=col, value=day_num)
+        ws.cell(row=5, column=col, value=WEEKDAY_NAMES[date(year, month, day_num).weekday()])
+
+    for row_idx, row in enumerate(rows, start=START_ROW):
+        ws.cell(row=row_idx, column=NAME_COL, value=row['full_name'])
+        ws.cell(row=row_idx, column=POSITION_COL, value=row['position'])
+        for day_num, value in row['days'].items():
+            if 1 <= day_num <= days_in_month:
+                ws.cell(row=row_idx, column=START_COL + day_num - 1, value=value)
+        # Формула итога по явочным часам
+        ws.cell(row=row_idx, column=TOTAL_COL, value=f'=SUM(D{row_idx}:AH{row_idx})')
+
+    stream = io.BytesIO()
+    wb.save(stream)
+    return stream.getvalue()
+
+
+def render_sessions(rows):
+    """
+    Плоская выгрузка сессий (write_only, без хранения ячеек в памяти).
+    rows — итерируемое из [дата, пользователь, начало, конец, часы, примечание].
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Timeclock')
+    ws.append(SESSION_HEADERS)
+    count = 0
+    for row in rows:
+        ws.append(row)
+        count += 1
+    if count:
+        ws.append([None, None, None, None, f'=SUM(E2:E{count + 1})'])
+    stream = io.BytesIO()
+    wb.save(stream)
+    return stream.getvalue()
+
+
+def pack_zip(files):
+    """Упаковать [(имя_файла, байты), ...] в ZIP."""
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in files:
+            zf.writestr(name, data)
+    return stream.getvalue()
@@ -12,8 +12,10 @@ urlpatterns = [
     path('heartbeat/', views.heartbeat, name='heartbeat'),
     path('status/', views.current_session_status, name='status'),
     path('my_sessions/', views.my_sessions, name='my_sessions'),
+    path('timesheet/', views.timesheet, name='timesheet'),
     path('marks/', views.get_marks, name='marks'),
     path('set_mark/', views.set_mark, name='set_mark'),
     path('export_xlsx/', views.export_timeclock_xlsx, name='export_xlsx'),
+    path('export_zip/', views.export_timeclock_zip, name='export_zip'),
 ]
 
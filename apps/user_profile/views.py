@@ -6,6 +6,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth import get_user_model, authenticate
 from django.contrib.auth.hashers import check_password
+from apps.core.writes import coordinated_write
 from .models import UserProfile
 from .forms import UserProfileForm
 from apps.plans.models import PlanAssignment
@@ -16,6 +17,7 @@ User = get_user_model()
 
 
 @login_required(login_url='accounts:login')
+@coordinated_write
 def profile_settings(request):
     """Настройки профиля пользователя"""
     try:
@@ -95,6 +97,7 @@ def profile_settings(request):
 @login_required(login_url='accounts:login')
 @csrf_exempt
 @require_http_methods(["POST"])
+@coordinated_write
 def update_profile_ajax(request):
     """AJAX обновление профиля"""
     try:
@@ -135,6 +138,7 @@ def update_profile_ajax(request):
 @login_required(login_url='accounts:login')
 @csrf_exempt
 @require_http_methods(["POST"])
+@coordinated_write
 def upload_avatar(request):
     """Загрузка аватара"""
     if 'avatar' in request.FILES:
@@ -161,6 +165,7 @@ def upload_avatar(request):
 @login_required(login_url='accounts:login')
 @csrf_exempt
 @require_http_methods(["POST"])
+@coordinated_write
 def reset_avatar(request):
     """Сброс аватара"""
     if request.user.avatar:
@@ -177,6 +182,7 @@ def reset_avatar(request):
 @login_required(login_url='accounts:login')
 @csrf_exempt
 @require_http_methods(["POST"])
+@coordinated_write
 def change_password(request):
     """Изменение пароля пользователя"""
     try:
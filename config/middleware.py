@@ -19,6 +19,7 @@ class LoginRequiredMiddleware:
             '/admin/login/', '/admin/js/',
             '/api/accounts/',
             '/favicon.ico',
+            '/health',
         )
 
     def __call__(self, request):
@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 from datetime import timedelta
-from decouple import config
+from decouple import Choices, config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -38,6 +38,8 @@ LOCAL_APPS = [
     'apps.plans',
     'apps.analytics',
     'apps.timeclock',
+    'apps.imports',
+    'apps.core',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -53,6 +55,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'apps.timeclock.middleware.TimeclockActivityMiddleware',
+    'apps.core.middleware.ReplicaPinMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -74,13 +77,108 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# База данных: sqlite (по умолчанию, один сервер) или postgresql (POSTGRES_*)
+DB_ENGINE = config('DB_ENGINE', default='sqlite', cast=Choices(['sqlite', 'postgresql']))
+# Реплика для чтения: тяжёлые отчёты (аналитика, выгрузки, дашборд) читают
+# с алиаса replica, запись и чтение после записи — с default (apps/core/routers.py)
+DB_REPLICA = config('DB_REPLICA', default=False, cast=bool)
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('POSTGRES_DB'),
+            'USER': config('POSTGRES_USER'),
+            'PASSWORD': config('POSTGRES_PASSWORD', default=''),
+            'HOST': config('POSTGRES_HOST', default='localhost'),
+            'PORT': config('POSTGRES_PORT', default='5432'),
+            # Постоянные соединения: одно на поток воркера, перед повторным
+            # использованием проверяется, что оно живо
+            'CONN_MAX_AGE': config('POSTGRES_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': config('POSTGRES_CONNECT_TIMEOUT', default=5, cast=int),
+            },
+            'TEST': {
+                'NAME': config('POSTGRES_TEST_DB', default=None),
+            },
+        }
+    }
+    # Пул соединений: psycopg — встроенный пул Django (нужен пакет
+    # psycopg[pool], постоянные соединения при этом отключаются);
+    # pgbouncer — внешний PgBouncer в режиме transaction pooling
+    POSTGRES_POOL = config('POSTGRES_POOL', default='', cast=Choices(['', 'psycopg', 'pgbouncer']))
+    if POSTGRES_POOL == 'psycopg':
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': config('POSTGRES_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('POSTGRES_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('POSTGRES_POOL_TIMEOUT', default=10, cast=int),
+        }
+    elif POSTGRES_POOL == 'pgbouncer':
+        # Серверные курсоры (iterator()) не переживают смену соединения
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+    if DB_REPLICA:
+        # Потоковая реплика PostgreSQL: те же учётные данные, другой хост
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': config('POSTGRES_REPLICA_HOST'),
+            'PORT': config('POSTGRES_REPLICA_PORT', default=DATABASES['default']['PORT']),
+            'OPTIONS': {**DATABASES['default']['OPTIONS']},
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
     }
+    if DB_REPLICA:
+        # Локальная реплика — копия db.sqlite3, которую периодически обновляет
+        # команда refresh_sqlite_replica. Копия подменяется целиком, поэтому
+        # открывается только для чтения и как неизменяемая (без блокировок)
+        SQLITE_REPLICA_PATH = config('SQLITE_REPLICA_PATH', default=str(BASE_DIR / 'db.replica.sqlite3'))
+        DATABASES['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f'file:{SQLITE_REPLICA_PATH}?mode=ro&immutable=1',
+            'TEST': {'MIRROR': 'default'},
+        }
+
+# SQLite: PRAGMA для каждого нового соединения (apps/core/signals.py).
+# WAL позволяет читать во время записи, busy_timeout — ждать блокировку
+# вместо мгновенного «database is locked». busy_timeout идёт первым,
+# чтобы переключение journal_mode тоже ждало блокировку.
+SQLITE_PRAGMAS = {
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),  # мс
+    'journal_mode': config(
+        'SQLITE_JOURNAL_MODE', default='wal',
+        cast=Choices(['wal', 'delete', 'truncate', 'persist', 'memory']),
+    ),
+    'synchronous': config(
+        'SQLITE_SYNCHRONOUS', default='normal',
+        cast=Choices(['off', 'normal', 'full', 'extra']),
+    ),
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),  # байт
+    # Отрицательное значение — размер в КиБ (64 МБ на соединение)
+    'cache_size': config('SQLITE_CACHE_SIZE', default=-64000, cast=int),
+    'temp_store': config(
+        'SQLITE_TEMP_STORE', default='memory',
+        cast=Choices(['default', 'file', 'memory']),
+    ),
 }
 
+# Повтор записи при «database is locked» (apps/core/writes.py): число
+# повторов и экспоненциальная задержка от DB_WRITE_RETRY_DELAY до потолка (сек)
+DB_WRITE_RETRIES = config('DB_WRITE_RETRIES', default=4, cast=int)
+DB_WRITE_RETRY_DELAY = config('DB_WRITE_RETRY_DELAY', default=0.05, cast=float)
+DB_WRITE_RETRY_MAX_DELAY = config('DB_WRITE_RETRY_MAX_DELAY', default=1.0, cast=float)
+
+DATABASE_ROUTERS = ['apps.core.routers.CacheRouter', 'apps.core.routers.ReplicaRouter']
+# После запроса с записью пользователь столько секунд читает только
+# с основной БД, чтобы сразу увидеть свои изменения (реплика отстаёт)
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=15, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -160,20 +258,69 @@ REST_FRAMEWORK = {
 }
 
 # Caching Configuration
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-        'TIMEOUT': 300,  # 5 минут
-        'OPTIONS': {
-            'MAX_ENTRIES': 1000,
+# Кэш: database (по умолчанию) — таблица django_cache, общая для воркеров
+# одного сервера и management-команд (для SQLite — в отдельном файле, чтобы
+# запись кэша не ждала блокировку основной БД; таблицу создаёт migrate);
+# redis — общий кэш для нескольких серверов (нужен пакет redis); locmem —
+# свой у каждого процесса, только для разработки в один процесс (проверка
+# core.W001 предупреждает). Ключи версионируются тегами (apps/core/cache.py),
+# поэтому TTL может быть длинным.
+CACHE_BACKEND = config('CACHE_BACKEND', default='database', cast=Choices(['locmem', 'database', 'redis']))
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('REDIS_URL', default='redis://127.0.0.1:6379/1'),
+            'TIMEOUT': 300,  # 5 минут
+            'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='crm'),
+        }
+    }
+elif CACHE_BACKEND == 'database':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+            'TIMEOUT': 300,  # 5 минут
+            'OPTIONS': {
+                'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int),
+            }
+        }
+    }
+    if DB_ENGINE == 'sqlite':
+        DATABASES['cache'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('SQLITE_CACHE_PATH', default=str(BASE_DIR / 'cache.sqlite3')),
+        }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+            'TIMEOUT': 300,  # 5 минут
+            'OPTIONS': {
+                'MAX_ENTRIES': 1000,
+            }
         }
     }
-}
 
 # Cache для статических данных
 CACHE_TTL = 60 * 5  # 5 минут
 
+# Табель: время жизни кэша состояния открытой рабочей сессии (сек);
+# состояние кэшируется только в общем кэше (CACHE_BACKEND=database/redis)
+TIMECLOCK_SESSION_STATE_TTL = config(
+    'TIMECLOCK_SESSION_STATE_TTL', default=60, cast=int
+)
+# Табель: период сброса буфера last_activity в БД (сек), 0 — писать сразу
+TIMECLOCK_ACTIVITY_FLUSH_INTERVAL = config(
+    'TIMECLOCK_ACTIVITY_FLUSH_INTERVAL', default=30, cast=int
+)
+
+# Импорт: через сколько секунд ожидания в очереди задание считается
+# зависшим (воркер run_jobs не запущен) и страница показывает ошибку
+IMPORT_PENDING_TIMEOUT = config('IMPORT_PENDING_TIMEOUT', default=120, cast=int)
+
 # JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
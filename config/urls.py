@@ -4,6 +4,8 @@ from django.views.generic import RedirectView
 from django.conf import settings
 from django.conf.urls.static import static
 
+from apps.core.views import health
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/accounts/', include(('apps.accounts.urls', 'accounts'), namespace='api_accounts')),
@@ -19,6 +21,8 @@ urlpatterns = [
     path('cities/', include('apps.cities.urls')),
     path('profile/', include('apps.user_profile.urls')),
     path('plans/', include('apps.plans.urls')),
+    path('imports/', include('apps.imports.urls')),
+    path('health/', health, name='health'),
     path(
         '',
         RedirectView.as_view(